@@ -0,0 +1,35 @@
+# ABOUTME: Bearer API key authentication for the JSON API under /api/
+# ABOUTME: Rejects unauthenticated requests with a 401 before any route runs
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from app.database import Database
+from app.usage import APIKeyUsageTracker
+
+# Beforeware skip pattern: every path outside /api/ is public
+PUBLIC_PATHS = r"(?!/api/).*"
+
+
+def require_api_key(
+    req: Request, db: Database, usage: APIKeyUsageTracker
+) -> JSONResponse | None:
+    """Authenticate a request by its ``Authorization: Bearer <key>`` header.
+
+    Only active keys are accepted. On success the key is stored as
+    ``req.scope["api_key"]`` and its usage recorded; otherwise a 401 is
+    returned and the route never runs.
+    """
+    scheme, _, token = req.headers.get("authorization", "").partition(" ")
+    key = db.authenticate(token) if scheme.lower() == "bearer" and token else None
+    if key is None:
+        return JSONResponse(
+            {
+                "error": "Invalid or missing API key",
+                "detail": "Requests to /api/ need an active API key",
+                "action": "Send an 'Authorization: Bearer <api_key>' header",
+            },
+            status_code=401,
+        )
+    usage.record(key.key_id)
+    req.scope["api_key"] = key
+    return None
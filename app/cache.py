@@ -0,0 +1,146 @@
+# ABOUTME: In-process caches used by the database layer to avoid repeated SQLite reads
+# ABOUTME: Provides version-validated single-row and bounded LRU caches
+import threading
+from collections import OrderedDict
+from collections.abc import Callable, Hashable
+from typing import Any, cast
+
+# Returned by LRUCache.get on a miss so that None can be cached as a value
+MISSING: Any = object()
+
+
+class SingleRowCache[T]:
+    """Read-through cache for a single-row table.
+
+    Entries are tagged with the value of ``version()`` observed before the row
+    was loaded. A read is served from memory only while that version is
+    unchanged, so writes from other threads or other worker processes are
+    picked up on the next call. ``invalidate()`` drops the entry immediately
+    and prevents an in-flight load from repopulating it with stale data.
+    ``hits`` and ``misses`` count reads for metrics. The cached value is
+    handed to every caller, so it must be immutable (e.g. a frozen dataclass).
+    """
+
+    def __init__(self, loader: Callable[[], T | None], version: Callable[[], int]):
+        self._loader = loader
+        self._version = version
+        self._lock = threading.Lock()
+        self._value: T | None = None
+        self._cached_version: int | None = None
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self) -> T | None:
+        """Return the cached value, loading it if stale or missing."""
+        version = self._version()
+        with self._lock:
+            if self._cached_version == version:
+                self.hits += 1
+                return self._value
+            self.misses += 1
+            generation = self._generation
+
+        value = self._loader()
+        with self._lock:
+            if generation == self._generation:
+                self._value = value
+                self._cached_version = version
+        return value
+
+    def invalidate(self) -> None:
+        """Discard the cached value."""
+        with self._lock:
+            self._generation += 1
+            self._value = None
+            self._cached_version = None
+
+
+class LRUCache[K: Hashable, T]:
+    """Thread-safe bounded LRU mapping, optionally tied to a data version.
+
+    When a ``version`` is passed to ``get`` and differs from the one the
+    entries were stored under, the whole cache is dropped first. ``put`` only
+    stores values loaded under the current version, so a load that raced with
+    a write can never outlive the next staleness check. ``hits`` and
+    ``misses`` count lookups for metrics. With ``maxbytes``, the summed
+    ``sizeof`` of the values is bounded too, and a value larger than the whole
+    budget is not stored.
+    """
+
+    def __init__(
+        self,
+        maxsize: int = 1024,
+        maxbytes: int | None = None,
+        sizeof: Callable[[T], int] | None = None,
+    ):
+        if maxbytes is not None and sizeof is None:
+            raise ValueError("maxbytes needs a sizeof function")
+        self.maxsize = maxsize
+        self.maxbytes = maxbytes
+        self._sizeof = sizeof
+        self.nbytes = 0
+        self._data: OrderedDict[K, T] = OrderedDict()
+        self._lock = threading.Lock()
+        self._version: int | None = None
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: K, version: int | None = None) -> T:
+        """Return the cached value for ``key`` or ``MISSING``."""
+        with self._lock:
+            if version != self._version:
+                self._data.clear()
+                self.nbytes = 0
+                self._version = version
+                self.misses += 1
+                return cast(T, MISSING)
+            try:
+                self._data.move_to_end(key)
+            except KeyError:
+                self.misses += 1
+                return cast(T, MISSING)
+            self.hits += 1
+            return self._data[key]
+
+    def put(self, key: K, value: T, version: int | None = None) -> None:
+        """Store ``value``, evicting least recently used entries while full."""
+        with self._lock:
+            if version != self._version or self.maxsize <= 0:
+                return
+            self._pop(key)
+            if self._sizeof is not None:
+                size = self._sizeof(value)
+                if self.maxbytes is not None and size > self.maxbytes:
+                    return
+                self.nbytes += size
+            self._data[key] = value
+            while len(self._data) > self.maxsize or (
+                self.maxbytes is not None and self.nbytes > self.maxbytes
+            ):
+                self._pop(next(iter(self._data)))
+
+    def discard(self, key: K) -> None:
+        """Remove ``key`` if present."""
+        with self._lock:
+            self._pop(key)
+
+    def discard_where(self, predicate: Callable[[T], bool]) -> None:
+        """Remove every entry whose value matches ``predicate``."""
+        with self._lock:
+            for key in [k for k, v in self._data.items() if predicate(v)]:
+                self._pop(key)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+            self.nbytes = 0
+
+    def _pop(self, key: K) -> None:
+        value = self._data.pop(key, MISSING)
+        if value is not MISSING and self._sizeof is not None:
+            self.nbytes -= self._sizeof(value)
@@ -0,0 +1,249 @@
+# ABOUTME: Command line entry point for running BlogBot tasks outside the web app
+# ABOUTME: Provides `blogbot build`, `sync` and `publish` (site, mirror and Pages)
+import argparse
+import asyncio
+import cProfile
+import os
+import sys
+from collections.abc import Callable
+
+from app.database import Database
+from app.services.content_index import sync_from_mirror
+from app.services.github import GITHUB_API_URL, GitHubClient, GitHubError
+from app.services.images import VariantCache, build_images, is_image_path, read_images
+from app.services.mirror import ContentMirror, MirrorError, github_remote_url
+from app.services.optimize import optimize_site
+from app.services.pipeline import STEPS, PipelineReport, run_publish
+from app.services.render_cache import RenderCache
+from app.services.static_site import build_site, read_sources
+
+
+def _mirror(db: Database, path: str) -> ContentMirror:
+    settings = db.get_settings()
+    if settings is None:
+        raise ValueError("Blog settings must be configured before syncing content")
+    remote = github_remote_url(settings.github_repo, os.environ.get("GITHUB_TOKEN"))
+    return ContentMirror(path, remote, settings.github_branch)
+
+
+def _sync(args: argparse.Namespace) -> int:
+    db = Database(args.db)
+    try:
+        mirror = _mirror(db, args.mirror_dir)
+        result = mirror.sync()
+        indexed, removed = sync_from_mirror(db, mirror)
+    except (ValueError, MirrorError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+    if not result.updated and not indexed and not removed:
+        print(f"Already up to date at {result.new_head}")
+        return 0
+    print(f"Synced {result.old_head or '(empty)'} -> {result.new_head}")
+    print(f"Content index: {indexed} updated, {removed} removed")
+    for path in result.changed:
+        print(f"  M {path}")
+    for path in result.deleted:
+        print(f"  D {path}")
+    return 0
+
+
+def _build(args: argparse.Namespace) -> int:
+    db = Database(args.db)
+    image_cache = args.image_cache or os.path.join(
+        os.path.dirname(os.path.abspath(args.db)), "image-cache"
+    )
+    try:
+        if args.mirror:
+            mirror = _mirror(db, args.source_dir)
+            sources = mirror.read_markdown()
+            images = mirror.read_many(
+                entry.path for entry in mirror.list_files() if is_image_path(entry.path)
+            )
+        else:
+            sources = read_sources(args.source_dir)
+            images = read_images(args.source_dir)
+        report = build_site(
+            db,
+            args.output_dir,
+            sources,
+            full=args.full,
+            workers=args.workers,
+            render_cache=RenderCache(db),
+        )
+        image_report = build_images(images, args.output_dir, VariantCache(image_cache))
+        optimized = optimize_site(db, args.output_dir, args.workers)
+    except ValueError as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+    print(
+        f"Built in {report.elapsed:.2f}s: rendered {report.rendered} sources, "
+        f"wrote {len(report.rebuilt)} files, deleted {len(report.deleted)}, "
+        f"{report.unchanged} unchanged"
+    )
+    print(
+        f"Images in {image_report.elapsed:.2f}s: {len(images)} originals, "
+        f"{image_report.generated} variants encoded, {image_report.cached} from cache"
+    )
+    print(
+        f"Optimized in {optimized.elapsed:.2f}s: {len(optimized.minified)} minified, "
+        f"{optimized.unchanged} unchanged, {optimized.bytes_saved} bytes saved"
+    )
+    for path in report.rebuilt + image_report.written:
+        print(f"  + {path}")
+    for path in report.deleted + image_report.deleted:
+        print(f"  - {path}")
+    for error in report.errors.values():
+        print(f"warning: {error}", file=sys.stderr)
+    return 0
+
+
+def _print_steps(report: PipelineReport) -> None:
+    print(f"{'Step':<10} {'Seconds':>8} {'Items':>7} {'Cache hits':>10}")
+    for name in STEPS:
+        step = report.steps[name]
+        print(f"{name:<10} {step.seconds:>8.3f} {step.items:>7} {step.cache_hits:>10}")
+
+
+async def _run_publish(
+    db: Database, args: argparse.Namespace, profile: cProfile.Profile | None
+) -> PipelineReport:
+    image_cache = args.image_cache or os.path.join(
+        os.path.dirname(os.path.abspath(args.db)), "image-cache"
+    )
+    mirror = _mirror(db, args.mirror) if args.mirror else None
+    client = GitHubClient(
+        os.environ.get("GITHUB_TOKEN"), os.environ.get("GITHUB_API_URL", GITHUB_API_URL)
+    )
+    async with client:
+        return await run_publish(
+            db,
+            client,
+            args.output_dir,
+            image_cache,
+            RenderCache(db),
+            mirror,
+            dry_run=args.dry_run,
+            profile=profile,
+            workers=args.workers,
+        )
+
+
+def _publish(args: argparse.Namespace) -> int:
+    db = Database(args.db)
+    profile = cProfile.Profile() if args.profile else None
+    try:
+        report = asyncio.run(_run_publish(db, args, profile))
+    except (ValueError, MirrorError, GitHubError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        db.close()
+
+    _print_steps(report)
+    if report.plan is not None:
+        plan = report.plan
+        print(
+            f"Dry run: {len(plan.added)} added, {len(plan.changed)} changed, "
+            f"{len(plan.deleted)} deleted, {plan.unchanged} unchanged, "
+            f"{plan.bytes_to_upload} bytes to upload"
+        )
+        for marker, paths in (
+            ("A", plan.added),
+            ("M", plan.changed),
+            ("D", plan.deleted),
+        ):
+            for path in paths:
+                print(f"  {marker} {path}")
+    elif report.publish.commit_sha:
+        print(
+            f"Published {report.publish.commit_sha}: "
+            f"{len(report.publish.uploaded)} uploaded, "
+            f"{len(report.publish.deleted)} deleted, {report.publish.skipped} unchanged"
+        )
+    else:
+        print("Nothing to publish")
+    if profile is not None:
+        profile.dump_stats(args.profile)
+        print(f"Profile written to {args.profile}")
+    return 0
+
+
+def _add_workers_option(parser: argparse.ArgumentParser) -> None:
+    cores = os.cpu_count() or 1
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=cores,
+        help=f"Processes rendering and minifying pages (default: {cores} cores)",
+    )
+
+
+def main(argv: list[str] | None = None) -> int:
+    """Parse ``argv`` and run the requested command."""
+    parser = argparse.ArgumentParser(prog="blogbot")
+    parser.add_argument("--db", default="blog.db", help="SQLite database path")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build the static site")
+    build.add_argument("source_dir", help="Directory containing markdown content")
+    build.add_argument(
+        "--mirror", action="store_true", help="Read source_dir as a content mirror"
+    )
+    build.add_argument("output_dir", help="Directory to write the site into")
+    build.add_argument("--full", action="store_true", help="Ignore the build manifest")
+    _add_workers_option(build)
+    build.add_argument(
+        "--image-cache",
+        help="Directory caching resized image variants (default: image-cache by --db)",
+    )
+    build.set_defaults(handler=_build)
+
+    sync = commands.add_parser(
+        "sync", help="Update the local mirror of the content repository"
+    )
+    sync.add_argument("mirror_dir", help="Bare git directory holding the mirror")
+    sync.set_defaults(handler=_sync)
+
+    publish = commands.add_parser(
+        "publish", help="Build the site and publish it to the deployment target"
+    )
+    publish.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="List the files that would change without pushing",
+    )
+    publish.add_argument(
+        "--profile",
+        metavar="FILE",
+        help="Write a cProfile dump of the build steps to FILE",
+    )
+    publish.add_argument(
+        "--output-dir",
+        default=os.environ.get("BLOGBOT_SITE_DIR", "site"),
+        help="Directory to build the site into (default: $BLOGBOT_SITE_DIR or site)",
+    )
+    publish.add_argument(
+        "--image-cache",
+        help="Directory caching resized image variants (default: image-cache by --db)",
+    )
+    publish.add_argument(
+        "--mirror",
+        metavar="DIR",
+        help="Read content from this git mirror instead of the API",
+    )
+    _add_workers_option(publish)
+    publish.set_defaults(handler=_publish)
+
+    args = parser.parse_args(argv)
+    handler: Callable[[argparse.Namespace], int] = args.handler
+    return handler(args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,201 +1,1297 @@
 # ABOUTME: Database operations layer using SQLite with FastLite integration
 # ABOUTME: Handles CRUD operations for Settings, APIKey, and DeploymentConfig models
-import sqlite3
+import functools
+import hashlib
 import json
+import logging
+import sqlite3
+import threading
+import time
+from collections.abc import Callable, Collection, Iterable, Iterator, Mapping, Sequence
+from dataclasses import fields
 from datetime import datetime
-from typing import Optional, List
-from pathlib import Path
+from typing import TYPE_CHECKING, Any, List, Optional
+
+from app.cache import MISSING, LRUCache, SingleRowCache
+from app.metrics import db_query_seconds, timed_methods
+from app.models import (
+    PERMISSIONS,
+    APIKey,
+    AuthenticatedKey,
+    ContentItem,
+    DeploymentConfig,
+    Job,
+    OutputRecord,
+    SearchHit,
+    Settings,
+    SourceRecord,
+    StoredImage,
+    permission_mask,
+    permission_names,
+)
+
+if TYPE_CHECKING:
+    from _typeshed import DataclassInstance
+
+logger = logging.getLogger("blogbot.database")
+
+# Per-connection prepared statement cache; every query in this module is a
+# fixed SQL string so the cache is hit on every call after the first.
+STATEMENT_CACHE_SIZE = 128
+
+# Stored in PRAGMA user_version once the schema is created; bump whenever
+# _create_schema changes so existing databases run it again on next open
+SCHEMA_VERSION = 5
+
+# Primary key of the only row in the settings and deployment_config tables
+SINGLE_ROW_ID = 1
+
+# Resolved API keys (and unknown hashes) kept in memory for authentication
+AUTH_CACHE_SIZE = 4096
+
+# Columns each in-memory cache depends on; triggers bump the table's row in
+# cache_versions only when one of these changes, so usage counters and writes
+# to unrelated tables leave the caches warm
+CACHED_COLUMNS = {
+    "settings": None,  # Every column
+    "deployment_config": None,
+    "api_keys": ("name", "key_hash", "permission_bits", "is_active"),
+}
+
+# Markers around matched terms in search snippets (control characters never
+# appear in markdown, so they survive until the caller escapes the snippet)
+SNIPPET_START = "\x02"
+SNIPPET_END = "\x03"
+
+
+# Columns of the settings table that mirror Settings fields
+SETTINGS_FIELDS = tuple(field.name for field in fields(Settings))
+
+type RowFactory[M] = Callable[[sqlite3.Cursor | None, Sequence[Any]], M]
+
+
+def hash_api_key(raw_key: str) -> str:
+    """Hash a raw API key into the form stored in ``api_keys.key_hash``."""
+    return hashlib.sha256(raw_key.encode()).hexdigest()
+
+
+def model_row_factory[M: DataclassInstance](
+    model: type[M], **converters: Callable[[Any], Any]
+) -> RowFactory[M]:
+    """Return a cursor row factory building ``model`` straight from the row tuple.
+
+    The query must select the model's fields in declaration order; columns
+    after them are ignored. ``converters`` map field names to functions
+    applied to their column first (JSON text, ISO timestamps, 0/1 flags).
+    Set it as ``cursor.row_factory`` so ``fetchall`` hydrates in one pass
+    without building a ``sqlite3.Row`` per row.
+    """
+    names = [field.name for field in fields(model)]
+    unknown = set(converters).difference(names)
+    if unknown:
+        raise ValueError(f"{model.__name__} has no fields {sorted(unknown)}")
+    convert = [converters.get(name) for name in names]
+
+    def build(cursor: sqlite3.Cursor | None, row: Sequence[Any]) -> M:
+        values = zip(convert, row, strict=False)  # Trailing columns are ignored
+        return model(*[f(value) if f else value for f, value in values])
+    return build
+
+
+def select_columns(model: type, table: str = "", **renamed: str) -> str:
+    """Column list selecting ``model``'s fields in order, for ``model_row_factory``."""
+    prefix = f"{table}." if table else ""
+    return ", ".join(
+        prefix + renamed.get(field.name, field.name) for field in fields(model)
+    )
+
 
-from app.models import Settings, APIKey, DeploymentConfig
+@functools.lru_cache(maxsize=4096)
+def _parse_tags(text: str) -> tuple[str, ...]:
+    return tuple(json.loads(text))
 
 
+def _tags(text: str) -> list[str]:
+    # Tag lists repeat across posts, so each distinct JSON text is parsed once
+    return list(_parse_tags(text))
+
+
+def _permission_list(bits: int) -> list[str]:
+    names = permission_names(bits)
+    return [name for name in PERMISSIONS if name in names]
+
+
+def _optional_datetime(value: str | None) -> datetime | None:
+    return datetime.fromisoformat(value) if value else None
+
+
+_settings_row = model_row_factory(Settings)
+_deployment_config_row = model_row_factory(DeploymentConfig, auto_deploy=bool)
+_api_key_row = model_row_factory(
+    APIKey,
+    permissions=_permission_list,
+    created_at=datetime.fromisoformat,
+    is_active=bool,
+    last_used=_optional_datetime,
+)
+_content_item_row = model_row_factory(ContentItem, tags=_tags)
+
+SETTINGS_COLUMNS = select_columns(Settings)
+DEPLOYMENT_CONFIG_COLUMNS = select_columns(DeploymentConfig)
+API_KEY_COLUMNS = select_columns(APIKey, permissions="permission_bits")
+CONTENT_COLUMNS = select_columns(ContentItem, "c")
+
+
+@timed_methods(db_query_seconds)
 class Database:
-    """SQLite database operations for BlogBot configuration data."""
-    
+    """SQLite database operations for BlogBot configuration data.
+
+    Every public method is timed into the ``blogbot_db_query_duration_seconds``
+    histogram.
+    """
+
     def __init__(self, db_path: str = "blog.db"):
-        """Initialize database connection and create schema."""
+        """Set up the connection pool; nothing is opened until first use."""
         self.db_path = db_path
-        self.init_schema()
-    
-    def init_schema(self):
-        """Create database tables if they don't exist."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS settings (
-                    id INTEGER PRIMARY KEY,
-                    blog_title TEXT NOT NULL,
-                    blog_description TEXT NOT NULL,
-                    github_repo TEXT NOT NULL,
-                    github_branch TEXT NOT NULL DEFAULT 'main',
-                    github_pages_url TEXT,
-                    theme TEXT DEFAULT 'default',
-                    custom_css TEXT,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        self._local = threading.local()
+        self._connections: dict[threading.Thread, sqlite3.Connection] = {}
+        self._lock = threading.Lock()
+        self._schema_lock = threading.Lock()
+        self._schema_ready = False
+        self._watch: sqlite3.Connection | None = None
+        self._watch_lock = threading.Lock()
+        self._watched_data_version: int | None = None
+        self._table_versions: dict[str, int] = {}
+        self._settings_cache: SingleRowCache[Settings] = SingleRowCache(
+            self._load_settings, functools.partial(self.table_version, "settings")
+        )
+        self._deployment_config_cache: SingleRowCache[DeploymentConfig] = (
+            SingleRowCache(
+                self._load_deployment_config,
+                functools.partial(self.table_version, "deployment_config"),
+            )
+        )
+        self._auth_cache: LRUCache[str, AuthenticatedKey | None] = LRUCache(
+            AUTH_CACHE_SIZE
+        )
+
+    def _open_connection(self) -> sqlite3.Connection:
+        """Open a new connection tuned for concurrent readers and one writer."""
+        conn = sqlite3.connect(
+            self.db_path,
+            check_same_thread=False,
+            cached_statements=STATEMENT_CACHE_SIZE,
+        )
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    def _connection(self) -> sqlite3.Connection:
+        """Return the long-lived connection owned by the calling thread.
+
+        Using the returned connection as a context manager commits on success
+        and rolls back on error, exactly like a fresh ``sqlite3.connect``.
+        Connections left behind by threads that have since exited are closed
+        whenever a new one is opened.
+        """
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._open_connection()
+            self._local.conn = conn
+            with self._lock:
+                for thread in [t for t in self._connections if not t.is_alive()]:
+                    self._connections.pop(thread).close()
+                self._connections[threading.current_thread()] = conn
+            if not self._schema_ready:
+                self._ensure_schema(conn)
+        return conn
+
+    def table_version(self, table: str) -> int:
+        """Return the write counter of a cached table, e.g. ``settings``.
+
+        Triggers bump the counter on every write to the columns listed in
+        CACHED_COLUMNS, from any connection in this or another worker. It is
+        re-read only when SQLite's ``data_version`` shows that some other
+        connection has committed, so the common case costs one PRAGMA.
+        """
+        self._connection()  # Make sure cache_versions exists
+        with self._watch_lock:
+            if self._watch is None:
+                self._watch = self._open_connection()
+            data_version = self._watch.execute("PRAGMA data_version").fetchone()[0]
+            if data_version != self._watched_data_version:
+                self._table_versions = dict(
+                    self._watch.execute("SELECT name, version FROM cache_versions")
                 )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS api_keys (
-                    id INTEGER PRIMARY KEY AUTOINCREMENT,
-                    name TEXT NOT NULL,
-                    key_hash TEXT NOT NULL UNIQUE,
-                    permissions TEXT NOT NULL,  -- JSON array
-                    is_active BOOLEAN DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                self._watched_data_version = data_version
+            return self._table_versions.get(table, 0)
+
+    def cache_stats(self) -> dict[str, tuple[int, int]]:
+        """Return (hits, misses) of each in-memory cache."""
+        return {
+            "settings": (self._settings_cache.hits, self._settings_cache.misses),
+            "deployment_config": (
+                self._deployment_config_cache.hits,
+                self._deployment_config_cache.misses,
+            ),
+            "api_keys": (self._auth_cache.hits, self._auth_cache.misses),
+        }
+
+    def _fetch[M](
+        self, factory: RowFactory[M], sql: str, params: Sequence[Any] = ()
+    ) -> list[M]:
+        """Run ``sql`` and hydrate every row with ``factory`` in one pass."""
+        with self._connection() as conn:
+            cursor = conn.execute(sql, params)
+            cursor.row_factory = factory
+            return cursor.fetchall()
+
+    def close(self) -> None:
+        """Close every pooled connection; later calls transparently reopen."""
+        with self._lock:
+            connections = list(self._connections.values())
+            self._connections = {}
+            self._local = threading.local()
+        with self._watch_lock:
+            if self._watch is not None:
+                connections.append(self._watch)
+                self._watch = None
+            self._watched_data_version = None
+        for conn in connections:
+            conn.close()
+        self._settings_cache.invalidate()
+        self._deployment_config_cache.invalidate()
+        self._auth_cache.clear()
+
+    def init_schema(self) -> None:
+        """Create or upgrade the schema now rather than on first use (at startup)."""
+        self._ensure_schema(self._connection())
+
+    def _ensure_schema(self, conn: sqlite3.Connection) -> None:
+        """Run _create_schema once, unless the file is already at SCHEMA_VERSION."""
+        with self._schema_lock:
+            if self._schema_ready:
+                return
+            if conn.execute("PRAGMA user_version").fetchone()[0] != SCHEMA_VERSION:
+                with conn:
+                    self._create_schema(conn)
+                    conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._schema_ready = True
+
+    def _create_schema(self, conn: sqlite3.Connection) -> None:
+        """Create database tables if they don't exist."""
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS settings (
+                id INTEGER PRIMARY KEY,
+                blog_title TEXT NOT NULL,
+                blog_description TEXT NOT NULL,
+                github_repo TEXT NOT NULL,
+                github_branch TEXT NOT NULL DEFAULT 'main',
+                github_pages_url TEXT,
+                theme TEXT DEFAULT 'default',
+                custom_css TEXT,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS api_keys (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                name TEXT NOT NULL,
+                key_hash TEXT NOT NULL UNIQUE,
+                permission_bits INTEGER NOT NULL DEFAULT 0,  -- Bitmask over PERMISSIONS
+                is_active BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                last_used TIMESTAMP,
+                request_count INTEGER NOT NULL DEFAULT 0
+            )
+        """)
+        # Databases created before usage tracking lack these columns
+        self._add_missing_columns(
+            conn,
+            "api_keys",
+            {
+                "last_used": "TIMESTAMP",
+                "request_count": "INTEGER NOT NULL DEFAULT 0",
+                "permission_bits": "INTEGER NOT NULL DEFAULT 0",
+            },
+        )
+        self._migrate_permissions(conn)
+
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS deployment_config (
+                id INTEGER PRIMARY KEY,
+                target_repo TEXT NOT NULL,
+                target_branch TEXT NOT NULL DEFAULT 'gh-pages',
+                build_command TEXT NOT NULL DEFAULT 'npm run build',
+                custom_domain TEXT,
+                auto_deploy BOOLEAN DEFAULT 1,
+                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+            )
+        """)
+        # Single-row tables are upserted at id 1; older versions re-inserted the
+        # row on every save, so it may have drifted to another id
+        for table in ("settings", "deployment_config"):
+            conn.execute(
+                f"UPDATE {table} SET id = ? WHERE id <> ?",
+                (SINGLE_ROW_ID, SINGLE_ROW_ID),
+            )
+
+        # Incremental build manifest: one row per markdown source...
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS build_sources (
+                path TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                config_hash TEXT NOT NULL,
+                output_path TEXT NOT NULL,
+                output_hash TEXT NOT NULL,
+                metadata TEXT NOT NULL  -- JSON object
+            )
+        """)
+
+        # ...one row per aggregate page (index, tag pages, feed)...
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS build_outputs (
+                output_path TEXT PRIMARY KEY,
+                inputs_hash TEXT NOT NULL,
+                output_hash TEXT NOT NULL
+            )
+        """)
+
+        # ...and the reverse dependencies from sources to aggregate pages
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS build_dependencies (
+                output_path TEXT NOT NULL,
+                source_path TEXT NOT NULL,
+                PRIMARY KEY (output_path, source_path)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_build_dependencies_source
+            ON build_dependencies (source_path)
+        """)
+
+        # Output files as the optimizer last left them, so unchanged ones are skipped
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS build_optimized (
+                output_path TEXT PRIMARY KEY,
+                manifest_hash TEXT NOT NULL,  -- Asset manifest it was rewritten with
+                output_hash TEXT NOT NULL
+            )
+        """)
+
+        # Frontmatter index of the content repo for fast listing/filtering
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS content_index (
+                path TEXT PRIMARY KEY,
+                sha TEXT NOT NULL,
+                title TEXT NOT NULL,
+                date TEXT NOT NULL DEFAULT '',
+                type TEXT NOT NULL DEFAULT 'post',
+                slug TEXT NOT NULL DEFAULT '',
+                tags TEXT NOT NULL DEFAULT '[]'  -- JSON array
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_content_date
+            ON content_index (date DESC, path DESC)
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_content_type_date
+            ON content_index (type, date DESC, path DESC)
+        """)
+        # Tag join table; date is denormalized so tag listings page by index
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS content_tags (
+                tag TEXT NOT NULL,
+                date TEXT NOT NULL,
+                path TEXT NOT NULL,
+                PRIMARY KEY (tag, date, path)
+            ) WITHOUT ROWID
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_content_tags_path
+            ON content_tags (path)
+        """)
+        # Full-text index over titles, tags and bodies; rowid = content_index.rowid
+        has_search = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'content_search'"
+        ).fetchone()
+        conn.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS content_search USING fts5 (
+                title, tags, body,
+                tokenize = 'unicode61 remove_diacritics 2'
+            )
+        """)
+        # Weighted terms per file, merged into the static site's search shard
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS content_terms (
+                path TEXT PRIMARY KEY,
+                terms TEXT NOT NULL  -- JSON object: term -> weight
+            )
+        """)
+        if not has_search:
+            # Entries indexed before search existed get re-parsed on next sync
+            conn.execute("UPDATE content_index SET sha = ''")
+
+        # Uploaded images by content hash, so identical uploads share one file
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS images (
+                content_hash TEXT PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                width INTEGER NOT NULL DEFAULT 0,
+                height INTEGER NOT NULL DEFAULT 0,
+                size INTEGER NOT NULL DEFAULT 0,
+                created_at TEXT NOT NULL
+            )
+        """)
+
+        # Background jobs (see app.jobs.JobWorker); times are Unix seconds
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS jobs (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                kind TEXT NOT NULL,
+                state TEXT NOT NULL DEFAULT 'queued',
+                attempts INTEGER NOT NULL DEFAULT 0,
+                max_attempts INTEGER NOT NULL DEFAULT 3,
+                requests INTEGER NOT NULL DEFAULT 1,
+                stage TEXT NOT NULL DEFAULT '',
+                progress REAL NOT NULL DEFAULT 0,
+                result TEXT NOT NULL DEFAULT '{}',  -- JSON object
+                error TEXT,
+                run_after REAL NOT NULL,
+                lease_until REAL,  -- Running jobs past their lease are reclaimed
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        # At most one queued job per kind: further requests coalesce into it
+        conn.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_queued_kind
+            ON jobs (kind) WHERE state = 'queued'
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_jobs_state
+            ON jobs (state, run_after)
+        """)
+
+        # Content-addressed markdown -> HTML fragments (see RenderCache)
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS render_cache (
+                key TEXT PRIMARY KEY,
+                html TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                last_used INTEGER NOT NULL  -- Unix seconds
+            )
+        """)
+        conn.execute("""
+            CREATE INDEX IF NOT EXISTS idx_render_cache_last_used
+            ON render_cache (last_used)
+        """)
+
+        # Per-table write counters validating the in-memory caches
+        conn.execute("""
+            CREATE TABLE IF NOT EXISTS cache_versions (
+                name TEXT PRIMARY KEY,
+                version INTEGER NOT NULL
+            )
+        """)
+        for table, columns in CACHED_COLUMNS.items():
+            conn.execute(
+                "INSERT OR IGNORE INTO cache_versions (name, version) VALUES (?, 0)",
+                (table,),
+            )
+            for event in ("INSERT", "UPDATE", "DELETE"):
+                if event == "UPDATE" and columns:
+                    event = f"UPDATE OF {', '.join(columns)}"
+                trigger = f"{table}_{event.split()[0].lower()}_cache_version"
+                conn.execute(f"""
+                    CREATE TRIGGER IF NOT EXISTS {trigger} AFTER {event} ON {table}
+                    BEGIN
+                        UPDATE cache_versions SET version = version + 1
+                        WHERE name = '{table}';
+                    END
+                """)
+
+    @staticmethod
+    def _migrate_permissions(conn: sqlite3.Connection) -> None:
+        """Move the JSON ``permissions`` of old databases into ``permission_bits``.
+
+        Names outside PERMISSIONS were never checked, so they are dropped and
+        logged per key. The JSON column is only dropped once every stored mask
+        reads back as the expected names; otherwise this raises and the schema
+        transaction rolls back with the old column intact.
+        """
+        existing = {row["name"] for row in conn.execute("PRAGMA table_info(api_keys)")}
+        if "permissions" not in existing:
+            return
+        expected: dict[int, set[str]] = {}
+        for row in conn.execute("SELECT id, name, permissions FROM api_keys"):
+            names = set(json.loads(row["permissions"]))
+            expected[row["id"]] = names & set(PERMISSIONS)
+            for dropped in sorted(names - expected[row["id"]]):
+                logger.warning(
+                    "Dropping unknown permission %r from API key %d (%s)",
+                    dropped,
+                    row["id"],
+                    row["name"],
                 )
-            """)
-            
-            conn.execute("""
-                CREATE TABLE IF NOT EXISTS deployment_config (
-                    id INTEGER PRIMARY KEY,
-                    target_repo TEXT NOT NULL,
-                    target_branch TEXT NOT NULL DEFAULT 'gh-pages',
-                    build_command TEXT NOT NULL DEFAULT 'npm run build',
-                    custom_domain TEXT,
-                    auto_deploy BOOLEAN DEFAULT 1,
-                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        conn.executemany(
+            "UPDATE api_keys SET permission_bits = ? WHERE id = ?",
+            [(permission_mask(names), key_id) for key_id, names in expected.items()],
+        )
+        for row in conn.execute("SELECT id, permission_bits FROM api_keys"):
+            if permission_names(row["permission_bits"]) != expected.get(row["id"]):
+                raise RuntimeError(
+                    f"API key {row['id']} permissions did not migrate intact"
                 )
-            """)
-    
+        conn.execute("ALTER TABLE api_keys DROP COLUMN permissions")
+
+    @staticmethod
+    def _add_missing_columns(
+        conn: sqlite3.Connection, table: str, columns: dict[str, str]
+    ) -> None:
+        """Add any of ``columns`` (name -> type) missing from ``table``."""
+        existing = {row["name"] for row in conn.execute(f"PRAGMA table_info({table})")}
+        for name, column_type in columns.items():
+            if name not in existing:
+                conn.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+
     # Settings operations
     def save_settings(self, settings: Settings) -> None:
-        """Save or update blog settings (single row table)."""
-        with sqlite3.connect(self.db_path) as conn:
-            # Delete existing settings (single row table pattern)
-            conn.execute("DELETE FROM settings")
-            
-            # Insert new settings
+        """Save or replace blog settings (single row table).
+
+        An upsert on the fixed row ID: readers in other workers never see the
+        table empty, and ``created_at`` survives while ``updated_at`` moves.
+        """
+        with self._connection() as conn:
             conn.execute("""
                 INSERT INTO settings (
-                    blog_title, blog_description, github_repo, github_branch,
+                    id, blog_title, blog_description, github_repo, github_branch,
                     github_pages_url, theme, custom_css
-                ) VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (
-                settings.blog_title,
-                settings.blog_description,
-                settings.github_repo,
-                settings.github_branch,
-                settings.github_pages_url,
-                settings.theme,
-                settings.custom_css
-            ))
-    
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    blog_title = excluded.blog_title,
+                    blog_description = excluded.blog_description,
+                    github_repo = excluded.github_repo,
+                    github_branch = excluded.github_branch,
+                    github_pages_url = excluded.github_pages_url,
+                    theme = excluded.theme,
+                    custom_css = excluded.custom_css,
+                    updated_at = CURRENT_TIMESTAMP
+            """,
+                (
+                    SINGLE_ROW_ID,
+                    settings.blog_title,
+                    settings.blog_description,
+                    settings.github_repo,
+                    settings.github_branch,
+                    settings.github_pages_url,
+                    settings.theme,
+                    settings.custom_css,
+                ),
+            )
+        self._settings_cache.invalidate()
+
+    def update_settings(self, changes: Mapping[str, Any]) -> Settings | None:
+        """Change only the given Settings fields and return the result.
+
+        Returns None (and changes nothing) when no settings have been saved
+        yet. Raises ValueError for names that are not Settings fields.
+        """
+        unknown = set(changes).difference(SETTINGS_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown settings fields: {', '.join(sorted(unknown))}")
+        if not changes:
+            return self.get_settings()
+        # Column names come from the Settings dataclass, never from the caller
+        columns = [name for name in SETTINGS_FIELDS if name in changes]
+        assignments = ", ".join(f"{name} = ?" for name in columns)
+        rows = self._fetch(
+            _settings_row,
+            f"UPDATE settings SET {assignments}, updated_at = CURRENT_TIMESTAMP "
+            f"WHERE id = ? RETURNING {SETTINGS_COLUMNS}",
+            [changes[name] for name in columns] + [SINGLE_ROW_ID],
+        )
+        self._settings_cache.invalidate()
+        return rows[0] if rows else None
+
     def get_settings(self) -> Optional[Settings]:
-        """Retrieve blog settings."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("SELECT * FROM settings LIMIT 1")
-            row = cursor.fetchone()
-            
-            if row is None:
-                return None
-            
-            return Settings(
-                blog_title=row['blog_title'],
-                blog_description=row['blog_description'],
-                github_repo=row['github_repo'],
-                github_branch=row['github_branch'],
-                github_pages_url=row['github_pages_url'],
-                theme=row['theme'],
-                custom_css=row['custom_css']
-            )
-    
+        """Retrieve blog settings, served from memory while unchanged."""
+        return self._settings_cache.get()
+
+    def _load_settings(self) -> Settings | None:
+        """Read blog settings from SQLite."""
+        rows = self._fetch(
+            _settings_row,
+            f"SELECT {SETTINGS_COLUMNS} FROM settings WHERE id = ?",
+            (SINGLE_ROW_ID,),
+        )
+        return rows[0] if rows else None
+
     # API Key operations
     def create_api_key(self, api_key: APIKey) -> int:
         """Create a new API key and return its ID."""
-        with sqlite3.connect(self.db_path) as conn:
-            cursor = conn.execute("""
-                INSERT INTO api_keys (name, key_hash, permissions, is_active, created_at)
-                VALUES (?, ?, ?, ?, ?)
-            """, (
-                api_key.name,
-                api_key.key_hash,
-                json.dumps(api_key.permissions),
-                api_key.is_active,
-                api_key.created_at.isoformat()
-            ))
-            return cursor.lastrowid
-    
+        with self._connection() as conn:
+            cursor = conn.execute(
+                """
+                INSERT INTO api_keys (
+                    name, key_hash, permission_bits, is_active, created_at
+                ) VALUES (?, ?, ?, ?, ?)
+            """,
+                (
+                    api_key.name,
+                    api_key.key_hash,
+                    permission_mask(api_key.permissions),
+                    api_key.is_active,
+                    api_key.created_at.isoformat(),
+                ),
+            )
+        # Drop any negative cache entry for this hash
+        self._auth_cache.discard(api_key.key_hash)
+        return cursor.lastrowid
+
+    def authenticate(self, raw_key: str) -> AuthenticatedKey | None:
+        """Resolve a raw API key to its active key record, or None.
+
+        Lookups go through the ``key_hash`` unique index and are fronted by an
+        LRU that also remembers unknown hashes. The cache is dropped whenever
+        the ``api_keys`` table version moves, so a key deactivated by any
+        worker stops authenticating on its next use, while usage flushes and
+        writes to other tables keep it warm.
+        """
+        key_hash = hash_api_key(raw_key)
+        version = self.table_version("api_keys")
+        cached = self._auth_cache.get(key_hash, version)
+        if cached is not MISSING:
+            return cached
+
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT id, name, permission_bits FROM api_keys "
+                "WHERE key_hash = ? AND is_active = 1",
+                (key_hash,),
+            ).fetchone()
+
+        result = None
+        if row is not None:
+            result = AuthenticatedKey(
+                key_id=row["id"],
+                name=row["name"],
+                permissions=permission_names(row["permission_bits"]),
+            )
+        self._auth_cache.put(key_hash, result, version)
+        return result
+
     def get_api_key(self, key_id: int) -> Optional[APIKey]:
         """Retrieve an API key by ID."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("SELECT * FROM api_keys WHERE id = ?", (key_id,))
-            row = cursor.fetchone()
-            
-            if row is None:
-                return None
-            
-            return APIKey(
-                name=row['name'],
-                key_hash=row['key_hash'],
-                permissions=json.loads(row['permissions']),
-                is_active=bool(row['is_active']),
-                created_at=datetime.fromisoformat(row['created_at'])
-            )
-    
+        rows = self._fetch(
+            _api_key_row,
+            f"SELECT {API_KEY_COLUMNS} FROM api_keys WHERE id = ?",
+            (key_id,),
+        )
+        return rows[0] if rows else None
+
     def list_api_keys(self) -> List[APIKey]:
         """List all API keys."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("SELECT * FROM api_keys ORDER BY created_at DESC")
-            rows = cursor.fetchall()
-            
-            return [
-                APIKey(
-                    name=row['name'],
-                    key_hash=row['key_hash'],
-                    permissions=json.loads(row['permissions']),
-                    is_active=bool(row['is_active']),
-                    created_at=datetime.fromisoformat(row['created_at'])
-                )
-                for row in rows
-            ]
-    
+        return self._fetch(
+            _api_key_row,
+            f"SELECT {API_KEY_COLUMNS} FROM api_keys ORDER BY created_at DESC",
+        )
+
     def deactivate_api_key(self, key_id: int) -> None:
         """Deactivate an API key."""
-        with sqlite3.connect(self.db_path) as conn:
+        with self._connection() as conn:
             conn.execute(
                 "UPDATE api_keys SET is_active = 0 WHERE id = ?",
                 (key_id,)
             )
-    
+        self._auth_cache.discard_where(
+            lambda key: key is not None and key.key_id == key_id
+        )
+
+    def record_api_key_usage(self, usage: Iterable[tuple[int, datetime, int]]) -> None:
+        """Apply aggregated (key_id, last_used, request_count) usage atomically."""
+        with self._connection() as conn:
+            conn.executemany(
+                """
+                UPDATE api_keys
+                SET last_used = MAX(COALESCE(last_used, ''), ?),
+                    request_count = request_count + ?
+                WHERE id = ?
+            """,
+                [
+                    (last_used.isoformat(), count, key_id)
+                    for key_id, last_used, count in usage
+                ],
+            )
+
     # Deployment Config operations
     def save_deployment_config(self, config: DeploymentConfig) -> None:
-        """Save or update deployment configuration (single row table)."""
-        with sqlite3.connect(self.db_path) as conn:
-            # Delete existing config (single row table pattern)
-            conn.execute("DELETE FROM deployment_config")
-            
-            # Insert new config
+        """Save or replace deployment configuration (single row table, upserted)."""
+        with self._connection() as conn:
             conn.execute("""
                 INSERT INTO deployment_config (
-                    target_repo, target_branch, build_command, custom_domain, auto_deploy
-                ) VALUES (?, ?, ?, ?, ?)
-            """, (
-                config.target_repo,
-                config.target_branch,
-                config.build_command,
-                config.custom_domain,
-                config.auto_deploy
-            ))
-    
+                    id, target_repo, target_branch, build_command, custom_domain,
+                    auto_deploy
+                ) VALUES (?, ?, ?, ?, ?, ?)
+                ON CONFLICT (id) DO UPDATE SET
+                    target_repo = excluded.target_repo,
+                    target_branch = excluded.target_branch,
+                    build_command = excluded.build_command,
+                    custom_domain = excluded.custom_domain,
+                    auto_deploy = excluded.auto_deploy,
+                    updated_at = CURRENT_TIMESTAMP
+            """,
+                (
+                    SINGLE_ROW_ID,
+                    config.target_repo,
+                    config.target_branch,
+                    config.build_command,
+                    config.custom_domain,
+                    config.auto_deploy,
+                ),
+            )
+        self._deployment_config_cache.invalidate()
+
     def get_deployment_config(self) -> Optional[DeploymentConfig]:
-        """Retrieve deployment configuration."""
-        with sqlite3.connect(self.db_path) as conn:
-            conn.row_factory = sqlite3.Row
-            cursor = conn.execute("SELECT * FROM deployment_config LIMIT 1")
-            row = cursor.fetchone()
-            
-            if row is None:
-                return None
-            
-            return DeploymentConfig(
-                target_repo=row['target_repo'],
-                target_branch=row['target_branch'],
-                build_command=row['build_command'],
-                custom_domain=row['custom_domain'],
-                auto_deploy=bool(row['auto_deploy'])
-            )
\ No newline at end of file
+        """Retrieve deployment configuration, served from memory while unchanged."""
+        return self._deployment_config_cache.get()
+
+    def _load_deployment_config(self) -> DeploymentConfig | None:
+        """Read deployment configuration from SQLite."""
+        rows = self._fetch(
+            _deployment_config_row,
+            f"SELECT {DEPLOYMENT_CONFIG_COLUMNS} FROM deployment_config WHERE id = ?",
+            (SINGLE_ROW_ID,),
+        )
+        return rows[0] if rows else None
+
+    # Build manifest operations
+    def get_build_sources(self) -> dict[str, SourceRecord]:
+        """Return the build manifest entry for every source, keyed by path."""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT * FROM build_sources").fetchall()
+        return {
+            row["path"]: SourceRecord(
+                path=row["path"],
+                content_hash=row["content_hash"],
+                config_hash=row["config_hash"],
+                output_path=row["output_path"],
+                output_hash=row["output_hash"],
+                metadata=json.loads(row["metadata"]),
+            )
+            for row in rows
+        }
+
+    def get_build_outputs(self) -> dict[str, OutputRecord]:
+        """Return every aggregate page entry, keyed by output path."""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT * FROM build_outputs").fetchall()
+        return {
+            row["output_path"]: OutputRecord(
+                output_path=row["output_path"],
+                inputs_hash=row["inputs_hash"],
+                output_hash=row["output_hash"],
+            )
+            for row in rows
+        }
+
+    def get_build_dependents(self, source_paths: Collection[str]) -> set[str]:
+        """Return the aggregate pages that depend on any of ``source_paths``."""
+        if not source_paths:
+            return set()
+        with self._connection() as conn:
+            conn.execute(
+                "CREATE TEMP TABLE IF NOT EXISTS touched_sources "
+                "(path TEXT PRIMARY KEY)"
+            )
+            conn.execute("DELETE FROM touched_sources")
+            conn.executemany(
+                "INSERT OR IGNORE INTO touched_sources VALUES (?)",
+                [(path,) for path in source_paths],
+            )
+            rows = conn.execute("""
+                SELECT DISTINCT d.output_path
+                FROM touched_sources t
+                JOIN build_dependencies d ON d.source_path = t.path
+            """).fetchall()
+        return {row["output_path"] for row in rows}
+
+    def save_build(
+        self,
+        sources: Iterable[SourceRecord],
+        deleted_sources: Iterable[str],
+        outputs: Iterable[OutputRecord],
+        deleted_outputs: Iterable[str],
+    ) -> None:
+        """Record the result of a build in a single transaction."""
+        with self._connection() as conn:
+            conn.executemany(
+                "DELETE FROM build_sources WHERE path = ?",
+                [(path,) for path in deleted_sources],
+            )
+            conn.executemany(
+                """
+                INSERT OR REPLACE INTO build_sources (
+                    path, content_hash, config_hash, output_path, output_hash, metadata
+                ) VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                [
+                    (
+                        record.path,
+                        record.content_hash,
+                        record.config_hash,
+                        record.output_path,
+                        record.output_hash,
+                        json.dumps(record.metadata),
+                    )
+                    for record in sources
+                ],
+            )
+
+            for output_path in deleted_outputs:
+                conn.execute(
+                    "DELETE FROM build_outputs WHERE output_path = ?", (output_path,)
+                )
+                conn.execute(
+                    "DELETE FROM build_dependencies WHERE output_path = ?",
+                    (output_path,),
+                )
+            for record in outputs:
+                conn.execute(
+                    "INSERT OR REPLACE INTO build_outputs VALUES (?, ?, ?)",
+                    (record.output_path, record.inputs_hash, record.output_hash),
+                )
+                conn.execute(
+                    "DELETE FROM build_dependencies WHERE output_path = ?",
+                    (record.output_path,),
+                )
+                conn.executemany(
+                    "INSERT INTO build_dependencies VALUES (?, ?)",
+                    [(record.output_path, path) for path in record.sources],
+                )
+
+    def clear_build_manifest(self) -> None:
+        """Forget all build state so the next build is a full rebuild."""
+        with self._connection() as conn:
+            conn.execute("DELETE FROM build_sources")
+            conn.execute("DELETE FROM build_outputs")
+            conn.execute("DELETE FROM build_dependencies")
+            conn.execute("DELETE FROM build_optimized")
+
+    def get_optimized_outputs(self) -> dict[str, tuple[str, str]]:
+        """Return (manifest_hash, output_hash) of each optimized file, keyed by path."""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT * FROM build_optimized").fetchall()
+        return {
+            row["output_path"]: (row["manifest_hash"], row["output_hash"])
+            for row in rows
+        }
+
+    def save_optimized_outputs(
+        self, outputs: Iterable[tuple[str, str, str]], deleted: Iterable[str]
+    ) -> None:
+        """Record (output_path, manifest_hash, output_hash) rows; forget ``deleted``."""
+        with self._connection() as conn:
+            conn.executemany(
+                "DELETE FROM build_optimized WHERE output_path = ?",
+                [(path,) for path in deleted],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO build_optimized VALUES (?, ?, ?)", list(outputs)
+            )
+
+    # Render cache operations
+    def get_rendered(self, key: str) -> tuple[str, int] | None:
+        """Return the cached (html, last_used) for ``key``, if any."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT html, last_used FROM render_cache WHERE key = ?", (key,)
+            ).fetchone()
+        return (row["html"], row["last_used"]) if row else None
+
+    def touch_rendered(self, key: str, now: int) -> None:
+        """Mark a cached fragment as recently used."""
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE render_cache SET last_used = ? WHERE key = ?", (now, key)
+            )
+
+    def put_rendered(self, key: str, html: str, now: int) -> None:
+        """Store a rendered fragment."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO render_cache VALUES (?, ?, ?, ?)",
+                (key, html, len(html.encode()), now),
+            )
+
+    def render_cache_size(self) -> int:
+        """Return the total size in bytes of all cached fragments."""
+        with self._connection() as conn:
+            size: int = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM render_cache"
+            ).fetchone()[0]
+        return size
+
+    def evict_rendered(self, max_bytes: int) -> int:
+        """Delete least recently used fragments until at most ``max_bytes`` remain.
+
+        Returns the resulting total size.
+        """
+        with self._connection() as conn:
+            total: int = conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM render_cache"
+            ).fetchone()[0]
+            if total <= max_bytes:
+                return total
+            victims = []
+            for row in conn.execute(
+                "SELECT key, size FROM render_cache ORDER BY last_used"
+            ):
+                if total <= max_bytes:
+                    break
+                victims.append((row["key"],))
+                total -= row["size"]
+            conn.executemany("DELETE FROM render_cache WHERE key = ?", victims)
+        return total
+
+    # Job queue operations
+    def enqueue_job(self, kind: str, run_after: float, max_attempts: int = 3) -> Job:
+        """Queue a ``kind`` job, or coalesce into the one already queued.
+
+        A coalesced request bumps the queued job's ``requests`` count and
+        keeps its original ``run_after``.
+        """
+        with self._connection() as conn:
+            row = conn.execute(
+                "INSERT INTO jobs (kind, max_attempts, run_after, created_at) "
+                "VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (kind) WHERE state = 'queued' "
+                "DO UPDATE SET requests = requests + 1 RETURNING *",
+                (kind, max_attempts, run_after, time.time()),
+            ).fetchone()
+        return self._job_from_row(row)
+
+    def claim_job(self, lease_until: float, now: float | None = None) -> Job | None:
+        """Atomically start the next due job, or reclaim one whose lease expired."""
+        now = time.time() if now is None else now
+        with self._connection() as conn:
+            row = conn.execute(
+                "UPDATE jobs SET state = 'running', attempts = attempts + 1, "
+                "stage = '', progress = 0, started_at = ?, lease_until = ? "
+                "WHERE id = (SELECT id FROM jobs "
+                "WHERE (state = 'queued' AND run_after <= ?) "
+                "OR (state = 'running' AND lease_until < ?) "
+                "ORDER BY run_after, id LIMIT 1) RETURNING *",
+                (now, lease_until, now, now),
+            ).fetchone()
+        return self._job_from_row(row) if row else None
+
+    def next_job_time(self) -> float | None:
+        """Return when the earliest queued job becomes due, if any is queued."""
+        with self._connection() as conn:
+            due: float | None = conn.execute(
+                "SELECT MIN(run_after) FROM jobs WHERE state = 'queued'"
+            ).fetchone()[0]
+        return due
+
+    def update_job_progress(
+        self, job_id: int, stage: str, progress: float, lease_until: float
+    ) -> None:
+        """Record a running job's progress and extend its lease."""
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET stage = ?, progress = ?, lease_until = ? "
+                "WHERE id = ? AND state = 'running'",
+                (stage, progress, lease_until, job_id),
+            )
+
+    def finish_job(
+        self,
+        job_id: int,
+        state: str,
+        result: dict[str, object] | None = None,
+        error: str | None = None,
+    ) -> None:
+        """Mark a job succeeded or failed."""
+        with self._connection() as conn:
+            conn.execute(
+                "UPDATE jobs SET state = ?, result = ?, error = ?, finished_at = ?, "
+                "progress = CASE WHEN ? = 'succeeded' THEN 1 ELSE progress END, "
+                "lease_until = NULL WHERE id = ?",
+                (state, json.dumps(result or {}), error, time.time(), state, job_id),
+            )
+
+    def retry_job(self, job_id: int, error: str, run_after: float) -> bool:
+        """Put a failed attempt back in the queue.
+
+        Returns False when another job of the same kind is already queued;
+        that job will do the same work, so this one should be finished instead.
+        """
+        try:
+            with self._connection() as conn:
+                conn.execute(
+                    "UPDATE jobs SET state = 'queued', error = ?, run_after = ?, "
+                    "lease_until = NULL WHERE id = ?",
+                    (error, run_after, job_id),
+                )
+        except sqlite3.IntegrityError:
+            return False
+        return True
+
+    def get_job(self, job_id: int) -> Job | None:
+        with self._connection() as conn:
+            row = conn.execute("SELECT * FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return self._job_from_row(row) if row else None
+
+    def list_jobs(self, limit: int = 20) -> list[Job]:
+        """Return the most recent jobs, newest first."""
+        with self._connection() as conn:
+            rows = conn.execute(
+                "SELECT * FROM jobs ORDER BY id DESC LIMIT ?", (limit,)
+            ).fetchall()
+        return [self._job_from_row(row) for row in rows]
+
+    def delete_finished_jobs(self, before: float) -> int:
+        """Delete jobs that finished before ``before`` and return how many."""
+        with self._connection() as conn:
+            return conn.execute(
+                "DELETE FROM jobs "
+                "WHERE state IN ('succeeded', 'failed') AND finished_at < ?",
+                (before,),
+            ).rowcount
+
+    @staticmethod
+    def _job_from_row(row: sqlite3.Row) -> Job:
+        return Job(
+            kind=row["kind"],
+            id=row["id"],
+            state=row["state"],
+            attempts=row["attempts"],
+            max_attempts=row["max_attempts"],
+            requests=row["requests"],
+            stage=row["stage"],
+            progress=row["progress"],
+            result=json.loads(row["result"]),
+            error=row["error"],
+            created_at=row["created_at"],
+            started_at=row["started_at"],
+            finished_at=row["finished_at"],
+        )
+
+    # Image operations
+    def get_image(self, content_hash: str) -> StoredImage | None:
+        """Return the stored image with this content hash, if any."""
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT * FROM images WHERE content_hash = ?", (content_hash,)
+            ).fetchone()
+        if row is None:
+            return None
+        return StoredImage(
+            content_hash=row["content_hash"],
+            path=row["path"],
+            width=row["width"],
+            height=row["height"],
+            size=row["size"],
+            created_at=datetime.fromisoformat(row["created_at"]),
+        )
+
+    def image_path_taken(self, path: str) -> bool:
+        """Whether an image is already stored at ``path``."""
+        with self._connection() as conn:
+            return (
+                conn.execute("SELECT 1 FROM images WHERE path = ?", (path,)).fetchone()
+                is not None
+            )
+
+    def save_image(self, image: StoredImage) -> None:
+        """Record an uploaded image."""
+        with self._connection() as conn:
+            conn.execute(
+                "INSERT INTO images VALUES (?, ?, ?, ?, ?, ?)",
+                (
+                    image.content_hash,
+                    image.path,
+                    image.width,
+                    image.height,
+                    image.size,
+                    image.created_at.isoformat(),
+                ),
+            )
+
+    # Content index operations
+    def upsert_content(
+        self,
+        items: Iterable[ContentItem],
+        bodies: Mapping[str, str] | None = None,
+        terms: Mapping[str, Mapping[str, int]] | None = None,
+    ) -> None:
+        """Insert or update index entries, tags and search rows in one transaction.
+
+        ``bodies`` maps paths to markdown bodies for the full-text index; items
+        without one are searchable by title and tags only. ``terms`` maps paths
+        to the weighted terms exported in the static search shard.
+        """
+        items = list(items)
+        bodies = bodies or {}
+        terms = terms or {}
+        with self._connection() as conn:
+            conn.executemany(
+                "DELETE FROM content_tags WHERE path = ?",
+                [(item.path,) for item in items],
+            )
+            conn.executemany(
+                "DELETE FROM content_search WHERE rowid = "
+                "(SELECT rowid FROM content_index WHERE path = ?)",
+                [(item.path,) for item in items],
+            )
+            # ON CONFLICT keeps the rowid stable, unlike INSERT OR REPLACE
+            conn.executemany(
+                "INSERT INTO content_index VALUES (?, ?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (path) DO UPDATE SET sha = excluded.sha, "
+                "title = excluded.title, date = excluded.date, type = excluded.type, "
+                "slug = excluded.slug, tags = excluded.tags",
+                [
+                    (
+                        item.path,
+                        item.sha,
+                        item.title,
+                        item.date,
+                        item.type,
+                        item.slug,
+                        json.dumps(item.tags),
+                    )
+                    for item in items
+                ],
+            )
+            conn.executemany(
+                "INSERT OR IGNORE INTO content_tags VALUES (?, ?, ?)",
+                [(tag, item.date, item.path) for item in items for tag in item.tags],
+            )
+            conn.executemany(
+                "INSERT INTO content_search (rowid, title, tags, body) "
+                "SELECT rowid, ?, ?, ? FROM content_index WHERE path = ?",
+                [
+                    (
+                        item.title,
+                        " ".join(item.tags),
+                        bodies.get(item.path, ""),
+                        item.path,
+                    )
+                    for item in items
+                ],
+            )
+            conn.executemany(
+                "INSERT OR REPLACE INTO content_terms VALUES (?, ?)",
+                [(item.path, json.dumps(terms.get(item.path, {}))) for item in items],
+            )
+
+    def delete_content(self, paths: Iterable[str]) -> None:
+        """Remove index entries for ``paths``."""
+        rows = [(path,) for path in paths]
+        with self._connection() as conn:
+            conn.executemany("DELETE FROM content_tags WHERE path = ?", rows)
+            conn.executemany(
+                "DELETE FROM content_search WHERE rowid = "
+                "(SELECT rowid FROM content_index WHERE path = ?)",
+                rows,
+            )
+            conn.executemany("DELETE FROM content_terms WHERE path = ?", rows)
+            conn.executemany("DELETE FROM content_index WHERE path = ?", rows)
+
+    def get_content_shas(self) -> dict[str, str]:
+        """Return the blob SHA each indexed path was parsed from."""
+        with self._connection() as conn:
+            return dict(conn.execute("SELECT path, sha FROM content_index").fetchall())
+
+    def list_content(
+        self,
+        content_type: str | None = None,
+        tag: str | None = None,
+        before: tuple[str, str] | None = None,
+        limit: int = 50,
+    ) -> list[ContentItem]:
+        """List indexed content newest first, optionally filtered by type and tag.
+
+        ``before`` is a (date, path) keyset cursor: only items ordered after it
+        are returned, so each page is an index range scan however deep it is.
+        """
+        if tag is not None:
+            sql = (
+                f"SELECT {CONTENT_COLUMNS} FROM content_tags t "
+                "JOIN content_index c ON c.path = t.path WHERE t.tag = ?"
+            )
+            params: list[object] = [tag]
+            order = "t.date DESC, t.path DESC"
+            key = "(t.date, t.path)"
+        else:
+            sql = f"SELECT {CONTENT_COLUMNS} FROM content_index c WHERE 1"
+            params = []
+            order = "c.date DESC, c.path DESC"
+            key = "(c.date, c.path)"
+        if content_type is not None:
+            sql += " AND c.type = ?"
+            params.append(content_type)
+        if before is not None:
+            sql += f" AND {key} < (?, ?)"
+            params.extend(before)
+        sql += f" ORDER BY {order} LIMIT ?"
+        params.append(limit)
+
+        return self._fetch(_content_item_row, sql, params)
+
+    def iter_content_bodies(
+        self, content_type: str | None = None
+    ) -> Iterator[tuple[ContentItem, str]]:
+        """Yield every indexed item newest first with its markdown body.
+
+        Rows are streamed off the cursor, so callers see one item at a time
+        however large the index is.
+        """
+        sql = (
+            f"SELECT {CONTENT_COLUMNS}, s.body FROM content_index c "
+            "JOIN content_search s ON s.rowid = c.rowid"
+        )
+        params: list[object] = []
+        if content_type is not None:
+            sql += " WHERE c.type = ?"
+            params.append(content_type)
+        sql += " ORDER BY c.date DESC, c.path DESC"
+        cursor = self._connection().execute(sql, params)
+        cursor.row_factory = lambda cursor, row: (
+            _content_item_row(cursor, row),
+            row[-1],
+        )
+        yield from cursor
+
+    def search_content(self, match: str, limit: int = 20) -> list[SearchHit]:
+        """Run an FTS5 ``match`` expression, best BM25 score first.
+
+        Title matches weigh 10x and tag matches 5x a body match. Snippets come
+        from the body and mark hits with ``SNIPPET_START``/``SNIPPET_END`` so
+        callers can escape the surrounding text before adding markup.
+        """
+        return self._fetch(
+            lambda cursor, row: SearchHit(
+                _content_item_row(cursor, row), row[-2], -row[-1]
+            ),
+            f"SELECT {CONTENT_COLUMNS}, "
+            "snippet(content_search, 2, ?, ?, '…', 16) AS snippet, "
+            "bm25(content_search, 10.0, 5.0, 1.0) AS score "
+            "FROM content_search "
+            "JOIN content_index c ON c.rowid = content_search.rowid "
+            "WHERE content_search MATCH ? ORDER BY score LIMIT ?",
+            (SNIPPET_START, SNIPPET_END, match, limit),
+        )
+
+    def get_content_terms(self) -> dict[str, dict[str, int]]:
+        """Return the weighted terms of every indexed file, keyed by path."""
+        with self._connection() as conn:
+            rows = conn.execute("SELECT path, terms FROM content_terms").fetchall()
+        return {row["path"]: json.loads(row["terms"]) for row in rows}
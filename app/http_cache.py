@@ -0,0 +1,250 @@
+# ABOUTME: ASGI middleware adding ETags, Cache-Control, 304 revalidation and compression
+# ABOUTME: Compressed bodies of hot documents are cached by URL, ETag and encoding
+import gzip
+import hashlib
+import importlib.util
+from collections.abc import Awaitable, Callable, MutableMapping
+from typing import Any
+
+from starlette.datastructures import Headers, MutableHeaders
+
+from app.cache import MISSING, LRUCache
+from app.metrics import metrics
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+# Brotli needs the optional `brotli` package; gzip is always available
+BROTLI_AVAILABLE = importlib.util.find_spec("brotli") is not None
+
+# Responses smaller than this are sent uncompressed
+MINIMUM_SIZE = 1024
+
+# Compressed variants kept in memory, and the largest body worth caching
+COMPRESSED_CACHE_SIZE = 256
+MAX_CACHED_BODY = 1024 * 1024
+
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5
+
+COMPRESSIBLE_TYPES = (
+    "text/",
+    "application/json",
+    "application/xml",
+    "application/javascript",
+    "application/rss+xml",
+    "application/atom+xml",
+    "image/svg+xml",
+)
+
+# Outcomes: not_modified, compressed (encoded now) or compressed_cached
+http_cache_responses = metrics.counter(
+    "blogbot_http_cache_responses_total",
+    "Responses revalidated or compressed",
+    ["outcome"],
+)
+
+# Authenticated API responses may only be cached by the requesting client and
+# must be revalidated; everything else is revalidated too but may be shared
+API_CACHE_CONTROL = "private, no-cache"
+DEFAULT_CACHE_CONTROL = "no-cache"
+
+
+def make_etag(body: bytes) -> str:
+    """Strong ETag for a response body."""
+    return f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def _opaque(etag: str) -> str:
+    """Reduce an ETag to its identity form for comparison.
+
+    Drops a weak prefix and the ``-gzip``/``-br`` suffix added to encoded
+    variants, so a client holding either representation revalidates.
+    """
+    etag = etag.strip()
+    if etag.startswith("W/"):
+        etag = etag[2:]
+    for suffix in ('-gzip"', '-br"'):
+        if etag.endswith(suffix):
+            return etag[: -len(suffix)] + '"'
+    return etag
+
+
+def etag_matches(headers: Headers, etag: str) -> bool:
+    """Whether the request's ``If-None-Match`` covers ``etag``."""
+    header = headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return _opaque(etag) in {_opaque(tag) for tag in header.split(",")}
+
+
+def _accepted_encodings(headers: Headers) -> dict[str, float]:
+    accepted: dict[str, float] = {}
+    for part in headers.get("accept-encoding", "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        quality = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+        accepted[name.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(headers: Headers) -> str | None:
+    """Pick brotli or gzip from ``Accept-Encoding``, or None for identity."""
+    accepted = _accepted_encodings(headers)
+    candidates = ["br", "gzip"] if BROTLI_AVAILABLE else ["gzip"]
+    best = None
+    for name in candidates:
+        quality = accepted.get(name, accepted.get("*", 0.0))
+        if quality > 0 and (best is None or quality > best[1]):
+            best = (name, quality)
+    return best[0] if best else None
+
+
+def compress(body: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        import brotli
+
+        compressed: bytes = brotli.compress(body, quality=BROTLI_QUALITY)
+        return compressed
+    return gzip.compress(body, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+class HTTPCacheMiddleware:
+    """Add validators to GET/HEAD responses and compress large text responses.
+
+    Complete GET/HEAD 200 responses get a strong ETag (kept if the route already set
+    one, e.g. from a git blob SHA), a default ``Cache-Control`` and
+    ``Vary: Accept-Encoding``. A matching ``If-None-Match`` turns the
+    response into a bodiless 304. Large text responses are compressed with
+    brotli or gzip, and the compressed bytes are cached by URL and ETag so
+    polling clients never pay for compression twice. The URL is part of the
+    key because route ETags such as blob SHAs repeat across paths whose
+    responses differ. Streaming responses (no
+    ``Content-Length``, e.g. server-sent events) pass through untouched.
+    """
+
+    def __init__(
+        self,
+        app: ASGIApp,
+        minimum_size: int = MINIMUM_SIZE,
+        cache_size: int = COMPRESSED_CACHE_SIZE,
+    ):
+        self.app = app
+        self.minimum_size = minimum_size
+        self.compressed: LRUCache[tuple[str, str, str], bytes] = LRUCache(cache_size)
+        self.compressions = 0
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        request_headers = Headers(scope=scope)
+        start: Message | None = None
+        chunks: list[bytes] = []
+        passthrough = False
+
+        async def capture(message: Message) -> None:
+            nonlocal start, passthrough
+            if passthrough:
+                await send(message)
+            elif message["type"] == "http.response.start":
+                headers = Headers(raw=message["headers"])
+                status = message["status"]
+                if status == 304 or (
+                    status == 200
+                    and "content-length" in headers
+                    and "content-encoding" not in headers
+                ):
+                    start = message
+                else:
+                    passthrough = True
+                    await send(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body", False):
+                    assert start is not None
+                    await self._respond(
+                        scope, request_headers, start, b"".join(chunks), send
+                    )
+
+        await self.app(scope, receive, capture)
+
+    async def _respond(
+        self, scope: Scope, request: Headers, start: Message, body: bytes, send: Send
+    ) -> None:
+        headers = MutableHeaders(raw=list(start["headers"]))
+        if "cache-control" not in headers:
+            headers["Cache-Control"] = (
+                API_CACHE_CONTROL
+                if scope["path"].startswith("/api/")
+                else DEFAULT_CACHE_CONTROL
+            )
+        if start["status"] == 304:
+            await send({**start, "headers": headers.raw})
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        # Only safe methods are validated; other responses are just compressed
+        validate = scope["method"] in ("GET", "HEAD")
+        etag = headers.get("etag") or make_etag(body)
+        content_type = headers.get("content-type", "")
+        compressible = content_type.startswith(COMPRESSIBLE_TYPES)
+        if compressible:
+            headers.add_vary_header("Accept-Encoding")
+
+        encoding = None
+        if compressible and len(body) >= self.minimum_size:
+            encoding = choose_encoding(request)
+        if encoding:
+            etag = etag[:-1] + f'-{encoding}"'
+
+        if validate:
+            headers["ETag"] = etag
+        if validate and etag_matches(request, etag):
+            del headers["content-length"]
+            if "content-type" in headers:
+                del headers["content-type"]
+            http_cache_responses.inc("not_modified")
+            await send(
+                {"type": "http.response.start", "status": 304, "headers": headers.raw}
+            )
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        if encoding:
+            url = scope["path"] + "?" + scope.get("query_string", b"").decode("latin-1")
+            body = self._compressed((url, etag, encoding), body)
+            headers["Content-Encoding"] = encoding
+            headers["Content-Length"] = str(len(body))
+        await send({**start, "headers": headers.raw})
+        await send(
+            {
+                "type": "http.response.body",
+                "body": b"" if scope["method"] == "HEAD" else body,
+            }
+        )
+
+    def _compressed(self, key: tuple[str, str, str], body: bytes) -> bytes:
+        cached = self.compressed.get(key)
+        if cached is not MISSING:
+            http_cache_responses.inc("compressed_cached")
+            return cached
+        data = compress(body, key[2])
+        self.compressions += 1
+        http_cache_responses.inc("compressed")
+        if len(body) <= MAX_CACHED_BODY:
+            self.compressed.put(key, data)
+        return data
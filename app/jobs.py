@@ -0,0 +1,193 @@
+# ABOUTME: Durable background job queue persisted in SQLite with an asyncio worker
+# ABOUTME: Coalesces request bursts per job kind, retries failures and records progress
+import asyncio
+import contextlib
+import logging
+import time
+from collections.abc import Awaitable, Callable
+from typing import Any
+
+from app.database import Database
+from app.metrics import metrics
+from app.models import Job
+
+logger = logging.getLogger("blogbot.jobs")
+
+# Attempts by outcome: succeeded, retried or failed
+job_attempts = metrics.counter(
+    "blogbot_job_attempts_total",
+    "Background job attempts by outcome",
+    ["kind", "outcome"],
+)
+job_seconds = metrics.histogram(
+    "blogbot_job_duration_seconds", "Background job attempt duration", ["kind"]
+)
+
+# Seconds a claimed job may go without a heartbeat before another worker reclaims it
+LEASE_SECONDS = 60.0
+
+# Longest idle sleep; bounds how late jobs queued by other processes are noticed
+POLL_INTERVAL = 5.0
+
+# Delay before the first retry of a failed attempt, doubled for each further one
+RETRY_DELAY = 10.0
+
+# Finished jobs older than this are deleted
+JOB_RETENTION = 7 * 24 * 3600.0
+
+# Reports a running job's step and fraction done (0 to 1)
+Progress = Callable[[str, float], None]
+JobHandler = Callable[[Job, Progress], Awaitable[dict[str, Any]]]
+
+
+class JobError(Exception):
+    """Raised by handlers for failures that retrying cannot fix."""
+
+
+class JobWorker:
+    """Run queued jobs one at a time on the application's event loop.
+
+    Jobs live in the ``jobs`` table so they survive restarts, and a claimed
+    job holds a lease that the worker renews while it runs; a job whose
+    worker died is picked up again once the lease lapses. Enqueueing a kind
+    that is already queued coalesces into the queued job, and a per-kind
+    ``debounce`` delays new jobs so a burst of requests becomes one run.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        lease: float = LEASE_SECONDS,
+        poll_interval: float = POLL_INTERVAL,
+        retry_delay: float = RETRY_DELAY,
+    ):
+        self.db = db
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.retry_delay = retry_delay
+        self._handlers: dict[str, JobHandler] = {}
+        self._debounce: dict[str, float] = {}
+        self._wake = asyncio.Event()
+        self._task: asyncio.Task[None] | None = None
+        self._loop: asyncio.AbstractEventLoop | None = None
+
+    def register(self, kind: str, handler: JobHandler, debounce: float = 0.0) -> None:
+        """Run ``handler`` for ``kind`` jobs, ``debounce`` seconds after queueing."""
+        self._handlers[kind] = handler
+        self._debounce[kind] = debounce
+
+    def enqueue(self, kind: str) -> Job:
+        """Queue a ``kind`` job (or join the queued one) and wake the worker."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for {kind!r} jobs")
+        job = self.db.enqueue_job(kind, time.time() + self._debounce[kind])
+        self._notify()
+        return job
+
+    def _notify(self) -> None:
+        # Sync routes run in a thread pool, away from the worker's loop
+        if self._loop is None:
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is self._loop:
+            self._wake.set()
+        else:
+            self._loop.call_soon_threadsafe(self._wake.set)
+
+    async def run_once(self) -> Job | None:
+        """Claim and run the next due job; return it finished, or None if none was."""
+        job = self.db.claim_job(time.time() + self.lease)
+        if job is None:
+            return None
+        assert job.id is not None
+        job_id = job.id
+        current = ("", 0.0)
+
+        def progress(stage: str, fraction: float) -> None:
+            nonlocal current
+            current = (stage, fraction)
+            self.db.update_job_progress(
+                job_id, stage, fraction, time.time() + self.lease
+            )
+
+        async def heartbeat() -> None:
+            while True:
+                await asyncio.sleep(self.lease / 3)
+                self.db.update_job_progress(job_id, *current, time.time() + self.lease)
+
+        handler = self._handlers.get(job.kind)
+        beat = asyncio.create_task(heartbeat())
+        started = time.perf_counter()
+        try:
+            if handler is None:
+                raise JobError(f"No handler registered for {job.kind!r} jobs")
+            if job.attempts > job.max_attempts:
+                raise JobError(f"Gave up after {job.max_attempts} attempts")
+            result = await handler(job, progress)
+        except JobError as exc:
+            logger.warning("Job %s (%s) failed: %s", job_id, job.kind, exc)
+            self.db.finish_job(job_id, "failed", error=str(exc))
+            job_attempts.inc(job.kind, "failed")
+        except Exception as exc:
+            logger.exception(
+                "Job %s (%s) attempt %s failed", job_id, job.kind, job.attempts
+            )
+            error = f"{type(exc).__name__}: {exc}"
+            retry_at = time.time() + self.retry_delay * 2 ** (job.attempts - 1)
+            if job.attempts >= job.max_attempts:
+                self.db.finish_job(job_id, "failed", error=error)
+                job_attempts.inc(job.kind, "failed")
+            elif not self.db.retry_job(job_id, error, retry_at):
+                # A newer queued job of the same kind will redo this work
+                self.db.finish_job(job_id, "failed", error=f"{error} (superseded)")
+                job_attempts.inc(job.kind, "failed")
+            else:
+                job_attempts.inc(job.kind, "retried")
+        else:
+            self.db.finish_job(job_id, "succeeded", result=result)
+            job_attempts.inc(job.kind, "succeeded")
+            logger.info("Job %s (%s) succeeded", job_id, job.kind)
+        finally:
+            beat.cancel()
+            job_seconds.observe(time.perf_counter() - started, job.kind)
+        return self.db.get_job(job_id)
+
+    def _idle_timeout(self) -> float:
+        due = self.db.next_job_time()
+        if due is None:
+            return self.poll_interval
+        return min(self.poll_interval, max(0.0, due - time.time()))
+
+    async def _run(self) -> None:
+        while True:
+            # Cleared before looking for work so an enqueue during a run is not missed
+            self._wake.clear()
+            try:
+                self.db.delete_finished_jobs(time.time() - JOB_RETENTION)
+                while await self.run_once() is not None:
+                    pass
+                timeout = self._idle_timeout()
+            except Exception:
+                logger.exception("Job worker error")
+                timeout = self.poll_interval
+            with contextlib.suppress(TimeoutError):
+                await asyncio.wait_for(self._wake.wait(), timeout)
+
+    async def start(self) -> None:
+        """Start the worker task on the running event loop."""
+        if self._task is None:
+            self._loop = asyncio.get_running_loop()
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel the worker; a job it was running is reclaimed after its lease."""
+        if self._task is None:
+            return
+        self._task.cancel()
+        with contextlib.suppress(asyncio.CancelledError):
+            await self._task
+        self._task = None
+        self._loop = None
@@ -0,0 +1,83 @@
+# ABOUTME: ASGI middleware rejecting JSON request bodies that are not JSON objects
+# ABOUTME: FastHTML turns JSON bodies into form data before routing and fails on others
+import json
+from collections.abc import Awaitable, Callable, Iterable, MutableMapping
+from typing import Any
+
+from starlette.responses import JSONResponse
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+Receive = Callable[[], Awaitable[Message]]
+Send = Callable[[Message], Awaitable[None]]
+ASGIApp = Callable[[Scope, Receive, Send], Awaitable[None]]
+
+
+def _content_type(scope: Scope) -> str:
+    headers: Iterable[tuple[bytes, bytes]] = scope.get("headers", [])
+    for name, value in headers:
+        if name == b"content-type":
+            return value.decode("latin-1").split(";")[0].strip().lower()
+    return ""
+
+
+class JSONBodyMiddleware:
+    """Answer 400 to ``application/json`` requests whose body is not a JSON object.
+
+    FastHTML turns every JSON body into a dict of form fields, even for
+    beforeware, so arrays, scalars and malformed JSON would otherwise
+    surface as 500s before any handler could validate them. Valid bodies
+    are replayed to the app unchanged.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or _content_type(scope) != "application/json":
+            await self.app(scope, receive, send)
+            return
+
+        chunks: list[bytes] = []
+        while True:
+            message = await receive()
+            if message["type"] != "http.request":
+                # Client went away; let the app see the disconnect
+                await self.app(scope, receive, send)
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+
+        detail = None
+        if body:
+            try:
+                data = json.loads(body)
+            except ValueError:
+                detail = "The body is not valid JSON"
+            else:
+                if not isinstance(data, dict):
+                    detail = "The body must be a JSON object"
+        if detail is not None:
+            response = JSONResponse(
+                {
+                    "error": "Invalid request body",
+                    "detail": detail,
+                    "action": "Send a JSON object",
+                },
+                status_code=400,
+            )
+            await response(scope, receive, send)
+            return
+
+        replayed = False
+
+        async def replay() -> Message:
+            nonlocal replayed
+            if replayed:
+                return await receive()
+            replayed = True
+            return {"type": "http.request", "body": body, "more_body": False}
+
+        await self.app(scope, replay, send)
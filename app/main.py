@@ -2,35 +2,126 @@
 # ABOUTME: Sets up the web server, routes, and database connections
 # mypy: disable-error-code="name-defined,no-any-return"
 
+import asyncio
+import json
 import logging
-import sys
+import os
+from collections.abc import Callable
+from dataclasses import asdict
+from functools import partial
 
 from fasthtml.common import *  # type: ignore
-from app.database import Database
-from app.models import Settings
-
-# Configure structured logging
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s [%(levelname)s] %(name)s: %(message)s",
-    handlers=[logging.StreamHandler(sys.stdout)],
+from starlette.middleware import Middleware
+from starlette.responses import StreamingResponse
+
+from app.auth import PUBLIC_PATHS, require_api_key
+from app.database import SETTINGS_FIELDS, Database
+from app.http_cache import BROTLI_AVAILABLE, HTTPCacheMiddleware
+from app.jobs import JobError, JobWorker
+from app.json_body import JSONBodyMiddleware
+from app.logs import configure_logging
+from app.metrics import CONTENT_TYPE, RequestMetricsMiddleware, metrics
+from app.models import Job, Settings
+from app.services.github import (
+    GITHUB_API_URL,
+    HTTP2_AVAILABLE,
+    ETagCache,
+    GitHubClient,
+    GitHubError,
+    git_blob_sha,
+    new_etag_cache,
+)
+from app.services.images import (
+    PILLOW_AVAILABLE,
+    image_markup,
+    is_image_path,
+    store_image,
+    variant_paths,
 )
+from app.services.markdown import FrontmatterError, parse_post
+from app.services.preview import Block, BlockRenderer, diff_blocks
+from app.services.render_cache import RenderCache
+from app.services.search import content_url, highlight, search
+from app.usage import APIKeyUsageTracker
+
 logger = logging.getLogger("blogbot")
 
-# Initialize database
-db = Database()
-logger.info("📊 Database initialized")
+# Opened lazily; the schema is brought up to date by startup() below
+db = Database(os.environ.get("BLOGBOT_DB", "blog.db"))
+
+# Rendered markdown reused across site builds
+render_cache = RenderCache(db)
+
+# Rendered blocks of the editor preview, so an edit re-renders only its own blocks
+preview_blocks = BlockRenderer(render_cache)
+
+# Batched API key last_used tracking; authenticated routes call usage.record()
+usage = APIKeyUsageTracker(db)
+
+# Background publish jobs; a burst of publish requests within the debounce
+# window coalesces into a single build
+PUBLISH_DEBOUNCE = 2.0
+jobs = JobWorker(db)
+
+# Where publish jobs build the site, cache image variants and (optionally)
+# keep a git mirror of the content repo instead of fetching via the API
+SITE_DIR = os.environ.get("BLOGBOT_SITE_DIR", "site")
+IMAGE_CACHE_DIR = os.environ.get("BLOGBOT_IMAGE_CACHE", "image-cache")
+MIRROR_DIR = os.environ.get("BLOGBOT_MIRROR")
+
+# Processes rendering and minifying pages during a publish job
+PUBLISH_WORKERS = int(os.environ.get("BLOGBOT_WORKERS") or os.cpu_count() or 1)
+
+# Seconds between job progress checks on an event stream
+JOB_EVENTS_INTERVAL = 0.5
+
+
+# (feature, whether its optional dependency is installed, poetry extra providing it)
+OPTIONAL_FEATURES = (
+    ("Image variants, WebP and srcset", PILLOW_AVAILABLE, "images"),
+    ("HTTP/2 to the GitHub API", HTTP2_AVAILABLE, "http2"),
+    ("Brotli compression", BROTLI_AVAILABLE, "brotli"),
+)
 
-# Create the FastHTML app
-app = FastHTML()
 
-logger.info("🚀 BlogBot FastHTML application starting up...")
+def startup() -> None:
+    """Configure logging and the database schema before serving requests.
+
+    Done in the lifespan startup rather than at import, so importing the app
+    (tests, tooling, worker boot) stays cheap and free of side effects.
+    """
+    # Structured JSON logs; records emitted while serving a request carry its ID
+    configure_logging(os.environ.get("BLOGBOT_LOG_LEVEL", "INFO"))
+    db.init_schema()
+    logger.info("BlogBot starting up")
+    for feature, available, extra in OPTIONAL_FEATURES:
+        if not available:
+            logger.warning(
+                "%s disabled; install blogbot[%s] to enable it", feature, extra
+            )
+
+
+# Only /api/ paths require an API key; db is looked up per request so tests can swap it
+api_auth = Beforeware(lambda req: require_api_key(req, db, usage), skip=[PUBLIC_PATHS])
+
+# Create the FastHTML app; usage is flushed before pooled connections are released.
+# Requests are timed and logged by RequestMetricsMiddleware, and responses get
+# ETags, Cache-Control and compression from HTTPCacheMiddleware. JSONBodyMiddleware
+# turns JSON bodies FastHTML cannot parse into form data into 400s.
+app = FastHTML(
+    before=api_auth,
+    middleware=[
+        Middleware(RequestMetricsMiddleware),
+        Middleware(HTTPCacheMiddleware),
+        Middleware(JSONBodyMiddleware),
+    ],
+    on_startup=[startup, usage.start, jobs.start],
+    on_shutdown=[jobs.stop, usage.stop, db.close],
+)
 
 
 @app.get("/")
 def home():  # type: ignore
-    logger.info("🏠 Home page accessed")
-    
     # Get current settings to show database integration
     settings = db.get_settings()
     status_text = "Phase 1 Development in Progress"
@@ -50,10 +141,419 @@ def home():  # type: ignore
     )
 
 
+def preview_block(block: Block):  # type: ignore
+    return Div(NotStr(block.html), id=block.id)
+
+
+@app.post("/preview")
+def preview(content: str = "", blocks: str | None = None):  # type: ignore
+    """Render the editor's markdown (frontmatter stripped) into the preview pane.
+
+    Without ``blocks`` the whole pane is returned. Given the comma-separated
+    IDs of the blocks the pane shows (the editor sends them through hx-vals),
+    only the changed blocks come back, as out-of-band deletes and inserts.
+    Frontmatter that does not parse yet (mid-keystroke) is skipped.
+    """
+    settings = db.get_settings()
+    theme = settings.theme if settings else "default"
+    try:
+        body = parse_post("preview.md", content).body
+    except FrontmatterError as exc:
+        body = exc.body
+    rendered = preview_blocks.render(body, theme)
+    if blocks is None:
+        return Div(*map(preview_block, rendered), id="preview")
+
+    diff = diff_blocks(
+        [block_id for block_id in blocks.split(",") if block_id], rendered
+    )
+    deletes = [Div(id=block_id, hx_swap_oob="delete") for block_id in diff.deleted]
+    inserts = [
+        Div(
+            preview_block(block),
+            hx_swap_oob=f"afterend:#{after}" if after else "afterbegin:#preview",
+        )
+        for after, block in diff.inserted
+    ]
+    return (*deletes, *inserts, HtmxResponseHeaders(reswap="none"))
+
+
+@app.get("/api/content")
+def list_content(  # type: ignore
+    type: str | None = None,  # noqa: A002 - mirrors the ?type= query parameter
+    tag: str | None = None,
+    before: str | None = None,
+    limit: int = 50,
+):
+    """List indexed content newest first with keyset pagination.
+
+    ``before`` is either an ISO date or the ``next`` cursor of a previous page.
+    """
+    cursor = None
+    if before:
+        date, _, path = before.partition("|")
+        cursor = (date, path)
+    limit = max(1, min(limit, 200))
+    items = db.list_content(content_type=type, tag=tag, before=cursor, limit=limit)
+    next_cursor = f"{items[-1].date}|{items[-1].path}" if len(items) == limit else None
+    return {
+        "items": [
+            {key: value for key, value in asdict(item).items() if key != "sha"}
+            for item in items
+        ],
+        "next": next_cursor,
+    }
+
+
+@app.get("/api/search")
+def search_content(q: str = "", limit: int = 20):  # type: ignore
+    """Full-text search over titles, tags and bodies, best match first."""
+    hits = search(db, q, limit=max(1, min(limit, 100)))
+    return {
+        "query": q,
+        "results": [
+            {
+                "path": hit.item.path,
+                "title": hit.item.title,
+                "date": hit.item.date,
+                "type": hit.item.type,
+                "tags": hit.item.tags,
+                "url": content_url(
+                    hit.item.path,
+                    hit.item.title,
+                    hit.item.date,
+                    hit.item.type,
+                    hit.item.slug,
+                ),
+                "snippet": highlight(hit.snippet),
+                "score": round(hit.score, 4),
+            }
+            for hit in hits
+        ],
+    }
+
+
+# GitHub ETags shared by every request's client, so repeat reads are free 304s
+github_etags: ETagCache = new_etag_cache()
+
+
+def github_client() -> GitHubClient:
+    """Client for the content repository, authenticated by GITHUB_TOKEN."""
+    return GitHubClient(
+        os.environ.get("GITHUB_TOKEN"),
+        os.environ.get("GITHUB_API_URL", GITHUB_API_URL),
+        etag_cache=github_etags,
+    )
+
+
+def settings_required(detail: str) -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": "Blog not configured",
+            "detail": detail,
+            "action": "Configure the blog settings first",
+        },
+        status_code=409,
+    )
+
+
+# Settings that PUT /api/settings can clear with null; the rest must be strings
+NULLABLE_SETTINGS = {"github_pages_url", "custom_css"}
+REQUIRED_SETTINGS = ("blog_title", "blog_description", "github_repo")
+
+
+def invalid_settings(detail: str) -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": "Invalid settings",
+            "detail": detail,
+            "action": f"Send a JSON object with any of: {', '.join(SETTINGS_FIELDS)}",
+        },
+        status_code=400,
+    )
+
+
+@app.get("/api/settings")
+def get_settings():  # type: ignore
+    settings = db.get_settings()
+    if settings is None:
+        return JSONResponse(
+            {
+                "error": "Blog not configured",
+                "detail": "No settings have been saved yet",
+                "action": f"PUT /api/settings with {', '.join(REQUIRED_SETTINGS)}",
+            },
+            status_code=404,
+        )
+    return asdict(settings)
+
+
+@app.put("/api/settings")
+async def put_settings(req):  # type: ignore
+    """Update only the fields in the body; the first save needs the required ones."""
+    try:
+        changes = await req.json()
+    except ValueError:
+        return invalid_settings("The body is not valid JSON")
+    if not isinstance(changes, dict):
+        return invalid_settings("The body must be a JSON object")
+    unknown = sorted(set(changes).difference(SETTINGS_FIELDS))
+    if unknown:
+        return invalid_settings(f"Unknown fields: {', '.join(unknown)}")
+    for name, value in changes.items():
+        if not isinstance(value, str) and not (
+            value is None and name in NULLABLE_SETTINGS
+        ):
+            return invalid_settings(f"'{name}' must be a string")
+
+    settings = db.update_settings(changes)
+    if settings is None:
+        missing = [name for name in REQUIRED_SETTINGS if name not in changes]
+        if missing:
+            return invalid_settings(f"First save needs: {', '.join(missing)}")
+        settings = Settings(**changes)
+        db.save_settings(settings)
+    return asdict(settings)
+
+
+@app.get("/api/content/{path:path}")
+async def get_content(path: str):  # type: ignore
+    """Return one file of the content repo; its git blob SHA is the ETag."""
+    settings = db.get_settings()
+    if settings is None:
+        return settings_required("Content is read from the repository in the settings")
+    try:
+        async with github_client() as client:
+            data = await client.get_file(
+                settings.github_repo, path, settings.github_branch
+            )
+    except GitHubError as exc:
+        return JSONResponse(exc.to_dict(), status_code=exc.status)
+    sha = git_blob_sha(data)
+    return JSONResponse(
+        {"path": path, "sha": sha, "content": data.decode("utf-8", errors="replace")},
+        headers={"ETag": f'"{sha}"'},
+    )
+
+
+@app.post("/api/images")
+async def upload_image(file: UploadFile, alt: str = ""):  # type: ignore
+    """Store an image in the content repo once per content; return the embed."""
+    if not is_image_path(file.filename or ""):
+        return JSONResponse(
+            {
+                "error": "Unsupported file type",
+                "detail": f"'{file.filename}' is not a PNG, JPEG, GIF or WebP image",
+                "action": "Upload a .png, .jpg, .jpeg, .gif or .webp file",
+            },
+            status_code=400,
+        )
+    settings = db.get_settings()
+    if settings is None:
+        return settings_required(
+            "Images are stored in the content repository from the settings"
+        )
+
+    data = await file.read()
+    try:
+        async with github_client() as client:
+            image, duplicate = await store_image(
+                db,
+                client,
+                settings.github_repo,
+                settings.github_branch,
+                file.filename or "",
+                data,
+            )
+    except GitHubError as exc:
+        return JSONResponse(exc.to_dict(), status_code=exc.status)
+
+    return {
+        "path": image.path,
+        "markdown": image_markup(image.path, image.width, image.height, alt),
+        "variants": variant_paths(image.path, image.width),
+        "width": image.width,
+        "height": image.height,
+        "deduplicated": duplicate,
+    }
+
+
+async def publish_job(
+    job: Job, progress: Callable[[str, float], None], dry_run: bool = False
+) -> dict:
+    """Fetch, build and publish the site; configuration errors are not retried.
+
+    A ``dry_run`` builds and reports what would be published without pushing.
+    """
+    # The build pipeline is only needed once something is published
+    from app.services.mirror import ContentMirror, github_remote_url
+    from app.services.pipeline import run_publish
+
+    mirror = None
+    if MIRROR_DIR:
+        settings = db.get_settings()
+        if settings is not None:
+            remote = github_remote_url(
+                settings.github_repo, os.environ.get("GITHUB_TOKEN")
+            )
+            mirror = ContentMirror(MIRROR_DIR, remote, settings.github_branch)
+    try:
+        async with github_client() as client:
+            report = await run_publish(
+                db,
+                client,
+                SITE_DIR,
+                IMAGE_CACHE_DIR,
+                render_cache,
+                mirror,
+                progress,
+                dry_run=dry_run,
+                workers=PUBLISH_WORKERS,
+            )
+    except ValueError as exc:
+        raise JobError(str(exc)) from exc
+    return report.to_dict()
+
+
+jobs.register("publish", publish_job, debounce=PUBLISH_DEBOUNCE)
+jobs.register(
+    "publish_dry_run", partial(publish_job, dry_run=True), debounce=PUBLISH_DEBOUNCE
+)
+
+
+def job_dict(job: Job) -> dict:
+    return {
+        **asdict(job),
+        "url": f"/api/jobs/{job.id}",
+        "events": f"/api/jobs/{job.id}/events",
+    }
+
+
+def job_not_found(job_id: int) -> JSONResponse:
+    return JSONResponse(
+        {
+            "error": "Job not found",
+            "detail": f"There is no job {job_id}",
+            "action": "Check the job id; finished jobs are deleted after a week",
+        },
+        status_code=404,
+    )
+
+
+@app.post("/api/publish")
+def publish(dry_run: bool = False):  # type: ignore
+    """Queue a publish of the site and return the job immediately.
+
+    Requests arriving while a publish is still queued join that job instead
+    of starting another build. With ``dry_run=1`` the job builds the site and
+    its result lists per-step timings and the files that would be added,
+    changed or deleted, without pushing.
+    """
+    job = jobs.enqueue("publish_dry_run" if dry_run else "publish")
+    return JSONResponse(
+        {**job_dict(job), "coalesced": job.requests > 1}, status_code=202
+    )
+
+
+@app.get("/api/jobs")
+def list_jobs(limit: int = 20):  # type: ignore
+    return {"jobs": [job_dict(job) for job in db.list_jobs(max(1, min(limit, 100)))]}
+
+
+@app.get("/api/jobs/{job_id}")
+def get_job(req, job_id: int):  # type: ignore
+    """Return a job's state; htmx requests get a fragment polling until it finishes."""
+    job = db.get_job(job_id)
+    if job is None:
+        return job_not_found(job_id)
+    if not req.headers.get("hx-request"):
+        return job_dict(job)
+    status = (
+        f"{job.state}: {job.stage}" if job.stage and not job.finished else job.state
+    )
+    polling = (
+        {}
+        if job.finished
+        else {
+            "hx_get": f"/api/jobs/{job_id}",
+            "hx_trigger": "every 1s",
+            "hx_swap": "outerHTML",
+        }
+    )
+    return Div(
+        Progress(value=f"{job.progress:.2f}", max="1"),
+        Span(status + (f" ({job.error})" if job.error else "")),
+        id=f"job-{job_id}",
+        **polling,
+    )
+
+
+@app.get("/api/jobs/{job_id}/events")
+async def job_events(job_id: int):  # type: ignore
+    """Stream a job's progress as server-sent events until it finishes."""
+    if db.get_job(job_id) is None:
+        return job_not_found(job_id)
+
+    async def stream():  # type: ignore
+        last = None
+        while True:
+            job = db.get_job(job_id)
+            if job is None:
+                return
+            data = json.dumps(job_dict(job))
+            if data != last:
+                event = "done" if job.finished else "progress"
+                yield f"event: {event}\ndata: {data}\n\n"
+                last = data
+            if job.finished:
+                return
+            await asyncio.sleep(JOB_EVENTS_INTERVAL)
+
+    return StreamingResponse(
+        stream(), media_type="text/event-stream", headers={"Cache-Control": "no-cache"}
+    )
+
+
 @app.get("/health")
 def health():  # type: ignore
-    logger.info("❤️ Health check endpoint accessed")
-    return {"status": "ok", "phase": "1"}
+    return {
+        "status": "ok",
+        "phase": "1",
+        "render_cache": render_cache.stats(),
+        "preview_cache": preview_blocks.stats(),
+    }
+
+
+def cache_counters(index: int) -> dict:
+    """Hits (index 0) or misses (index 1) of every in-process cache, by cache name."""
+    stats = {(name,): counts[index] for name, counts in db.cache_stats().items()}
+    render = render_cache.stats()
+    stats[("render",)] = render["hits"] if index == 0 else render["misses"]
+    stats[("preview",)] = preview_blocks.stats()[("hits", "misses")[index]]
+    stats[("github_etags",)] = (github_etags.hits, github_etags.misses)[index]
+    return stats
+
+
+metrics.callback(
+    "blogbot_cache_hits_total",
+    "Cache lookups served from memory or SQLite",
+    ["cache"],
+    lambda: cache_counters(0),
+    kind="counter",
+)
+metrics.callback(
+    "blogbot_cache_misses_total",
+    "Cache lookups that had to load or render",
+    ["cache"],
+    lambda: cache_counters(1),
+    kind="counter",
+)
+
+
+@app.get("/metrics")
+def prometheus_metrics():  # type: ignore
+    """Expose request, database, cache, GitHub and job metrics for Prometheus."""
+    return Response(metrics.render(), media_type=CONTENT_TYPE)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,417 @@
+# ABOUTME: In-process counters, histograms and callbacks in Prometheus text format
+# ABOUTME: Also times Database methods and per-route request latency with request IDs
+import functools
+import inspect
+import logging
+import random
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from bisect import bisect_left
+from collections.abc import (
+    Callable,
+    Iterable,
+    Iterator,
+    Mapping,
+    MutableMapping,
+    Sequence,
+)
+from typing import Any, Self, TypeVar
+
+from app.logs import request_id
+
+access_logger = logging.getLogger("blogbot.access")
+
+# Latency buckets in seconds, from sub-millisecond cached reads to slow builds
+DEFAULT_BUCKETS = (
+    0.0001,
+    0.00025,
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+)
+
+# Resolved (method, path) -> route template lookups kept by the middleware
+ROUTE_CACHE_SIZE = 4096
+
+# Fraction of successful requests to these paths that get an access log line
+SAMPLED_PATHS: dict[str, float] = {"/health": 0.01, "/metrics": 0.0}
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+Labels = tuple[str, ...]
+C = TypeVar("C", bound=type)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [
+        f'{name}="{_escape(value)}"' for name, value in zip(names, values, strict=True)
+    ]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class Metric(ABC):
+    """Base class of a named metric family with fixed label names."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.description = description
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def header(self) -> list[str]:
+        return [
+            f"# HELP {self.name} {self.description}",
+            f"# TYPE {self.name} {self.kind}",
+        ]
+
+    @abstractmethod
+    def samples(self) -> Iterator[str]:
+        """Yield the exposition lines for every label set."""
+
+
+class Counter(Metric):
+    """Monotonically increasing value per label set."""
+
+    kind = "counter"
+
+    def __init__(self, name: str, description: str, labels: Sequence[str] = ()):
+        super().__init__(name, description, labels)
+        self._values: dict[Labels, float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def value(self, *labels: str) -> float:
+        with self._lock:
+            return self._values.get(labels, 0.0)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            values = sorted(self._values.items())
+        for labels, value in values:
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}{label_text} {_format_value(value)}"
+
+
+class Histogram(Metric):
+    """Distribution of observations in fixed buckets per label set.
+
+    ``observe`` increments one bucket; counts are only made cumulative when
+    the metrics are rendered, keeping the hot path to a bisect and two adds.
+    """
+
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        super().__init__(name, description, labels)
+        self.buckets = tuple(sorted(buckets))
+        self._series: dict[Labels, list[float]] = {}  # bucket counts..., +Inf, sum
+
+    def observe(self, value: float, *labels: str) -> None:
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [0.0] * (len(self.buckets) + 2)
+            series[index] += 1
+            series[-1] += value
+
+    def count(self, *labels: str) -> int:
+        with self._lock:
+            series = self._series.get(labels)
+            return int(sum(series[:-1])) if series else 0
+
+    def time(self, *labels: str) -> "_Timer":
+        """Context manager observing the duration of its block."""
+        return _Timer(self, labels)
+
+    def samples(self) -> Iterator[str]:
+        with self._lock:
+            series = sorted(
+                (labels, list(values)) for labels, values in self._series.items()
+            )
+        bounds = self.buckets + (float("inf"),)
+        for labels, values in series:
+            total = 0.0
+            for bound, count in zip(bounds, values[:-1], strict=True):
+                total += count
+                le = f'le="{_format_value(bound)}"'
+                yield (
+                    f"{self.name}_bucket{_format_labels(self.label_names, labels, le)} "
+                    f"{_format_value(total)}"
+                )
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{label_text} {values[-1]!r}"
+            yield f"{self.name}_count{label_text} {_format_value(total)}"
+
+
+class _Timer:
+    def __init__(self, histogram: Histogram, labels: Labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self) -> Self:
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Callback(Metric):
+    """Values read at scrape time from counters kept elsewhere (e.g. cache hits)."""
+
+    def __init__(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str],
+        kind: str,
+        read: Callable[[], Mapping[Labels, float]],
+    ):
+        super().__init__(name, description, labels)
+        self.kind = kind
+        self.read = read
+
+    def samples(self) -> Iterator[str]:
+        for labels, value in sorted(self.read().items()):
+            label_text = _format_labels(self.label_names, labels)
+            yield f"{self.name}{label_text} {_format_value(value)}"
+
+
+class Registry:
+    """A set of metrics rendered together at ``/metrics``."""
+
+    def __init__(self) -> None:
+        self._metrics: dict[str, Metric] = {}
+        self._lock = threading.Lock()
+
+    def _add[M: Metric](self, metric: M) -> M:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if isinstance(existing, type(metric)) and not isinstance(metric, Callback):
+                return existing
+            self._metrics[metric.name] = metric
+        return metric
+
+    def counter(
+        self, name: str, description: str, labels: Sequence[str] = ()
+    ) -> Counter:
+        return self._add(Counter(name, description, labels))
+
+    def histogram(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self._add(Histogram(name, description, labels, buckets))
+
+    def callback(
+        self,
+        name: str,
+        description: str,
+        labels: Sequence[str],
+        read: Callable[[], Mapping[Labels, float]],
+        kind: str = "gauge",
+    ) -> Callback:
+        """Register (or replace) a metric whose values ``read`` returns when scraped."""
+        return self._add(Callback(name, description, labels, kind, read))
+
+    def render(self) -> str:
+        """Render every metric in the Prometheus text exposition format."""
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+        lines: list[str] = []
+        for metric in metrics:
+            lines.extend(metric.header())
+            lines.extend(metric.samples())
+        return "\n".join(lines) + "\n"
+
+
+# Process-wide registry; modules create their metrics on it at import time
+metrics = Registry()
+
+db_query_seconds = metrics.histogram(
+    "blogbot_db_query_duration_seconds", "Time spent in Database methods", ["method"]
+)
+
+
+def timed_methods(histogram: Histogram) -> Callable[[C], C]:
+    """Class decorator timing every public method into ``histogram`` by method name.
+
+    Generator methods are timed until they are exhausted or closed.
+    """
+
+    def decorate(cls: C) -> C:
+        for name, member in list(vars(cls).items()):
+            if name.startswith("_") or not inspect.isfunction(member):
+                continue
+            setattr(cls, name, _timed(member, histogram, name))
+        return cls
+
+    return decorate
+
+
+def _timed(
+    func: Callable[..., Any], histogram: Histogram, name: str
+) -> Callable[..., Any]:
+    if inspect.isgeneratorfunction(func):
+
+        @functools.wraps(func)
+        def generator(*args: Any, **kwargs: Any) -> Any:
+            start = time.perf_counter()
+            try:
+                yield from func(*args, **kwargs)
+            finally:
+                histogram.observe(time.perf_counter() - start, name)
+
+        return generator
+
+    @functools.wraps(func)
+    def wrapper(*args: Any, **kwargs: Any) -> Any:
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            histogram.observe(time.perf_counter() - start, name)
+
+    return wrapper
+
+
+http_requests = metrics.counter(
+    "blogbot_http_requests_total", "HTTP requests served", ["method", "route", "status"]
+)
+http_request_seconds = metrics.histogram(
+    "blogbot_http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+)
+
+Scope = MutableMapping[str, Any]
+Message = MutableMapping[str, Any]
+ASGIApp = Callable[..., Any]
+
+
+class RequestMetricsMiddleware:
+    """Tag each request with an ID, record its latency and log it.
+
+    The ``X-Request-ID`` header is reused when the client sends one and
+    echoed on the response; it is available to every log record emitted
+    while the request is handled. Requests are labelled by route template
+    (``/api/jobs/{job_id}``), never the raw path, to keep label sets small.
+    Successful requests to ``SAMPLED_PATHS`` are only logged at the given rate.
+    """
+
+    def __init__(self, app: ASGIApp, sampled_paths: Mapping[str, float] | None = None):
+        self.app = app
+        self.sampled_paths = SAMPLED_PATHS if sampled_paths is None else sampled_paths
+        self._routes: dict[tuple[str, str], str] = {}
+
+    async def __call__(self, scope: Scope, receive: Any, send: Any) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        rid = _header(scope, b"x-request-id") or uuid.uuid4().hex
+        token = request_id.set(rid)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_id(message: Message) -> None:
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message["headers"]) + [
+                    (b"x-request-id", rid.encode("latin-1"))
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_id)
+        finally:
+            elapsed = time.perf_counter() - start
+            route = self._route(scope)
+            http_requests.inc(scope["method"], route, str(status))
+            http_request_seconds.observe(elapsed, scope["method"], route)
+            rate = self.sampled_paths.get(scope["path"], 1.0)
+            if status >= 500 or rate >= 1.0 or random.random() < rate:
+                access_logger.info(
+                    "%s %s %s",
+                    scope["method"],
+                    scope["path"],
+                    status,
+                    extra={
+                        "method": scope["method"],
+                        "path": scope["path"],
+                        "status": status,
+                        "duration_ms": round(elapsed * 1000, 2),
+                    },
+                )
+            request_id.reset(token)
+
+    def _route(self, scope: Scope) -> str:
+        key = (scope["method"], scope["path"])
+        route = self._routes.get(key)
+        if route is None:
+            route = _route_template(scope)
+            if len(self._routes) >= ROUTE_CACHE_SIZE:
+                self._routes.clear()
+            self._routes[key] = route
+        return route
+
+
+def _header(scope: Scope, name: bytes) -> str | None:
+    headers: Iterable[tuple[bytes, bytes]] = scope.get("headers", ())
+    for key, value in headers:
+        if key == name:
+            return value.decode("latin-1")[:128]
+    return None
+
+
+def _route_template(scope: Scope) -> str:
+    """The path template of the route that handled the request, or "unmatched"."""
+    from starlette.routing import Match
+
+    router = scope.get("router")
+    for route in getattr(router, "routes", ()):
+        match, _ = route.matches(scope)
+        if match == Match.FULL:
+            path = getattr(route, "path", None)
+            return path if isinstance(path, str) else str(scope["path"])
+    return "unmatched"
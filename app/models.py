@@ -1,13 +1,36 @@
 # ABOUTME: Data models for BlogBot configuration and API key management
-# ABOUTME: Python dataclasses for Settings, APIKey, and DeploymentConfig with SQLite integration
+# ABOUTME: Slotted dataclasses for settings, API keys, deployment, manifests and jobs
+import functools
+from collections.abc import Iterable
 from dataclasses import dataclass, field
 from datetime import datetime
-from typing import Optional, List
+from typing import Any, List, Optional
 
+# API key permissions; a key's set is stored as a bitmask with bit i for PERMISSIONS[i]
+PERMISSIONS = ("read", "write")
 
-@dataclass
+
+def permission_mask(permissions: Iterable[str]) -> int:
+    """Encode permission names as a bitmask; raises ValueError for unknown names."""
+    mask = 0
+    for name in permissions:
+        if name not in PERMISSIONS:
+            raise ValueError(
+                f"Unknown permission '{name}', expected one of {PERMISSIONS}"
+            )
+        mask |= 1 << PERMISSIONS.index(name)
+    return mask
+
+
+@functools.cache
+def permission_names(mask: int) -> frozenset[str]:
+    """Decode a permission bitmask (one shared frozenset per distinct mask)."""
+    return frozenset(name for i, name in enumerate(PERMISSIONS) if mask & (1 << i))
+
+
+@dataclass(frozen=True, slots=True)
 class Settings:
-    """Blog configuration settings stored in SQLite."""
+    """Blog configuration settings stored in SQLite (immutable, shared by the cache)."""
     blog_title: str
     blog_description: str
     github_repo: str  # Format: "user/repo"
@@ -17,7 +40,7 @@ class Settings:
     custom_css: Optional[str] = None
 
 
-@dataclass
+@dataclass(slots=True)
 class APIKey:
     """API key for programmatic access to BlogBot."""
     name: str
@@ -25,13 +48,96 @@ class APIKey:
     permissions: List[str]
     created_at: datetime = field(default_factory=datetime.now)
     is_active: bool = True
+    last_used: datetime | None = None
+    request_count: int = 0
 
 
-@dataclass  
+@dataclass(frozen=True, slots=True)
+class AuthenticatedKey:
+    """Result of resolving a raw API key: its ID, name and parsed permissions."""
+    key_id: int
+    name: str
+    permissions: frozenset[str]
+
+
+@dataclass(frozen=True, slots=True)
 class DeploymentConfig:
-    """GitHub Pages deployment configuration."""
+    """GitHub Pages deployment configuration (immutable, shared by the cache)."""
     target_repo: str  # Where to deploy the static site
     target_branch: str = "gh-pages"
     build_command: str = "npm run build"
     custom_domain: Optional[str] = None
-    auto_deploy: bool = True
\ No newline at end of file
+    auto_deploy: bool = True
+
+
+@dataclass(slots=True)
+class SourceRecord:
+    """Build manifest entry for one markdown source and its rendered page."""
+    path: str
+    content_hash: str  # Hash of the raw markdown file
+    config_hash: str  # Hash of templates/settings the page was rendered with
+    output_path: str
+    output_hash: str
+    metadata: dict[str, Any]  # title, date, type, slug, tags, url
+
+
+@dataclass(slots=True)
+class OutputRecord:
+    """Build manifest entry for an aggregate page (index, tag page, feed)."""
+    output_path: str
+    inputs_hash: str  # Hash of the metadata the page was rendered from
+    output_hash: str
+    sources: list[str] = field(default_factory=list)  # Source paths it depends on
+
+
+@dataclass(slots=True)
+class ContentItem:
+    """Indexed frontmatter metadata for one markdown file in the content repo."""
+    path: str
+    sha: str  # Git blob SHA the metadata was parsed from
+    title: str
+    date: str = ""  # ISO date, empty when not set
+    type: str = "post"
+    slug: str = ""
+    tags: list[str] = field(default_factory=list)
+
+
+@dataclass(slots=True)
+class SearchHit:
+    """One full-text search result."""
+    item: ContentItem
+    snippet: str  # Excerpt with matches wrapped in SNIPPET_START/SNIPPET_END
+    score: float  # BM25 relevance, higher is better
+
+
+@dataclass(slots=True)
+class StoredImage:
+    """An uploaded image, recorded once per distinct content hash."""
+    content_hash: str  # SHA-256 of the original bytes
+    path: str  # Repository path of the original, e.g. images/2025/cat.png
+    width: int = 0  # Pixels; 0 when the size could not be read
+    height: int = 0
+    size: int = 0  # Bytes
+    created_at: datetime = field(default_factory=datetime.now)
+
+
+@dataclass(slots=True)
+class Job:
+    """A background job persisted in the ``jobs`` table."""
+    kind: str  # Handler name, e.g. "publish"
+    id: int | None = None
+    state: str = "queued"  # queued, running, succeeded or failed
+    attempts: int = 0
+    max_attempts: int = 3
+    requests: int = 1  # Enqueue calls coalesced into this job
+    stage: str = ""  # Step currently running
+    progress: float = 0.0  # Fraction done, 0 to 1
+    result: dict[str, Any] = field(default_factory=dict)
+    error: str | None = None
+    created_at: float = 0.0  # Unix seconds
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    @property
+    def finished(self) -> bool:
+        return self.state in ("succeeded", "failed")
@@ -0,0 +1,2 @@
+# ABOUTME: Business logic services for BlogBot
+# ABOUTME: Markdown processing, static site generation and external integrations
@@ -0,0 +1,101 @@
+# ABOUTME: Keeps the SQLite frontmatter index in step with the content repository
+# ABOUTME: Re-parses only files whose blob SHA changed and drops deleted files
+import logging
+from collections.abc import Iterable, Mapping
+
+from app.database import Database
+from app.models import ContentItem
+from app.services.github import git_blob_sha
+from app.services.markdown import FrontmatterError, parse_post
+from app.services.mirror import ContentMirror
+from app.services.search import document_terms
+
+logger = logging.getLogger("blogbot.content_index")
+
+
+def content_item(path: str, sha: str, text: str) -> tuple[ContentItem, str]:
+    """Parse one markdown file into its index entry and searchable body."""
+    post = parse_post(path, text)
+    item = ContentItem(
+        path=path,
+        sha=sha,
+        title=post.title,
+        date=post.date,
+        type=post.type,
+        slug=post.slug,
+        tags=post.tags,
+    )
+    return item, post.body
+
+
+def index_file(db: Database, path: str, text: str) -> ContentItem:
+    """Index a file that was just created or updated through the API."""
+    item, body = content_item(path, git_blob_sha(text.encode()), text)
+    db.upsert_content(
+        [item], {path: body}, {path: document_terms(item.title, item.tags, body)}
+    )
+    return item
+
+
+def remove_file(db: Database, path: str) -> None:
+    """Drop a deleted file from the index."""
+    db.delete_content([path])
+
+
+def apply_changes(
+    db: Database, changed: dict[str, tuple[str, str]], deleted: Iterable[str]
+) -> int:
+    """Apply parsed updates (path -> (sha, text)) and deletions in bulk.
+
+    Files whose frontmatter does not parse keep their last indexed entry, and
+    its old SHA makes the next sync try them again. Returns the files updated.
+    """
+    parsed = []
+    for path, (sha, text) in changed.items():
+        try:
+            parsed.append(content_item(path, sha, text))
+        except FrontmatterError as exc:
+            logger.warning("Not indexing %s", exc)
+    db.upsert_content(
+        (item for item, _body in parsed),
+        {item.path: body for item, body in parsed},
+        {
+            item.path: document_terms(item.title, item.tags, body)
+            for item, body in parsed
+        },
+    )
+    db.delete_content(deleted)
+    return len(parsed)
+
+
+def sync_from_mirror(db: Database, mirror: ContentMirror) -> tuple[int, int]:
+    """Reconcile the index with the mirror by blob SHA; return (updated, deleted)."""
+    entries = {
+        entry.path: entry.sha
+        for entry in mirror.list_files()
+        if entry.path.endswith(".md")
+    }
+    indexed = db.get_content_shas()
+    stale = [path for path, sha in entries.items() if indexed.get(path) != sha]
+    deleted = [path for path in indexed if path not in entries]
+    contents = mirror.read_many(stale)
+    updated = apply_changes(
+        db,
+        {path: (entries[path], contents[path].decode("utf-8")) for path in stale},
+        deleted,
+    )
+    return updated, len(deleted)
+
+
+def sync_from_sources(db: Database, sources: Mapping[str, str]) -> tuple[int, int]:
+    """Reconcile the index with in-memory sources (path -> markdown), as in a build."""
+    indexed = db.get_content_shas()
+    changed = {}
+    for path, text in sources.items():
+        if not path.endswith(".md"):
+            continue
+        sha = git_blob_sha(text.encode())
+        if indexed.get(path) != sha:
+            changed[path] = (sha, text)
+    deleted = [path for path in indexed if path not in sources]
+    return apply_changes(db, changed, deleted), len(deleted)
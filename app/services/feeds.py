@@ -0,0 +1,207 @@
+# ABOUTME: Streaming RSS 2.0 and Atom feed writers fed from the content index
+# ABOUTME: Writes recent and archive feeds in one pass, memory independent of blog size
+import html
+import os
+from abc import ABC, abstractmethod
+from collections.abc import Callable, Iterable, Iterator
+from datetime import UTC, datetime
+from email.utils import format_datetime
+from itertools import islice
+from pathlib import Path
+from typing import IO, NamedTuple
+
+from app.database import Database
+from app.models import Settings
+from app.services.markdown import render_markdown
+from app.services.search import content_url
+
+# Number of most recent posts in the default feeds
+FEED_SIZE = 20
+
+# Output paths of each feed variant: (RSS path, Atom path, newest N posts or None
+# for all of them)
+FEEDS: tuple[tuple[str, str, int | None], ...] = (
+    ("feed.xml", "atom.xml", FEED_SIZE),
+    ("archive/feed.xml", "archive/atom.xml", None),
+)
+
+# Buffer size of each open feed file
+WRITE_BUFFER = 64 * 1024
+
+
+class FeedEntry(NamedTuple):
+    """One post as it appears in a feed."""
+
+    title: str
+    url: str  # Site-relative URL
+    date: str  # ISO date, empty when not set
+    content: str  # Rendered HTML
+
+
+def feed_entries(
+    db: Database, render: Callable[[str], str] = render_markdown
+) -> Iterator[FeedEntry]:
+    """Yield indexed posts newest first, rendering each body as it is reached."""
+    for item, body in db.iter_content_bodies(content_type="post"):
+        url = content_url(item.path, item.title, item.date, item.type, item.slug)
+        yield FeedEntry(item.title, url, item.date, render(body))
+
+
+def _moment(date: str) -> datetime | None:
+    try:
+        return datetime.fromisoformat(date).replace(tzinfo=UTC)
+    except ValueError:  # Missing or malformed frontmatter date
+        return None
+
+
+def _atom_time(moment: datetime) -> str:
+    return moment.strftime("%Y-%m-%dT%H:%M:%SZ")
+
+
+class FeedWriter(ABC):
+    """Writes one feed document to a file incrementally.
+
+    The document is written to a temporary file that replaces the output on
+    ``close``, so readers never see a half-written feed.
+    """
+
+    def __init__(self, output_dir: Path, output_path: str, settings: Settings):
+        self.output_path = output_path
+        self.path = output_dir / output_path
+        self.settings = settings
+        self.base = (settings.github_pages_url or "").rstrip("/")
+        self.count = 0
+        self._temp = self.path.with_name(self.path.name + ".tmp")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        # Closed by close() or abort(); the writer outlives any with-block here
+        self._file: IO[str] = open(  # noqa: SIM115
+            self._temp, "w", encoding="utf-8", buffering=WRITE_BUFFER
+        )
+
+    def add(self, entry: FeedEntry) -> None:
+        """Append one entry to the document."""
+        if self.count == 0:
+            self._file.write(self._header(entry))
+        self._file.write(self._entry(entry))
+        self.count += 1
+
+    def close(self) -> None:
+        """Finish the document and move it into place."""
+        if self.count == 0:
+            self._file.write(self._header(None))
+        self._file.write(self._footer())
+        self._file.close()
+        os.replace(self._temp, self.path)
+
+    def abort(self) -> None:
+        """Discard the partly written document."""
+        self._file.close()
+        self._temp.unlink(missing_ok=True)
+
+    @abstractmethod
+    def _header(self, first: FeedEntry | None) -> str:
+        """Document start; ``first`` is the newest entry, None for an empty feed."""
+
+    @abstractmethod
+    def _entry(self, entry: FeedEntry) -> str:
+        """Markup for one entry."""
+
+    @abstractmethod
+    def _footer(self) -> str:
+        """Document end."""
+
+
+class RSSWriter(FeedWriter):
+    """RSS 2.0 with the rendered post in each item's description."""
+
+    def _header(self, first: FeedEntry | None) -> str:
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<rss version="2.0"><channel>'
+            f"<title>{html.escape(self.settings.blog_title)}</title>"
+            f"<link>{html.escape(self.base or '/')}</link>"
+            f"<description>{html.escape(self.settings.blog_description)}</description>"
+        )
+
+    def _entry(self, entry: FeedEntry) -> str:
+        link = html.escape(self.base + entry.url)
+        moment = _moment(entry.date)
+        published = f"<pubDate>{format_datetime(moment)}</pubDate>" if moment else ""
+        return (
+            f"<item><title>{html.escape(entry.title)}</title>"
+            f"<link>{link}</link><guid>{link}</guid>{published}"
+            f"<description>{html.escape(entry.content)}</description></item>"
+        )
+
+    def _footer(self) -> str:
+        return "</channel></rss>\n"
+
+
+class AtomWriter(FeedWriter):
+    """Atom 1.0; the feed's updated time is taken from its newest entry."""
+
+    def _header(self, first: FeedEntry | None) -> str:
+        moment = _moment(first.date) if first else None
+        updated = _atom_time(moment or datetime.fromtimestamp(0, UTC))
+        site = html.escape(self.base + "/")
+        feed_url = html.escape(f"{self.base}/{self.output_path}")
+        return (
+            '<?xml version="1.0" encoding="utf-8"?>\n'
+            '<feed xmlns="http://www.w3.org/2005/Atom">'
+            f"<title>{html.escape(self.settings.blog_title)}</title>"
+            f"<subtitle>{html.escape(self.settings.blog_description)}</subtitle>"
+            f'<link href="{site}"/>'
+            f'<link rel="self" href="{feed_url}"/>'
+            f"<id>{site}</id><updated>{updated}</updated>"
+            f"<author><name>{html.escape(self.settings.blog_title)}</name></author>"
+        )
+
+    def _entry(self, entry: FeedEntry) -> str:
+        link = html.escape(self.base + entry.url)
+        moment = _moment(entry.date) or datetime.fromtimestamp(0, UTC)
+        return (
+            f"<entry><title>{html.escape(entry.title)}</title>"
+            f'<link href="{link}"/><id>{link}</id>'
+            f"<updated>{_atom_time(moment)}</updated>"
+            f'<content type="html">{html.escape(entry.content)}</content></entry>'
+        )
+
+    def _footer(self) -> str:
+        return "</feed>\n"
+
+
+def write_feeds(
+    output_dir: str | Path,
+    settings: Settings,
+    entries: Iterable[FeedEntry],
+    feeds: Iterable[tuple[str, str, int | None]] = FEEDS,
+) -> list[str]:
+    """Stream ``entries`` (newest first) into every RSS and Atom feed variant.
+
+    Each entry is written to every feed that still wants it and then dropped,
+    so memory stays flat whatever the number of posts. Entries are only
+    pulled while some feed is unbounded or not yet full. Returns the output
+    paths written.
+    """
+    root = Path(output_dir)
+    writers: list[tuple[FeedWriter, int | None]] = []
+    try:
+        for rss_path, atom_path, limit in feeds:
+            writers.append((RSSWriter(root, rss_path, settings), limit))
+            writers.append((AtomWriter(root, atom_path, settings), limit))
+        needed = (
+            None
+            if any(limit is None for _, limit in writers)
+            else max((limit for _, limit in writers if limit is not None), default=0)
+        )
+        for position, entry in enumerate(islice(entries, needed)):
+            for writer, limit in writers:
+                if limit is None or position < limit:
+                    writer.add(entry)
+    except BaseException:
+        for writer, _ in writers:
+            writer.abort()
+        raise
+    for writer, _ in writers:
+        writer.close()
+    return [writer.output_path for writer, _ in writers]
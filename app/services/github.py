@@ -0,0 +1,447 @@
+# ABOUTME: Async GitHub REST API client with pooling, ETag caching and rate-limit pacing
+# ABOUTME: Used for listing, reading and publishing repository content
+import asyncio
+import base64
+import hashlib
+import importlib.util
+import logging
+import time
+import urllib.parse
+from collections.abc import Awaitable, Callable, Mapping, Sequence
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any, Optional, Self
+
+from app.cache import MISSING, LRUCache
+from app.metrics import metrics
+
+if TYPE_CHECKING:
+    # httpx is imported when the first client is created, not at app startup
+    import httpx
+
+logger = logging.getLogger("blogbot.github")
+
+github_requests = metrics.counter(
+    "blogbot_github_requests_total", "GitHub API requests sent", ["method", "status"]
+)
+github_request_seconds = metrics.histogram(
+    "blogbot_github_request_duration_seconds", "GitHub API request latency", ["method"]
+)
+
+GITHUB_API_URL = "https://api.github.com"
+
+# Requests in flight at once across the whole client
+DEFAULT_MAX_CONCURRENCY = 8
+
+# Start spreading requests out once fewer than this many remain in the window
+RATE_LIMIT_RESERVE = 100
+
+# Conditional-request cache entries (URL -> ETag + body), and their total body bytes
+ETAG_CACHE_SIZE = 2048
+ETAG_CACHE_BYTES = 32 * 1024 * 1024
+
+MAX_RETRIES = 3
+RETRY_BACKOFF = 0.5  # Seconds, doubled after each attempt
+
+# HTTP/2 needs the optional `h2` package (httpx[http2]); fall back to pooled HTTP/1.1
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
+
+class GitHubError(Exception):
+    """A GitHub API failure carrying the spec's error/detail/action fields."""
+
+    def __init__(self, status: int, detail: str, action: str):
+        super().__init__(f"GitHub API error ({status}): {detail}")
+        self.status = status
+        self.detail = detail
+        self.action = action
+
+    def to_dict(self) -> dict[str, str]:
+        return {
+            "error": "GitHub API error",
+            "detail": self.detail,
+            "action": self.action,
+        }
+
+
+def git_blob_sha(content: bytes) -> str:
+    """Return the SHA git assigns to a blob with ``content``."""
+    header = f"blob {len(content)}\0".encode()
+    return hashlib.sha1(header + content).hexdigest()
+
+
+@dataclass(frozen=True)
+class TreeEntry:
+    """A file in a repository tree listing."""
+
+    path: str
+    sha: str  # Git blob SHA
+    size: int
+
+
+class RateLimitScheduler:
+    """Pace requests using GitHub's ``X-RateLimit-*`` headers.
+
+    Requests go out immediately while plenty of quota remains. Below
+    ``reserve`` the remaining quota is spread evenly until the window resets,
+    and with no quota left callers wait for the reset.
+    """
+
+    def __init__(
+        self,
+        reserve: int = RATE_LIMIT_RESERVE,
+        clock: Callable[[], float] = time.time,
+        sleep: Callable[[float], Awaitable[Any]] = asyncio.sleep,
+    ):
+        self.reserve = reserve
+        self.remaining: int | None = None
+        self.reset_at = 0.0
+        self._clock = clock
+        self._sleep = sleep
+        self._lock = asyncio.Lock()
+
+    def delay(self) -> float:
+        """Seconds to wait before sending the next request."""
+        if self.remaining is None:
+            return 0.0
+        window = self.reset_at - self._clock()
+        if window <= 0:
+            return 0.0
+        if self.remaining <= 0:
+            return window
+        if self.remaining < self.reserve:
+            return window / self.remaining
+        return 0.0
+
+    async def acquire(self) -> None:
+        """Wait until a request may be sent and count it against the quota."""
+        async with self._lock:
+            delay = self.delay()
+            if delay > 0:
+                logger.info("GitHub rate limit low, pausing %.1fs", delay)
+                await self._sleep(delay)
+            if self.remaining is not None and self._clock() < self.reset_at:
+                self.remaining -= 1
+
+    def update(self, headers: Mapping[str, str]) -> None:
+        """Record the quota reported by a response."""
+        if "x-ratelimit-remaining" in headers:
+            self.remaining = int(headers["x-ratelimit-remaining"])
+        if "x-ratelimit-reset" in headers:
+            self.reset_at = float(headers["x-ratelimit-reset"])
+
+
+# (URL, Accept) -> (ETag, body, headers) of cached GET responses
+ETagCache = LRUCache[tuple[str, str], tuple[str, bytes, dict[str, str]]]
+
+
+def new_etag_cache() -> ETagCache:
+    """An empty ETag cache bounded by entry count and by cached body bytes."""
+    return LRUCache(ETAG_CACHE_SIZE, ETAG_CACHE_BYTES, lambda entry: len(entry[1]))
+
+
+class GitHubClient:
+    """Async GitHub API client sharing one pooled ``httpx.AsyncClient``.
+
+    GET responses are cached by ETag and revalidated with ``If-None-Match``,
+    so unchanged resources cost a 304 that GitHub does not count against the
+    rate limit. Concurrency is bounded by a semaphore and pacing is handled by
+    ``RateLimitScheduler``.
+    """
+
+    def __init__(
+        self,
+        token: str | None = None,
+        base_url: str = GITHUB_API_URL,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        client: Optional["httpx.AsyncClient"] = None,
+        scheduler: RateLimitScheduler | None = None,
+        etag_cache: ETagCache | None = None,
+    ):
+        import httpx
+
+        headers = {
+            "Accept": "application/vnd.github+json",
+            "X-GitHub-Api-Version": "2022-11-28",
+            "User-Agent": "blogbot",
+        }
+        if token:
+            headers["Authorization"] = f"Bearer {token}"
+        self.client = client or httpx.AsyncClient(
+            base_url=base_url,
+            headers=headers,
+            http2=HTTP2_AVAILABLE,
+            limits=httpx.Limits(
+                max_connections=max_concurrency,
+                max_keepalive_connections=max_concurrency,
+            ),
+            timeout=httpx.Timeout(30.0),
+        )
+        self.scheduler = scheduler or RateLimitScheduler()
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        # Pass a shared etag_cache to keep revalidating across short-lived clients
+        self._etags: ETagCache = (
+            etag_cache if etag_cache is not None else new_etag_cache()
+        )
+        self.requests = 0
+        self.not_modified = 0
+
+    async def __aenter__(self) -> Self:
+        return self
+
+    async def __aexit__(self, *_: object) -> None:
+        await self.aclose()
+
+    async def aclose(self) -> None:
+        """Close pooled connections."""
+        await self.client.aclose()
+
+    async def request(
+        self,
+        method: str,
+        url: str,
+        params: dict[str, Any] | None = None,
+        json: Any = None,
+        accept: str | None = None,
+    ) -> "httpx.Response":
+        """Send a request with pacing, retries and ETag revalidation for GETs."""
+        import httpx
+
+        headers = {"Accept": accept} if accept else {}
+        cache_key = None
+        cached: Any = MISSING
+        if method == "GET":
+            cache_key = (
+                str(self.client.build_request(method, url, params=params).url),
+                accept or "",
+            )
+            cached = self._etags.get(cache_key)
+            if cached is not MISSING:
+                headers["If-None-Match"] = cached[0]
+
+        for attempt in range(MAX_RETRIES + 1):
+            await self.scheduler.acquire()
+            async with self._semaphore:
+                start = time.perf_counter()
+                try:
+                    response = await self.client.request(
+                        method, url, params=params, json=json, headers=headers
+                    )
+                except httpx.TransportError as exc:
+                    github_requests.inc(method, "error")
+                    if attempt == MAX_RETRIES:
+                        raise GitHubError(
+                            503,
+                            f"Could not reach GitHub: {exc}",
+                            "Check network connectivity and retry",
+                        ) from exc
+                    await asyncio.sleep(RETRY_BACKOFF * 2**attempt)
+                    continue
+                github_request_seconds.observe(time.perf_counter() - start, method)
+            github_requests.inc(method, str(response.status_code))
+            self.requests += 1
+            self.scheduler.update(response.headers)
+
+            if response.status_code == 304 and cached is not MISSING:
+                self.not_modified += 1
+                _, content, cached_headers = cached
+                return httpx.Response(
+                    200,
+                    content=content,
+                    headers=cached_headers,
+                    request=response.request,
+                )
+            retryable = self._is_rate_limited(response) or response.status_code >= 500
+            if retryable and attempt < MAX_RETRIES:
+                await asyncio.sleep(self._retry_delay(response, attempt))
+                continue
+            if response.is_error:
+                raise self._error(response)
+
+            if cache_key is not None and "etag" in response.headers:
+                self._etags.put(
+                    cache_key,
+                    (
+                        response.headers["etag"],
+                        response.content,
+                        {"content-type": response.headers.get("content-type", "")},
+                    ),
+                )
+            return response
+        raise AssertionError("unreachable")
+
+    @staticmethod
+    def _is_rate_limited(response: "httpx.Response") -> bool:
+        return response.status_code == 429 or (
+            response.status_code == 403
+            and response.headers.get("x-ratelimit-remaining") == "0"
+        )
+
+    def _retry_delay(self, response: "httpx.Response", attempt: int) -> float:
+        if "retry-after" in response.headers:
+            return float(response.headers["retry-after"])
+        if self._is_rate_limited(response):
+            return max(self.scheduler.delay(), RETRY_BACKOFF)
+        return RETRY_BACKOFF * 2.0**attempt
+
+    @staticmethod
+    def _error(response: "httpx.Response") -> GitHubError:
+        try:
+            message = response.json().get("message", response.text)
+        except ValueError:
+            message = response.text
+        status = response.status_code
+        if status == 401:
+            action = "Re-authenticate with GitHub at /auth/github"
+        elif status == 403:
+            action = "Check the token has access to this repository"
+        elif status == 404:
+            action = "Check repository exists and you have access"
+        elif status in (409, 422):
+            action = "Refresh the file and retry with its current SHA"
+        else:
+            action = "Retry later; GitHub may be having problems"
+        return GitHubError(status, message, action)
+
+    # Repository content
+    async def list_tree(self, repo: str, ref: str) -> list[TreeEntry]:
+        """List every file in ``repo`` at ``ref``."""
+        response = await self.request(
+            "GET", f"/repos/{repo}/git/trees/{ref}", params={"recursive": "1"}
+        )
+        return [
+            TreeEntry(item["path"], item["sha"], item.get("size", 0))
+            for item in response.json()["tree"]
+            if item["type"] == "blob"
+        ]
+
+    async def list_markdown(self, repo: str, ref: str) -> list[TreeEntry]:
+        """List the markdown files in ``repo`` at ``ref``."""
+        return [
+            entry
+            for entry in await self.list_tree(repo, ref)
+            if entry.path.endswith(".md")
+        ]
+
+    async def get_file(self, repo: str, path: str, ref: str) -> bytes:
+        """Return the raw content of one file."""
+        response = await self.request(
+            "GET",
+            f"/repos/{repo}/contents/{urllib.parse.quote(path)}",
+            params={"ref": ref},
+            accept="application/vnd.github.raw+json",
+        )
+        return response.content
+
+    async def get_files(
+        self, repo: str, paths: Sequence[str], ref: str
+    ) -> dict[str, bytes]:
+        """Fetch many files concurrently, bounded by the client's semaphore."""
+        contents = await asyncio.gather(
+            *(self.get_file(repo, path, ref) for path in paths)
+        )
+        return dict(zip(paths, contents, strict=True))
+
+    async def put_file(
+        self,
+        repo: str,
+        path: str,
+        content: bytes,
+        message: str,
+        branch: str,
+        sha: str | None = None,
+    ) -> dict[str, Any]:
+        """Create or update a single file, returning GitHub's commit/content info."""
+        body: dict[str, Any] = {
+            "message": message,
+            "content": base64.b64encode(content).decode(),
+            "branch": branch,
+        }
+        if sha:
+            body["sha"] = sha
+        response = await self.request(
+            "PUT", f"/repos/{repo}/contents/{urllib.parse.quote(path)}", json=body
+        )
+        result: dict[str, Any] = response.json()
+        return result
+
+    async def delete_file(
+        self, repo: str, path: str, message: str, branch: str, sha: str
+    ) -> None:
+        """Delete a single file."""
+        await self.request(
+            "DELETE",
+            f"/repos/{repo}/contents/{urllib.parse.quote(path)}",
+            json={"message": message, "branch": branch, "sha": sha},
+        )
+
+    # Git Data API
+    async def get_branch_head(self, repo: str, branch: str) -> tuple[str, str] | None:
+        """Return (commit SHA, tree SHA) at the tip of ``branch``, or None if absent."""
+        try:
+            ref = await self.request("GET", f"/repos/{repo}/git/ref/heads/{branch}")
+        except GitHubError as exc:
+            if exc.status == 404:
+                return None
+            raise
+        commit_sha = ref.json()["object"]["sha"]
+        commit = await self.request("GET", f"/repos/{repo}/git/commits/{commit_sha}")
+        return commit_sha, commit.json()["tree"]["sha"]
+
+    async def create_blob(self, repo: str, content: bytes) -> str:
+        """Upload a blob and return its SHA."""
+        response = await self.request(
+            "POST",
+            f"/repos/{repo}/git/blobs",
+            json={
+                "content": base64.b64encode(content).decode(),
+                "encoding": "base64",
+            },
+        )
+        return str(response.json()["sha"])
+
+    async def create_tree(
+        self, repo: str, entries: list[dict[str, Any]], base_tree: str | None = None
+    ) -> str:
+        """Create a tree from ``entries`` on top of ``base_tree`` and return its SHA."""
+        body: dict[str, Any] = {"tree": entries}
+        if base_tree:
+            body["base_tree"] = base_tree
+        response = await self.request("POST", f"/repos/{repo}/git/trees", json=body)
+        return str(response.json()["sha"])
+
+    async def create_commit(
+        self, repo: str, message: str, tree: str, parents: list[str]
+    ) -> str:
+        """Create a commit object and return its SHA."""
+        response = await self.request(
+            "POST",
+            f"/repos/{repo}/git/commits",
+            json={
+                "message": message,
+                "tree": tree,
+                "parents": parents,
+            },
+        )
+        return str(response.json()["sha"])
+
+    async def set_branch(
+        self, repo: str, branch: str, sha: str, create: bool = False
+    ) -> None:
+        """Point ``branch`` at commit ``sha``, creating the ref if asked."""
+        if create:
+            await self.request(
+                "POST",
+                f"/repos/{repo}/git/refs",
+                json={
+                    "ref": f"refs/heads/{branch}",
+                    "sha": sha,
+                },
+            )
+        else:
+            await self.request(
+                "PATCH",
+                f"/repos/{repo}/git/refs/heads/{branch}",
+                json={
+                    "sha": sha,
+                },
+            )
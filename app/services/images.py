@@ -0,0 +1,316 @@
+# ABOUTME: Image pipeline: upload dedup by content hash, WebP variants and srcset markup
+# ABOUTME: Variants are made in a thread pool at build time and cached on disk by hash
+import hashlib
+import html
+import importlib.util
+import io
+import sqlite3
+import time
+from collections.abc import Mapping
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from datetime import date
+from pathlib import Path, PurePosixPath
+
+from app.database import Database
+from app.models import StoredImage
+from app.services.github import GitHubClient
+from app.services.markdown import slugify
+
+# Resizing needs the optional Pillow package; without it originals are published as-is
+PILLOW_AVAILABLE = importlib.util.find_spec("PIL") is not None
+
+# Widths (in pixels) of the responsive variants generated for each image
+VARIANT_WIDTHS = (480, 960, 1600)
+
+VARIANT_FORMAT = "webp"
+VARIANT_QUALITY = 80
+
+# Bump whenever variant settings change so cached variants are regenerated
+PIPELINE_VERSION = "1"
+
+# Directory of the content repository (and built site) holding images
+IMAGES_DIR = "images"
+
+IMAGE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".gif", ".webp"})
+
+# Formats variants are made for; GIFs are copied untouched to keep animation
+RESIZABLE_EXTENSIONS = frozenset({".png", ".jpg", ".jpeg", ".webp"})
+
+# EXIF orientations that rotate the image by 90 degrees
+_ROTATED = frozenset({5, 6, 7, 8})
+
+
+def image_hash(data: bytes) -> str:
+    """Return the SHA-256 hex digest identifying an image's content."""
+    return hashlib.sha256(data).hexdigest()
+
+
+def is_image_path(path: str) -> bool:
+    return PurePosixPath(path).suffix.lower() in IMAGE_EXTENSIONS
+
+
+def image_dimensions(data: bytes) -> tuple[int, int]:
+    """Return the displayed (width, height), or (0, 0) if unknown.
+
+    Only the header is decoded. EXIF rotation is taken into account so the
+    size matches what browsers show.
+    """
+    if not PILLOW_AVAILABLE:
+        return 0, 0
+    from PIL import Image, UnidentifiedImageError
+
+    try:
+        with Image.open(io.BytesIO(data)) as image:
+            width, height = image.size
+            if image.getexif().get(0x0112) in _ROTATED:
+                width, height = height, width
+            return width, height
+    except (UnidentifiedImageError, OSError):
+        return 0, 0
+
+
+def upload_path(filename: str, today: date | None = None) -> str:
+    """Repository path for an uploaded file: ``images/YYYY/<slug>.<ext>``."""
+    name = PurePosixPath(filename.replace("\\", "/")).name
+    stem = slugify(PurePosixPath(name).stem) or "image"
+    suffix = PurePosixPath(name).suffix.lower()
+    year = (today or date.today()).year
+    return f"{IMAGES_DIR}/{year}/{stem}{suffix}"
+
+
+def variant_widths(width: int) -> list[int]:
+    """Widths to generate for an image ``width`` pixels wide, smallest first.
+
+    Images are never upscaled: every configured width below the original is
+    used, plus one variant at the original width capped at the largest one.
+    """
+    if width <= 0:
+        return []
+    widths = {w for w in VARIANT_WIDTHS if w < width}
+    widths.add(min(width, VARIANT_WIDTHS[-1]))
+    return sorted(widths)
+
+
+def has_variants(path: str, width: int) -> bool:
+    return (
+        PILLOW_AVAILABLE
+        and bool(variant_widths(width))
+        and PurePosixPath(path).suffix.lower() in RESIZABLE_EXTENSIONS
+    )
+
+
+def variant_path(path: str, width: int) -> str:
+    """Path of one variant, next to the original: ``images/2025/cat-480w.webp``."""
+    original = PurePosixPath(path)
+    return str(original.with_name(f"{original.stem}-{width}w.{VARIANT_FORMAT}"))
+
+
+def variant_paths(path: str, width: int) -> list[str]:
+    """Paths of every variant published for an image, empty if it gets none."""
+    if not has_variants(path, width):
+        return []
+    return [variant_path(path, w) for w in variant_widths(width)]
+
+
+def image_markup(path: str, width: int = 0, height: int = 0, alt: str = "") -> str:
+    """Snippet embedding an image in markdown.
+
+    When variants exist this is a ``<picture>`` whose WebP ``srcset`` lets
+    browsers pick the smallest adequate file, falling back to the original;
+    otherwise it is a plain markdown image.
+    """
+    url = f"/{path}"
+    if not has_variants(path, width):
+        return f"![{alt}]({url})"
+    widths = variant_widths(width)
+    srcset = ", ".join(f"/{variant_path(path, w)} {w}w" for w in widths)
+    size = f' width="{width}" height="{height}"' if height else ""
+    return (
+        f'<picture><source type="image/{VARIANT_FORMAT}" srcset="{srcset}" '
+        f'sizes="(max-width: {widths[-1]}px) 100vw, {widths[-1]}px">'
+        f'<img src="{url}" alt="{html.escape(alt)}"{size} '
+        'loading="lazy" decoding="async">'
+        "</picture>"
+    )
+
+
+def make_variants(data: bytes, widths: list[int]) -> dict[int, bytes]:
+    """Decode an image once and encode a WebP variant at each width."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(data)) as source:
+        image = ImageOps.exif_transpose(source)
+        if image.mode not in ("RGB", "RGBA"):
+            has_alpha = image.mode in ("LA", "PA") or "transparency" in image.info
+            image = image.convert("RGBA" if has_alpha else "RGB")
+        variants = {}
+        for width in widths:
+            if width < image.width:
+                height = max(1, round(image.height * width / image.width))
+                resized = image.resize((width, height), Image.Resampling.LANCZOS)
+            else:
+                resized = image
+            buffer = io.BytesIO()
+            resized.save(buffer, VARIANT_FORMAT, quality=VARIANT_QUALITY, method=4)
+            variants[width] = buffer.getvalue()
+        return variants
+
+
+class VariantCache:
+    """Generated variants on disk, keyed by original content hash and width.
+
+    Rebuilds look variants up here instead of decoding and re-encoding the
+    original; ``PIPELINE_VERSION`` is part of the key so changing the
+    encoder settings starts afresh.
+    """
+
+    def __init__(self, cache_dir: str | Path):
+        self.cache_dir = Path(cache_dir)
+
+    def _path(self, content_hash: str, width: int) -> Path:
+        name = f"{content_hash}-{width}w-v{PIPELINE_VERSION}.{VARIANT_FORMAT}"
+        return self.cache_dir / content_hash[:2] / name
+
+    def get(self, content_hash: str, width: int) -> bytes | None:
+        try:
+            return self._path(content_hash, width).read_bytes()
+        except FileNotFoundError:
+            return None
+
+    def put(self, content_hash: str, width: int, data: bytes) -> None:
+        target = self._path(content_hash, width)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        temp = target.with_suffix(".tmp")
+        temp.write_bytes(data)
+        temp.replace(target)
+
+
+@dataclass
+class ImageReport:
+    """Summary of the image stage of a build."""
+
+    generated: int = 0  # Variants encoded
+    cached: int = 0  # Variants reused from the cache
+    written: list[str] = field(default_factory=list)  # Output paths written
+    deleted: list[str] = field(default_factory=list)
+    elapsed: float = 0.0  # Seconds
+
+
+def build_images(
+    images: Mapping[str, bytes],
+    output_dir: str | Path,
+    cache: VariantCache | None = None,
+    workers: int = 4,
+) -> ImageReport:
+    """Publish ``images`` (path -> bytes) and their variants into ``output_dir``.
+
+    Missing variants are encoded in a thread pool (Pillow releases the GIL
+    while resizing and encoding) and stored in ``cache``. Files that already
+    hold the right bytes are left alone, and anything else under the output
+    ``images/`` directory is removed.
+    """
+    start = time.perf_counter()
+    report = ImageReport()
+    root = Path(output_dir)
+    outputs: dict[str, bytes] = {}
+    todo: list[tuple[str, bytes, str, list[int]]] = []
+
+    for path, data in sorted(images.items()):
+        if not is_image_path(path):
+            continue
+        outputs[path] = data
+        width, _height = image_dimensions(data)
+        if not has_variants(path, width):
+            continue
+        digest = image_hash(data)
+        missing = []
+        for w in variant_widths(width):
+            cached = cache.get(digest, w) if cache else None
+            if cached is None:
+                missing.append(w)
+            else:
+                outputs[variant_path(path, w)] = cached
+                report.cached += 1
+        if missing:
+            todo.append((path, data, digest, missing))
+
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as pool:
+        results = pool.map(lambda job: make_variants(job[1], job[3]), todo)
+        for (path, _data, digest, _widths), variants in zip(todo, results, strict=True):
+            for w, encoded in variants.items():
+                if cache:
+                    cache.put(digest, w, encoded)
+                outputs[variant_path(path, w)] = encoded
+                report.generated += 1
+
+    for output_path, data in outputs.items():
+        target = root / output_path
+        if (
+            target.exists()
+            and target.stat().st_size == len(data)
+            and target.read_bytes() == data
+        ):
+            continue
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_bytes(data)
+        report.written.append(output_path)
+
+    images_root = root / IMAGES_DIR
+    if images_root.exists():
+        for target in sorted(images_root.rglob("*")):
+            output_path = target.relative_to(root).as_posix()
+            if target.is_file() and output_path not in outputs:
+                target.unlink()
+                report.deleted.append(output_path)
+
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def read_images(source_dir: str | Path) -> dict[str, bytes]:
+    """Load every image under ``source_dir`` keyed by its relative path."""
+    root = Path(source_dir)
+    return {
+        path.relative_to(root).as_posix(): path.read_bytes()
+        for path in sorted(root.rglob("*"))
+        if path.is_file() and path.suffix.lower() in IMAGE_EXTENSIONS
+    }
+
+
+async def store_image(
+    db: Database,
+    client: GitHubClient,
+    repo: str,
+    branch: str,
+    filename: str,
+    data: bytes,
+    today: date | None = None,
+) -> tuple[StoredImage, bool]:
+    """Commit an uploaded image to the content repo unless its bytes are already there.
+
+    Returns the stored image and whether it was a duplicate. A name clash
+    with a different image gets the content hash appended to the file name.
+    """
+    digest = image_hash(data)
+    existing = db.get_image(digest)
+    if existing is not None:
+        return existing, True
+
+    path = upload_path(filename, today)
+    if db.image_path_taken(path):
+        original = PurePosixPath(path)
+        path = str(original.with_name(f"{original.stem}-{digest[:8]}{original.suffix}"))
+    width, height = image_dimensions(data)
+    await client.put_file(repo, path, data, f"Add {path}", branch)
+
+    image = StoredImage(digest, path, width, height, len(data))
+    try:
+        db.save_image(image)
+    except sqlite3.IntegrityError:
+        # The same bytes were stored by a concurrent upload
+        raced = db.get_image(digest)
+        if raced is not None:
+            return raced, True
+        raise
+    return image, False
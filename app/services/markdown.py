@@ -0,0 +1,118 @@
+# ABOUTME: Markdown processing: frontmatter parsing, URLs and slugs, HTML rendering
+# ABOUTME: Shared by the editor preview and the static site generator
+import functools
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime
+from pathlib import PurePosixPath
+from typing import TYPE_CHECKING, Any
+
+if TYPE_CHECKING:
+    from markdown_it import MarkdownIt
+
+# Bump whenever parser options or plugins change so cached renders are discarded
+RENDERER_VERSION = "1"
+
+_SLUG_STRIP = re.compile(r"[^\w\s-]")
+_SLUG_DASHES = re.compile(r"[\s_-]+")
+
+
+class FrontmatterError(ValueError):
+    """A markdown file whose YAML frontmatter does not parse."""
+
+    def __init__(self, path: str, detail: str, body: str):
+        super().__init__(f"{path}: invalid frontmatter: {detail}")
+        self.path = path
+        self.body = body  # Text after the frontmatter block
+
+
+@dataclass
+class Post:
+    """A markdown post or page with its parsed frontmatter."""
+
+    path: str
+    title: str
+    body: str
+    date: str = ""  # ISO date, empty when not set
+    type: str = "post"  # "post" or "page"
+    slug: str = ""
+    tags: list[str] = field(default_factory=list)
+
+    @property
+    def url(self) -> str:
+        """Public URL: ``/YYYY-MM-DD-slug`` for posts, ``/slug/`` for pages."""
+        if self.type == "page":
+            return f"/{self.slug}/"
+        return f"/{self.date}-{self.slug}" if self.date else f"/{self.slug}"
+
+    @property
+    def output_path(self) -> str:
+        """Path of the rendered file relative to the site root."""
+        if self.type == "page":
+            return f"{self.slug}/index.html"
+        return self.url.lstrip("/") + ".html"
+
+
+def slugify(text: str) -> str:
+    """Turn a title into a lowercase, dash-separated URL slug."""
+    text = _SLUG_STRIP.sub("", text.lower()).strip()
+    return _SLUG_DASHES.sub("-", text).strip("-")
+
+
+def _normalize_date(value: Any) -> str:
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()[:10]
+    return str(value)[:10] if value else ""
+
+
+def _normalize_tags(value: Any) -> list[str]:
+    if not value:
+        return []
+    if isinstance(value, str):
+        value = value.split(",")
+    return [str(tag).strip() for tag in value if str(tag).strip()]
+
+
+@functools.lru_cache(maxsize=1)
+def _parser() -> "MarkdownIt":
+    # markdown-it and python-frontmatter (with PyYAML) are imported on first
+    # use, keeping them out of the web app's startup
+    from markdown_it import MarkdownIt
+
+    return MarkdownIt("commonmark").enable("table").enable("strikethrough")
+
+
+def parse_post(path: str, text: str) -> Post:
+    """Parse a markdown file with YAML frontmatter into a Post.
+
+    Raises FrontmatterError when the frontmatter is not valid YAML.
+    """
+    import frontmatter
+    import yaml
+
+    try:
+        document = frontmatter.loads(text)
+    except yaml.YAMLError as exc:
+        _metadata, body = frontmatter.YAMLHandler().split(text.strip())
+        detail = " ".join(str(exc).split())
+        raise FrontmatterError(path, detail, body.strip()) from exc
+    meta: dict[str, Any] = document.metadata
+    stem = PurePosixPath(path).stem
+    title = str(meta.get("title") or stem)
+    # An explicit slug is slugified too, so it can never contain "/" or ".."
+    slug = slugify(str(meta.get("slug") or "")) or slugify(title) or slugify(stem)
+    return Post(
+        path=path,
+        title=title,
+        body=document.content,
+        date=_normalize_date(meta.get("date")),
+        type="page" if meta.get("type") == "page" else "post",
+        slug=slug,
+        tags=_normalize_tags(meta.get("tags")),
+    )
+
+
+def render_markdown(body: str) -> str:
+    """Render a markdown body to an HTML fragment."""
+    html: str = _parser().render(body)
+    return html
@@ -0,0 +1,168 @@
+# ABOUTME: Opt-in local mirror of the content repository kept as a bare git clone
+# ABOUTME: Syncs by comparing branch heads and fetching deltas, then reads locally
+import os
+import subprocess
+from collections.abc import Iterable
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from app.services.github import TreeEntry
+
+
+class MirrorError(Exception):
+    """A git command against the mirror failed."""
+
+
+@dataclass
+class SyncResult:
+    """What a sync changed in the mirror."""
+
+    old_head: str | None
+    new_head: str | None
+    changed: list[str] = field(default_factory=list)  # Added or modified paths
+    deleted: list[str] = field(default_factory=list)
+
+    @property
+    def updated(self) -> bool:
+        return self.old_head != self.new_head
+
+
+def github_remote_url(repo: str, token: str | None = None) -> str:
+    """Return the HTTPS clone URL of ``repo`` ("user/repo"), with ``token`` if given."""
+    auth = f"x-access-token:{token}@" if token else ""
+    return f"https://{auth}github.com/{repo}.git"
+
+
+class ContentMirror:
+    """A bare clone of one branch of the content repository.
+
+    ``sync`` asks the remote for the branch head with ``git ls-remote`` and
+    only fetches when it differs from the local ref; git then transfers just
+    the new objects. Listing and reading are answered from the local object
+    store, so they cost no API calls.
+    """
+
+    def __init__(self, path: str | Path, remote_url: str, branch: str = "main"):
+        self.path = Path(path)
+        self.remote_url = remote_url
+        self.branch = branch
+        self._tree: tuple[str, list[TreeEntry]] | None = None
+
+    @property
+    def ref(self) -> str:
+        return f"refs/heads/{self.branch}"
+
+    def _git(self, *args: str, stdin: bytes | None = None) -> bytes:
+        env = {**os.environ, "GIT_TERMINAL_PROMPT": "0"}
+        result = subprocess.run(
+            ["git", "--git-dir", str(self.path), *args],
+            input=stdin,
+            capture_output=True,
+            env=env,
+        )
+        if result.returncode != 0:
+            # Never echo the remote URL, it may carry a token
+            message = result.stderr.decode(errors="replace").replace(
+                self.remote_url, "<remote>"
+            )
+            raise MirrorError(f"git {args[0]} failed: {message.strip()}")
+        return result.stdout
+
+    def _ensure_initialized(self) -> None:
+        if not (self.path / "HEAD").exists():
+            self.path.mkdir(parents=True, exist_ok=True)
+            self._git("init", "--bare", "--quiet")
+
+    def head(self) -> str | None:
+        """Return the mirrored branch head SHA, or None before the first sync."""
+        if not (self.path / "HEAD").exists():
+            return None
+        try:
+            return (
+                self._git("rev-parse", "--verify", "--quiet", self.ref).decode().strip()
+            )
+        except MirrorError:
+            return None
+
+    def remote_head(self) -> str | None:
+        """Ask the remote for the current branch head without fetching anything."""
+        self._ensure_initialized()
+        output = self._git("ls-remote", self.remote_url, self.ref).decode().split()
+        return output[0] if output else None
+
+    def sync(self) -> SyncResult:
+        """Bring the mirror up to date and report which paths changed."""
+        old_head = self.head()
+        new_head = self.remote_head()
+        if new_head is None:
+            raise MirrorError(f"Branch '{self.branch}' not found on remote")
+        if new_head == old_head:
+            return SyncResult(old_head, new_head)
+
+        self._git(
+            "fetch", "--quiet", "--no-tags", self.remote_url, f"+{self.ref}:{self.ref}"
+        )
+        if old_head is None:
+            changed = [entry.path for entry in self.list_files()]
+            return SyncResult(old_head, new_head, changed=changed)
+
+        result = SyncResult(old_head, new_head)
+        output = self._git(
+            "diff-tree", "-r", "-z", "--no-renames", "--name-status", old_head, new_head
+        )
+        fields = output.decode().split("\0")
+        for status, path in zip(fields[0::2], fields[1::2], strict=False):
+            (result.deleted if status == "D" else result.changed).append(path)
+        return result
+
+    def list_files(self) -> list[TreeEntry]:
+        """List every file on the mirrored branch."""
+        head = self.head()
+        if head is None:
+            return []
+        if self._tree is not None and self._tree[0] == head:
+            return self._tree[1]
+        entries = []
+        output = self._git("ls-tree", "-r", "-z", "--long", head).decode()
+        for line in filter(None, output.split("\0")):
+            info, path = line.split("\t", 1)
+            _mode, kind, sha, size = info.split()
+            if kind == "blob":
+                entries.append(TreeEntry(path, sha, int(size)))
+        self._tree = (head, entries)
+        return entries
+
+    def read(self, path: str) -> bytes:
+        """Return the content of one file on the mirrored branch."""
+        return self._git("cat-file", "blob", f"{self.ref}:{path}")
+
+    def read_many(self, paths: Iterable[str]) -> dict[str, bytes]:
+        """Read many files with a single ``git cat-file --batch`` process."""
+        shas = {entry.path: entry.sha for entry in self.list_files()}
+        wanted = [path for path in paths if path in shas]
+        if not wanted:
+            return {}
+        output = self._git(
+            "cat-file",
+            "--batch",
+            stdin="".join(f"{shas[path]}\n" for path in wanted).encode(),
+        )
+        contents: dict[str, bytes] = {}
+        offset = 0
+        for path in wanted:
+            header_end = output.index(b"\n", offset)
+            size = int(output[offset:header_end].split()[2])
+            start = header_end + 1
+            contents[path] = output[start : start + size]
+            offset = start + size + 1
+        return contents
+
+    def read_markdown(self) -> dict[str, str]:
+        """Return every markdown file on the branch, ready for the site builder."""
+        paths = [
+            entry.path for entry in self.list_files() if entry.path.endswith(".md")
+        ]
+        return {
+            path: content.decode("utf-8")
+            for path, content in self.read_many(paths).items()
+        }
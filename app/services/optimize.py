@@ -0,0 +1,294 @@
+# ABOUTME: Post-build optimization: HTML/CSS minification and asset fingerprinting
+# ABOUTME: Skips files unchanged since the last run and minifies pages in parallel
+import json
+import re
+import time
+from collections.abc import Mapping
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass, field
+from functools import partial
+from pathlib import Path, PurePosixPath
+
+from app.database import Database
+from app.services.static_site import content_hash
+
+# Asset name -> fingerprinted name, published alongside the site
+MANIFEST_PATH = "asset-manifest.json"
+
+# Files given fingerprinted copies; pages reference those copies instead
+ASSET_EXTENSIONS = frozenset({".css", ".js"})
+
+# Hex digits of the content hash in fingerprinted file names
+FINGERPRINT_LENGTH = 10
+
+# Bump whenever minification changes so every file is processed again
+OPTIMIZER_VERSION = "1"
+
+# Pages sent to a worker process per task when minifying in parallel
+OPTIMIZE_CHUNK_SIZE = 64
+
+_FINGERPRINTED = re.compile(rf"\.[0-9a-f]{{{FINGERPRINT_LENGTH}}}(\.[a-z]+)$")
+_REFERENCE = re.compile(r"""((?:href|src)=["']?/)([^"'?#\s>]+)""")
+
+# Elements whose content is whitespace-sensitive or not HTML
+_PRESERVED = re.compile(
+    r"(<(pre|textarea|script|style)\b.*?</\2\s*>|<!--\[if.*?-->)", re.I | re.S
+)
+_COMMENT = re.compile(r"<!--.*?-->", re.S)
+
+# Whitespace next to these tags is never rendered
+_BLOCK_TAGS = [
+    "!doctype",
+    "address",
+    "article",
+    "aside",
+    "blockquote",
+    "body",
+    "dd",
+    "details",
+    "div",
+    "dl",
+    "dt",
+    "fieldset",
+    "figcaption",
+    "figure",
+    "footer",
+    "form",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "head",
+    "header",
+    "hr",
+    "html",
+    "li",
+    "link",
+    "main",
+    "meta",
+    "nav",
+    "ol",
+    "p",
+    "picture",
+    "section",
+    "source",
+    "summary",
+    "table",
+    "tbody",
+    "td",
+    "tfoot",
+    "th",
+    "thead",
+    "title",
+    "tr",
+    "ul",
+]
+_BLOCK_TAG = rf"</?(?:{'|'.join(_BLOCK_TAGS)})\b"
+# Each pattern starts with a literal character so scanning stays fast; the
+# (?![^<>]*>) lookaheads leave whitespace inside tags alone
+_LINE_BREAKS = re.compile(r"\n\s*(?![^<>]*>)")
+_AFTER_BLOCK_TAG = re.compile(rf"({_BLOCK_TAG}[^>]*>)\s+", re.I)
+_BEFORE_BLOCK_TAG = re.compile(rf"\n(?={_BLOCK_TAG})", re.I)
+_SPACES = re.compile(r"  +(?![^<>]*>)")
+_WHITESPACE = re.compile(r"\s+")
+
+_CSS_STRING = r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')"""
+_CSS_STRINGS = re.compile(_CSS_STRING)
+_CSS_COMMENTS = re.compile(_CSS_STRING + r"|/\*.*?\*/", re.S)
+_CSS_PUNCTUATION = re.compile(r"\s*([{};,>])\s*")
+
+
+@dataclass
+class OptimizeReport:
+    """Summary of the optimization stage of a build."""
+
+    minified: list[str] = field(default_factory=list)  # Output paths rewritten
+    fingerprinted: dict[str, str] = field(
+        default_factory=dict
+    )  # Asset -> fingerprinted path
+    deleted: list[str] = field(
+        default_factory=list
+    )  # Stale fingerprinted copies removed
+    unchanged: int = 0  # Files already optimized
+    bytes_saved: int = 0  # By minifying the rewritten files
+    elapsed: float = 0.0  # Seconds
+
+
+def _minify_markup(markup: str) -> str:
+    markup = _LINE_BREAKS.sub("\n", _COMMENT.sub("", markup))
+    markup = _BEFORE_BLOCK_TAG.sub("", _AFTER_BLOCK_TAG.sub(r"\1", markup))
+    return _SPACES.sub(" ", markup)
+
+
+def minify_html(markup: str) -> str:
+    """Drop comments and whitespace that does not render.
+
+    Line breaks and runs of spaces in text collapse to one and whitespace
+    next to block-level tags is removed; ``pre``, ``textarea``, ``script`` and
+    ``style`` contents and conditional comments are kept verbatim.
+    """
+    parts = _PRESERVED.split(markup)
+    # split() yields [text, preserved, tag name, text, ...]
+    return "".join(
+        part if i % 3 == 1 else _minify_markup(part)
+        for i, part in enumerate(parts)
+        if i % 3 != 2
+    )
+
+
+def minify_css(css: str) -> str:
+    """Drop comments and whitespace from CSS, leaving strings untouched."""
+    parts = _CSS_STRINGS.split(
+        _CSS_COMMENTS.sub(lambda match: match.group(1) or "", css)
+    )
+    # split() leaves the strings at odd indexes
+    for i in range(0, len(parts), 2):
+        squeezed = _CSS_PUNCTUATION.sub(r"\1", _WHITESPACE.sub(" ", parts[i]))
+        parts[i] = squeezed.replace(";}", "}")
+    return "".join(parts).strip()
+
+
+def fingerprint_path(path: str, data: bytes) -> str:
+    """``assets/custom.css`` -> ``assets/custom.<hash>.css`` for ``data``."""
+    original = PurePosixPath(path)
+    digest = content_hash(data)[:FINGERPRINT_LENGTH]
+    return str(original.with_name(f"{original.stem}.{digest}{original.suffix}"))
+
+
+def rewrite_references(markup: str, manifest: Mapping[str, str]) -> str:
+    """Point root-relative ``href``/``src`` attributes at fingerprinted assets.
+
+    References to an earlier fingerprint of an asset are updated as well.
+    """
+    if not manifest:
+        return markup
+
+    def replace(match: "re.Match[str]") -> str:
+        path = _FINGERPRINTED.sub(r"\1", match.group(2))
+        return match.group(1) + manifest.get(path, match.group(2))
+
+    return _REFERENCE.sub(replace, markup)
+
+
+def optimize_page(markup: str, manifest: Mapping[str, str]) -> str:
+    """Minify one HTML page and rewrite its asset references."""
+    return minify_html(rewrite_references(markup, manifest))
+
+
+def _optimize_pages(
+    root: str, manifest: dict[str, str], pages: list[tuple[str, str | None]]
+) -> list[tuple[str, str, int | None]]:
+    """Optimize (path, expected hash) pages in place.
+
+    Returns (path, hash after, bytes saved) per page; bytes saved is None for
+    pages that already had the expected hash and were left alone.
+    """
+    results: list[tuple[str, str, int | None]] = []
+    for path, expected in pages:
+        target = Path(root) / path
+        data = target.read_bytes()
+        digest = content_hash(data)
+        if digest == expected:
+            results.append((path, digest, None))
+            continue
+        optimized = optimize_page(data.decode("utf-8"), manifest).encode("utf-8")
+        if optimized != data:
+            target.write_bytes(optimized)
+        results.append((path, content_hash(optimized), len(data) - len(optimized)))
+    return results
+
+
+def _fingerprint_assets(root: Path, report: OptimizeReport) -> dict[str, str]:
+    """Write minified, fingerprinted copies of every asset and return the manifest."""
+    manifest: dict[str, str] = {}
+    assets = [
+        target
+        for target in sorted(root.rglob("*"))
+        if target.suffix.lower() in ASSET_EXTENSIONS and target.is_file()
+    ]
+    for target in assets:
+        path = target.relative_to(root).as_posix()
+        if _FINGERPRINTED.search(path):
+            continue
+        data = target.read_bytes()
+        if target.suffix.lower() == ".css":
+            data = minify_css(data.decode("utf-8")).encode("utf-8")
+        manifest[path] = fingerprint_path(path, data)
+        copy = root / manifest[path]
+        if copy.exists() and copy.read_bytes() == data:
+            report.unchanged += 1
+        else:
+            copy.write_bytes(data)
+            report.minified.append(manifest[path])
+
+    copies = set(manifest.values())
+    for target in assets:
+        path = target.relative_to(root).as_posix()
+        if _FINGERPRINTED.search(path) and path not in copies:
+            target.unlink()
+            report.deleted.append(path)
+    return manifest
+
+
+def optimize_site(
+    db: Database,
+    output_dir: str | Path,
+    workers: int = 1,
+    chunk_size: int = OPTIMIZE_CHUNK_SIZE,
+) -> OptimizeReport:
+    """Minify and fingerprint a built site in ``output_dir`` in place.
+
+    CSS and JS assets get content-hashed copies (``custom.<hash>.css``) that
+    can be cached forever; pages are rewritten to reference them and the
+    mapping is written to ``MANIFEST_PATH``. Pages whose hash matches what
+    the last run left behind, under the same manifest, are skipped. The rest
+    are minified across a process pool when ``workers`` > 1.
+    """
+    start = time.perf_counter()
+    report = OptimizeReport()
+    root = Path(output_dir)
+    manifest = _fingerprint_assets(root, report)
+    report.fingerprinted = manifest
+    manifest_json = json.dumps(manifest, indent=2, sort_keys=True) + "\n"
+    manifest_file = root / MANIFEST_PATH
+    if (
+        not manifest_file.exists()
+        or manifest_file.read_text(encoding="utf-8") != manifest_json
+    ):
+        manifest_file.write_text(manifest_json, encoding="utf-8")
+    manifest_hash = content_hash(OPTIMIZER_VERSION + manifest_json)
+
+    previous = db.get_optimized_outputs()
+    pages = [
+        target.relative_to(root).as_posix()
+        for target in sorted(root.rglob("*.html"))
+        if target.is_file()
+    ]
+    todo = []
+    for path in pages:
+        record = previous.get(path)
+        todo.append(
+            (path, record[1] if record and record[0] == manifest_hash else None)
+        )
+    optimize = partial(_optimize_pages, str(root), manifest)
+    chunks = [todo[i : i + chunk_size] for i in range(0, len(todo), chunk_size)]
+    if workers <= 1 or len(chunks) <= 1:
+        results = [result for chunk in chunks for result in optimize(chunk)]
+    else:
+        with ProcessPoolExecutor(max_workers=min(workers, len(chunks))) as pool:
+            results = [result for done in pool.map(optimize, chunks) for result in done]
+
+    for path, _digest, saved in results:
+        if saved is None:
+            report.unchanged += 1
+        else:
+            report.minified.append(path)
+            report.bytes_saved += saved
+    db.save_optimized_outputs(
+        [(path, manifest_hash, digest) for path, digest, _saved in results],
+        previous.keys() - set(pages),
+    )
+    report.elapsed = time.perf_counter() - start
+    return report
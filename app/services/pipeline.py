@@ -0,0 +1,225 @@
+# ABOUTME: End-to-end publish pipeline: fetch content, build the site, push to Pages
+# ABOUTME: Reports progress per stage so it can run as a background job
+import asyncio
+import cProfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.database import Database
+from app.metrics import metrics
+from app.services.github import GitHubClient
+from app.services.images import ImageReport, VariantCache, build_images, is_image_path
+from app.services.mirror import ContentMirror
+from app.services.optimize import OptimizeReport, optimize_site
+from app.services.publish import PublishPlan, PublishReport, plan_site, publish_site
+from app.services.render_cache import RenderCache
+from app.services.static_site import BuildReport, StepStats, build_site
+
+# Stages in order, with the fraction of the run completed when each starts
+STAGES: tuple[tuple[str, float], ...] = (
+    ("fetch", 0.0),
+    ("build", 0.2),
+    ("images", 0.6),
+    ("optimize", 0.7),
+    ("publish", 0.8),
+)
+
+# Steps broken down in PipelineReport.steps, in order; parse to write happen
+# during the build stage and upload is the publish stage
+STEPS = (
+    "fetch",
+    "parse",
+    "render",
+    "aggregate",
+    "write",
+    "images",
+    "optimize",
+    "upload",
+)
+
+stage_seconds = metrics.histogram(
+    "blogbot_publish_stage_duration_seconds",
+    "Duration of each publish pipeline stage",
+    ["stage"],
+)
+
+
+@dataclass
+class PipelineReport:
+    """Summary of one fetch, build and publish run."""
+
+    sources: int = 0  # Markdown files fetched
+    images: int = 0  # Image originals fetched
+    build: BuildReport = field(default_factory=BuildReport)
+    image_build: ImageReport = field(default_factory=ImageReport)
+    optimize: OptimizeReport = field(default_factory=OptimizeReport)
+    publish: PublishReport = field(default_factory=PublishReport)
+    plan: PublishPlan | None = None  # Set instead of publishing on dry runs
+    timings: dict[str, float] = field(default_factory=dict)  # Seconds per stage
+    steps: dict[str, StepStats] = field(default_factory=dict)  # Time, items, cache hits
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+async def fetch_content(
+    client: GitHubClient, repo: str, branch: str
+) -> tuple[dict[str, str], dict[str, bytes]]:
+    """Fetch the markdown sources and images on ``branch`` of the content repo."""
+    head = await client.get_branch_head(repo, branch)
+    if head is None:
+        return {}, {}
+    wanted = [
+        entry.path
+        for entry in await client.list_tree(repo, head[1])
+        if entry.path.endswith(".md") or is_image_path(entry.path)
+    ]
+    files = await client.get_files(repo, wanted, head[0])
+    sources = {
+        path: data.decode("utf-8")
+        for path, data in files.items()
+        if path.endswith(".md")
+    }
+    images = {path: data for path, data in files.items() if not path.endswith(".md")}
+    return sources, images
+
+
+def _read_mirror(mirror: ContentMirror) -> tuple[dict[str, str], dict[str, bytes]]:
+    mirror.sync()
+    images = mirror.read_many(
+        entry.path for entry in mirror.list_files() if is_image_path(entry.path)
+    )
+    return mirror.read_markdown(), images
+
+
+async def _in_thread[T](
+    profile: cProfile.Profile | None, func: Callable[..., T], *args: Any, **kwargs: Any
+) -> T:
+    """Run a blocking step in a thread, under ``profile`` when given."""
+    if profile is not None:
+        return await asyncio.to_thread(profile.runcall, func, *args, **kwargs)
+    return await asyncio.to_thread(func, *args, **kwargs)
+
+
+async def run_publish(
+    db: Database,
+    client: GitHubClient,
+    output_dir: str | Path,
+    image_cache: str | Path,
+    render_cache: RenderCache | None = None,
+    mirror: ContentMirror | None = None,
+    progress: Callable[[str, float], None] | None = None,
+    dry_run: bool = False,
+    profile: cProfile.Profile | None = None,
+    workers: int = 1,
+) -> PipelineReport:
+    """Build the site from the content repo and publish it to the deployment target.
+
+    Content comes from ``mirror`` (synced first) when given, otherwise from
+    the GitHub API. Blocking build steps run in a thread so the event loop
+    keeps serving requests; ``profile`` collects a profile of those steps.
+    Rendering and minifying fan out over ``workers`` processes.
+    A ``dry_run`` builds the site and records in ``plan`` what publishing
+    would change, without pushing anything.
+    """
+    settings = db.get_settings()
+    deployment = db.get_deployment_config()
+    if settings is None:
+        raise ValueError("Blog settings must be configured before publishing")
+    if deployment is None:
+        raise ValueError("Deployment must be configured before publishing")
+
+    report = PipelineReport()
+    fractions = dict(STAGES)
+    current: str | None = None
+    mark = time.perf_counter()
+
+    def stage(name: str | None) -> None:
+        """Close the timing of the current stage and start ``name``."""
+        nonlocal current, mark
+        now = time.perf_counter()
+        if current is not None:
+            report.timings[current] = now - mark
+            stage_seconds.observe(now - mark, current)
+        current, mark = name, now
+        if progress and name is not None:
+            progress(name, fractions[name])
+
+    stage("fetch")
+    not_modified = client.not_modified
+    if mirror is not None:
+        sources, images = await _in_thread(profile, _read_mirror, mirror)
+    else:
+        sources, images = await fetch_content(
+            client, settings.github_repo, settings.github_branch
+        )
+    report.sources, report.images = len(sources), len(images)
+    fetch_hits = client.not_modified - not_modified
+
+    stage("build")
+    report.build = await _in_thread(
+        profile,
+        build_site,
+        db,
+        output_dir,
+        sources,
+        settings,
+        workers=workers,
+        render_cache=render_cache,
+    )
+
+    stage("images")
+    report.image_build = await _in_thread(
+        profile, build_images, images, output_dir, VariantCache(image_cache)
+    )
+
+    stage("optimize")
+    report.optimize = await _in_thread(profile, optimize_site, db, output_dir, workers)
+
+    stage("publish")
+    target = (
+        client,
+        deployment.target_repo,
+        deployment.target_branch,
+        output_dir,
+        deployment.custom_domain or "",
+    )
+    if dry_run:
+        report.plan = await plan_site(*target)
+    else:
+        report.publish = await publish_site(*target)
+    stage(None)
+
+    images_built, optimized = report.image_build, report.optimize
+    if report.plan is not None:
+        plan = report.plan
+        upload = (
+            len(plan.added) + len(plan.changed) + len(plan.deleted),
+            plan.unchanged,
+        )
+    else:
+        upload = (
+            len(report.publish.uploaded) + len(report.publish.deleted),
+            report.publish.skipped,
+        )
+    report.steps = {
+        "fetch": StepStats(
+            report.timings["fetch"], len(sources) + len(images), fetch_hits
+        ),
+        **report.build.steps,
+        "images": StepStats(
+            report.timings["images"],
+            images_built.generated + images_built.cached,
+            images_built.cached,
+        ),
+        "optimize": StepStats(
+            report.timings["optimize"],
+            len(optimized.minified) + optimized.unchanged,
+            optimized.unchanged,
+        ),
+        "upload": StepStats(report.timings["publish"], *upload),
+    }
+    return report
@@ -0,0 +1,167 @@
+# ABOUTME: Block-level editor preview: renders top-level markdown blocks independently
+# ABOUTME: Caches block HTML by content hash and diffs blocks against the client's
+import re
+from collections.abc import Sequence
+from re import Pattern
+from typing import NamedTuple
+
+from app.cache import MISSING, LRUCache
+from app.services.markdown import render_markdown
+from app.services.render_cache import RenderCache, render_key
+
+# Rendered blocks kept in memory across preview requests
+PREVIEW_CACHE_SIZE = 4096
+
+_FENCE = re.compile(r" {0,3}(`{3,}|~{3,})")
+_LIST_ITEM = re.compile(r" {0,3}(?:[-+*]|\d{1,9}[.)])(?:[ \t]|$)")
+_REFERENCE = re.compile(r" {0,3}\[(?:[^\]\\]|\\.)+\]:")
+_TAG = re.compile(r" {0,3}</?[A-Za-z]")
+# HTML blocks that, unlike the others, continue across blank lines
+_RAW_HTML: list[tuple[Pattern[str], Pattern[str]]] = [
+    (
+        re.compile(r" {0,3}<(?:script|pre|style|textarea)(?:[\s>]|$)", re.I),
+        re.compile(r"</(?:script|pre|style|textarea)>", re.I),
+    ),
+    (re.compile(r" {0,3}<!--"), re.compile(r"-->")),
+    (re.compile(r" {0,3}<\?"), re.compile(r"\?>")),
+    (re.compile(r" {0,3}<!\[CDATA\["), re.compile(r"\]\]>")),
+    (re.compile(r" {0,3}<![A-Za-z]"), re.compile(r">")),
+]
+
+
+class Block(NamedTuple):
+    """One rendered top-level block of the preview."""
+
+    id: str  # DOM id: content hash plus occurrence, unaffected by edits elsewhere
+    html: str
+
+
+class PreviewDiff(NamedTuple):
+    """Changes turning the client's blocks into the current ones."""
+
+    deleted: list[str]  # Block IDs to remove
+    inserted: list[
+        tuple[str | None, Block]
+    ]  # (ID of the preceding block or None, block)
+
+
+def _block_end(line: str) -> Pattern[str] | None:
+    """Pattern closing the fence or raw HTML block ``line`` opens, if it opens one."""
+    fence = _FENCE.match(line)
+    if fence:
+        marker = fence.group(1)
+        return re.compile(rf"\A {{0,3}}{re.escape(marker[0])}{{{len(marker)},}}\s*$")
+    for start, end in _RAW_HTML:
+        opened = start.match(line)
+        if opened:
+            return None if end.search(line, opened.end()) else end
+    return None
+
+
+def split_blocks(body: str) -> list[str]:
+    """Split markdown into chunks that render the same alone as in the document.
+
+    Chunks break at blank lines, except inside fenced code and raw HTML
+    blocks, before indented lines and between items of a list, so the
+    concatenated chunk HTML equals the whole document's. Where the scanner
+    cannot tell (link reference definitions resolve across the document, and
+    a fence after an HTML tag line may be raw HTML) the body is one chunk.
+    """
+    whole = [body] if body.strip() else []
+    lines = body.splitlines(keepends=True)
+    if any(_REFERENCE.match(line) for line in lines):
+        return whole
+
+    chunks: list[str] = []
+    current: list[str] = []
+    blanks: list[str] = []
+    end: Pattern[str] | None = None
+    has_list = False
+    after_tag = False  # An HTML tag line precedes this one without a blank line between
+    for line in lines:
+        if end is not None:
+            current.append(line)
+            if end.search(line):
+                end = None
+            continue
+        if not line.strip():
+            if current:
+                blanks.append(line)
+            after_tag = False
+            continue
+        if blanks:
+            continues = line[0] in " \t" or (has_list and _LIST_ITEM.match(line))
+            if continues:
+                current.extend(blanks)
+            else:
+                chunks.append("".join(current))
+                current, has_list = [], False
+            blanks = []
+        current.append(line)
+        has_list = has_list or bool(_LIST_ITEM.match(line))
+        end = _block_end(line)
+        if end is not None and after_tag:
+            return whole
+        after_tag = after_tag or bool(_TAG.match(line))
+    if current:
+        chunks.append("".join(current))
+    return chunks
+
+
+class BlockRenderer:
+    """Render markdown block by block, reusing the HTML of unchanged blocks.
+
+    Blocks are looked up in memory first. Misses go to ``render_cache`` when
+    given, so blocks rendered before a restart or by another worker are reused.
+    """
+
+    def __init__(
+        self,
+        render_cache: RenderCache | None = None,
+        cache_size: int = PREVIEW_CACHE_SIZE,
+    ):
+        self.render_cache = render_cache
+        self._cache: LRUCache[str, str] = LRUCache(cache_size)
+
+    def render(self, body: str, theme: str = "default") -> list[Block]:
+        blocks = []
+        seen: dict[str, int] = {}
+        for source in split_blocks(body):
+            key = render_key(source, theme)
+            html = self._cache.get(key)
+            if html is MISSING:
+                if self.render_cache is not None:
+                    html = self.render_cache.render(source, theme)
+                else:
+                    html = render_markdown(source)
+                self._cache.put(key, html)
+            occurrence = seen[key] = seen.get(key, -1) + 1
+            blocks.append(Block(f"b-{key[:16]}-{occurrence}", html))
+        return blocks
+
+    def stats(self) -> dict[str, int]:
+        """Return in-memory hit/miss counters for this process."""
+        return {"hits": self._cache.hits, "misses": self._cache.misses}
+
+
+def diff_blocks(current: Sequence[str], blocks: Sequence[Block]) -> PreviewDiff:
+    """Diff the client's block IDs against ``blocks``.
+
+    Blocks shared at the start and end are kept; everything between is
+    replaced. A single edit therefore touches only the blocks it changed.
+    """
+    ids = [block.id for block in blocks]
+    prefix = 0
+    limit = min(len(current), len(ids))
+    while prefix < limit and current[prefix] == ids[prefix]:
+        prefix += 1
+    suffix = 0
+    while (
+        suffix < limit - prefix
+        and current[len(current) - 1 - suffix] == ids[len(ids) - 1 - suffix]
+    ):
+        suffix += 1
+    inserted = [
+        (ids[i - 1] if i else None, blocks[i]) for i in range(prefix, len(ids) - suffix)
+    ]
+    return PreviewDiff(list(current[prefix : len(current) - suffix]), inserted)
@@ -0,0 +1,162 @@
+# ABOUTME: Publishes the built static site to GitHub Pages as a single commit
+# ABOUTME: Uploads only changed blobs via the Git Data API, or plans without pushing
+import asyncio
+import time
+from collections.abc import Mapping
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from app.services.github import GitHubClient, git_blob_sha
+
+
+@dataclass
+class PublishReport:
+    """Summary of a publish to the Pages branch."""
+
+    uploaded: list[str] = field(default_factory=list)  # New or changed files
+    deleted: list[str] = field(default_factory=list)  # Removed from the branch
+    skipped: int = 0  # Files already identical on the remote
+    bytes_uploaded: int = 0
+    commit_sha: str = ""  # Empty when there was nothing to publish
+    elapsed: float = 0.0  # Seconds
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+@dataclass
+class PublishPlan:
+    """What a publish would change on the Pages branch, worked out without pushing."""
+
+    added: list[str] = field(default_factory=list)  # Not on the remote yet
+    changed: list[str] = field(default_factory=list)  # On the remote with other content
+    deleted: list[str] = field(default_factory=list)  # Only on the remote
+    unchanged: int = 0  # Already identical on the remote
+    bytes_to_upload: int = 0
+
+    def to_dict(self) -> dict[str, Any]:
+        return asdict(self)
+
+
+def plan_files(
+    remote: Mapping[str, str], files: Mapping[str, bytes], delete_missing: bool = True
+) -> PublishPlan:
+    """Compare ``files`` with a remote tree of path -> git blob SHA."""
+    plan = PublishPlan()
+    for path, content in sorted(files.items()):
+        sha = remote.get(path)
+        if sha == git_blob_sha(content):
+            plan.unchanged += 1
+            continue
+        (plan.added if sha is None else plan.changed).append(path)
+        plan.bytes_to_upload += len(content)
+    if delete_missing:
+        plan.deleted = sorted(path for path in remote if path not in files)
+    return plan
+
+
+async def _remote_tree(
+    client: GitHubClient, repo: str, branch: str
+) -> tuple[tuple[str, str] | None, dict[str, str]]:
+    """Return the branch head (commit, tree) and its files as path -> blob SHA."""
+    head = await client.get_branch_head(repo, branch)
+    if head is None:
+        return None, {}
+    return head, {
+        entry.path: entry.sha for entry in await client.list_tree(repo, head[1])
+    }
+
+
+def read_output_dir(output_dir: str | Path) -> dict[str, bytes]:
+    """Load every file under the build output directory keyed by relative path."""
+    root = Path(output_dir)
+    return {
+        path.relative_to(root).as_posix(): path.read_bytes()
+        for path in sorted(root.rglob("*"))
+        if path.is_file()
+    }
+
+
+def site_files(output_dir: str | Path, custom_domain: str = "") -> dict[str, bytes]:
+    """Files published for a build output directory, with a ``custom_domain`` CNAME."""
+    files = read_output_dir(output_dir)
+    if custom_domain:
+        files["CNAME"] = f"{custom_domain}\n".encode()
+    return files
+
+
+async def publish_files(
+    client: GitHubClient,
+    repo: str,
+    branch: str,
+    files: Mapping[str, bytes],
+    message: str = "Publish site",
+    delete_missing: bool = True,
+) -> PublishReport:
+    """Make ``branch`` of ``repo`` contain exactly ``files`` in one commit.
+
+    Local git blob SHAs are compared with the remote tree so only new or
+    changed files are uploaded, concurrently through the client's pool. A
+    single tree and commit are then created on top of the current head, and
+    files missing locally are removed when ``delete_missing`` is set.
+    """
+    start = time.perf_counter()
+    report = PublishReport()
+    head, remote = await _remote_tree(client, repo, branch)
+    plan = plan_files(remote, files, delete_missing)
+    changed = sorted(plan.added + plan.changed)
+    report.skipped = plan.unchanged
+    report.deleted = plan.deleted
+
+    if not changed and not report.deleted:
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    shas = await asyncio.gather(
+        *(client.create_blob(repo, files[path]) for path in changed)
+    )
+    entries: list[dict[str, Any]] = [
+        {"path": path, "mode": "100644", "type": "blob", "sha": sha}
+        for path, sha in zip(changed, shas, strict=True)
+    ]
+    entries += [
+        {"path": path, "mode": "100644", "type": "blob", "sha": None}
+        for path in report.deleted
+    ]
+
+    tree = await client.create_tree(repo, entries, base_tree=head[1] if head else None)
+    parents = [head[0]] if head else []
+    report.commit_sha = await client.create_commit(repo, message, tree, parents)
+    await client.set_branch(repo, branch, report.commit_sha, create=head is None)
+
+    report.uploaded = changed
+    report.bytes_uploaded = plan.bytes_to_upload
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+async def publish_site(
+    client: GitHubClient,
+    repo: str,
+    branch: str,
+    output_dir: str | Path,
+    custom_domain: str = "",
+    message: str = "Publish site",
+) -> PublishReport:
+    """Publish a build output directory, adding a CNAME for ``custom_domain``."""
+    return await publish_files(
+        client, repo, branch, site_files(output_dir, custom_domain), message
+    )
+
+
+async def plan_site(
+    client: GitHubClient,
+    repo: str,
+    branch: str,
+    output_dir: str | Path,
+    custom_domain: str = "",
+) -> PublishPlan:
+    """Work out what ``publish_site`` would change, reading the remote tree only."""
+    _head, remote = await _remote_tree(client, repo, branch)
+    return plan_files(remote, site_files(output_dir, custom_domain))
@@ -0,0 +1,82 @@
+# ABOUTME: Content-addressed markdown -> HTML cache shared by preview and build
+# ABOUTME: Persists fragments in SQLite with size-bounded least-recently-used eviction
+import hashlib
+import threading
+import time
+
+from app.database import Database
+from app.services.markdown import RENDERER_VERSION, render_markdown
+
+# Upper bound on the total size of cached HTML fragments
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+# Evict down to this fraction of the limit so eviction does not run on every insert
+EVICTION_TARGET = 0.9
+
+# A hit only rewrites last_used when the stored value is older than this, so
+# hot fragments do not turn every read into a write
+TOUCH_INTERVAL = 60
+
+
+def render_key(body: str, theme: str = "default") -> str:
+    """Cache key for a markdown body under the current renderer and theme."""
+    digest = hashlib.sha256()
+    for part in (RENDERER_VERSION, theme, body):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+class RenderCache:
+    """Render markdown through a content-addressed, size-bounded cache in SQLite.
+
+    Keys are derived from the markdown body, ``RENDERER_VERSION`` and the
+    theme, so editing a post, changing the parser configuration or switching
+    themes all naturally miss. Hit and miss counts are kept per process.
+    """
+
+    def __init__(self, db: Database, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.db = db
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._size: int | None = None  # Bytes stored; read on the first insert
+
+    def render(self, body: str, theme: str = "default") -> str:
+        """Return the HTML for ``body``, rendering and caching it on a miss."""
+        key = render_key(body, theme)
+        now = int(time.time())
+        cached = self.db.get_rendered(key)
+        if cached is not None:
+            html, last_used = cached
+            if now - last_used > TOUCH_INTERVAL:
+                self.db.touch_rendered(key, now)
+            self.record(hits=1)
+            return html
+
+        html = render_markdown(body)
+        self.db.put_rendered(key, html, now)
+        self.record(misses=1)
+        with self._lock:
+            if self._size is None:
+                self._size = self.db.render_cache_size()
+            else:
+                self._size += len(html.encode())
+            evict = self._size > self.max_bytes
+        if evict:
+            size = self.db.evict_rendered(int(self.max_bytes * EVICTION_TARGET))
+            with self._lock:
+                self._size = size
+        return html
+
+    def record(self, hits: int = 0, misses: int = 0) -> None:
+        """Add hits and misses, e.g. ones reported back by build workers."""
+        with self._lock:
+            self.hits += hits
+            self.misses += misses
+
+    def stats(self) -> dict[str, int]:
+        """Return hit/miss counters for this process."""
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,126 @@
+# ABOUTME: Full-text search over the content index for the API and the published site
+# ABOUTME: Builds safe FTS5 queries, highlights snippets and exports a static JSON shard
+import html
+import json
+import re
+import unicodedata
+from collections import Counter
+from collections.abc import Iterable
+from typing import Any
+
+from app.database import SNIPPET_END, SNIPPET_START, Database
+from app.models import SearchHit
+from app.services.markdown import Post
+
+# Written to the site root by the builder for client-side search
+SEARCH_SHARD_PATH = "search.json"
+
+# Bump whenever the shard layout below changes
+SHARD_VERSION = 1
+
+# Per-occurrence weight of a term in the title and tags relative to the body,
+# matching the BM25 column weights used by Database.search_content
+TITLE_WEIGHT = 10
+TAG_WEIGHT = 5
+
+_TERM = re.compile(r"\w+")
+
+# Letters and digits, as FTS5's unicode61 tokenizer splits them (so "_" separates)
+_TOKEN = re.compile(r"[^\W_]+")
+
+
+def fts_query(text: str) -> str | None:
+    """Turn free text into an FTS5 expression matching every word.
+
+    Words are quoted so user input can never be parsed as FTS5 syntax, and the
+    last word matches as a prefix so results appear while typing. Returns None
+    when there is nothing to search for.
+    """
+    terms = _TERM.findall(text)
+    if not terms:
+        return None
+    return " ".join(f'"{term}"' for term in terms) + "*"
+
+
+def tokenize(text: str) -> list[str]:
+    """Split text into lowercase, diacritic-free terms like the FTS5 index does."""
+    text = text.lower()
+    if not text.isascii():
+        text = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in text if not unicodedata.combining(char))
+    return _TOKEN.findall(text)
+
+
+def document_terms(title: str, tags: Iterable[str], body: str) -> dict[str, int]:
+    """Weighted term counts of one document for the search shard."""
+    weights: Counter[str] = Counter(tokenize(body))
+    for text, weight in ((title, TITLE_WEIGHT), (" ".join(tags), TAG_WEIGHT)):
+        for term, count in Counter(tokenize(text)).items():
+            weights[term] += weight * count
+    return {term: weight for term, weight in weights.items() if len(term) > 1}
+
+
+def highlight(snippet: str) -> str:
+    """HTML-escape a search snippet and wrap its matches in <mark>."""
+    return (
+        html.escape(snippet)
+        .replace(SNIPPET_START, "<mark>")
+        .replace(SNIPPET_END, "</mark>")
+    )
+
+
+def search(db: Database, text: str, limit: int = 20) -> list[SearchHit]:
+    """Search indexed content for ``text``, most relevant first."""
+    query = fts_query(text)
+    if query is None:
+        return []
+    return db.search_content(query, limit)
+
+
+def content_url(path: str, title: str, date: str, content_type: str, slug: str) -> str:
+    """Public URL of an indexed file, as the site builder generates it."""
+    return Post(path, title, "", date, content_type, slug).url
+
+
+def build_search_shard(db: Database) -> dict[str, Any]:
+    """Export the search index as a compact shard for client-side search.
+
+    ``docs`` lists ``[url, title, date]`` newest first. ``terms`` maps each
+    term to a flat ``[doc, weight, doc, weight, ...]`` list, where ``doc``
+    indexes ``docs`` and ``weight`` is the document's column-weighted count of
+    the term; a client scores a query by adding the weights of its terms.
+    Per-document terms are stored when a file is indexed, so exporting only
+    merges them.
+    """
+    items = []
+    before = None
+    while True:
+        page = db.list_content(before=before, limit=1000)
+        items.extend(page)
+        if len(page) < 1000:
+            break
+        before = (page[-1].date, page[-1].path)
+
+    stored = db.get_content_terms()
+    postings: dict[str, list[int]] = {}
+    for doc, item in enumerate(items):
+        for term, weight in stored.get(item.path, {}).items():
+            postings.setdefault(term, []).extend((doc, weight))
+
+    return {
+        "version": SHARD_VERSION,
+        "docs": [
+            [
+                content_url(item.path, item.title, item.date, item.type, item.slug),
+                item.title,
+                item.date,
+            ]
+            for item in items
+        ],
+        "terms": dict(sorted(postings.items())),
+    }
+
+
+def render_search_shard(db: Database) -> str:
+    """Serialize the search shard as minified JSON."""
+    return json.dumps(build_search_shard(db), separators=(",", ":"), ensure_ascii=False)
@@ -0,0 +1,661 @@
+# ABOUTME: Static site generation from markdown sources with incremental rebuilds
+# ABOUTME: Tracks content hashes and page dependencies to rebuild only what changed
+import hashlib
+import html
+import json
+import time
+from collections.abc import Iterable, Iterator, Mapping
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, NamedTuple
+
+from app.database import Database
+from app.models import OutputRecord, Settings, SourceRecord
+from app.services.content_index import sync_from_sources
+from app.services.feeds import FEEDS, feed_entries, write_feeds
+from app.services.markdown import (
+    RENDERER_VERSION,
+    FrontmatterError,
+    Post,
+    parse_post,
+    render_markdown,
+    slugify,
+)
+from app.services.render_cache import RenderCache
+from app.services.search import SEARCH_SHARD_PATH, render_search_shard
+
+# Bump whenever the page templates below change so every page is re-rendered
+TEMPLATE_VERSION = "3"
+
+# Settings.custom_css is served as a stylesheet every page links to
+STYLESHEET_PATH = "assets/custom.css"
+
+# Sources sent to a worker process per task when rendering in parallel
+RENDER_CHUNK_SIZE = 64
+
+# Steps of a build broken down in BuildReport.steps, in order
+BUILD_STEPS = ("parse", "render", "aggregate", "write")
+
+
+@dataclass
+class StepStats:
+    """Time, work done and cache hits of one build or publish step."""
+
+    seconds: float = 0.0
+    items: int = 0  # Things processed: sources, pages, files
+    cache_hits: int = 0  # Items skipped or served from a cache
+
+
+@dataclass
+class BuildReport:
+    """Summary of a site build."""
+
+    rebuilt: list[str] = field(default_factory=list)  # Output paths written
+    deleted: list[str] = field(default_factory=list)  # Output paths removed
+    unchanged: int = 0  # Outputs left untouched
+    rendered: int = 0  # Markdown sources parsed and rendered
+    # Source path -> why it failed to render or clashes; its previous output is kept
+    errors: dict[str, str] = field(default_factory=dict)
+    elapsed: float = 0.0  # Seconds
+    # parse, render, aggregate and write; parse and render seconds are
+    # summed over worker processes when rendering in parallel
+    steps: dict[str, StepStats] = field(default_factory=dict)
+
+
+def record_step(
+    steps: dict[str, StepStats],
+    name: str,
+    seconds: float = 0.0,
+    items: int = 0,
+    cache_hits: int = 0,
+) -> StepStats:
+    """Add to the ``name`` entry of ``steps``, creating it if needed."""
+    stats = steps.setdefault(name, StepStats())
+    stats.seconds += seconds
+    stats.items += items
+    stats.cache_hits += cache_hits
+    return stats
+
+
+def content_hash(data: str | bytes) -> str:
+    """Return the SHA-256 hex digest of ``data``."""
+    if isinstance(data, str):
+        data = data.encode()
+    return hashlib.sha256(data).hexdigest()
+
+
+def config_hash(settings: Settings) -> str:
+    """Hash everything besides the source text that affects rendered pages."""
+    return content_hash(
+        json.dumps(
+            [
+                TEMPLATE_VERSION,
+                RENDERER_VERSION,
+                settings.blog_title,
+                settings.blog_description,
+                settings.github_pages_url,
+                settings.theme,
+                settings.custom_css,
+            ]
+        )
+    )
+
+
+def post_metadata(post: Post) -> dict[str, Any]:
+    """Metadata kept in the manifest so aggregate pages never re-parse sources."""
+    return {
+        "title": post.title,
+        "date": post.date,
+        "type": post.type,
+        "slug": post.slug,
+        "tags": post.tags,
+        "url": post.url,
+    }
+
+
+# Templates
+def _layout(settings: Settings, title: str, body: str) -> str:
+    css = (
+        f'<link rel="stylesheet" href="/{STYLESHEET_PATH}">'
+        if settings.custom_css
+        else ""
+    )
+    return (
+        "<!doctype html>\n"
+        '<html lang="en"><head><meta charset="utf-8">'
+        '<meta name="viewport" content="width=device-width, initial-scale=1">'
+        f"<title>{html.escape(title)}</title>"
+        '<link rel="alternate" type="application/rss+xml" href="/feed.xml">'
+        '<link rel="alternate" type="application/atom+xml" href="/atom.xml">'
+        f"{css}</head><body>"
+        f'<header><a href="/">{html.escape(settings.blog_title)}</a></header>'
+        f"<main>{body}</main></body></html>\n"
+    )
+
+
+def render_post_page(
+    post: Post, settings: Settings, body_html: str | None = None
+) -> str:
+    """Render a full HTML page for a single post or page.
+
+    ``body_html`` is the already rendered markdown body, e.g. from RenderCache.
+    """
+    if body_html is None:
+        body_html = render_markdown(post.body)
+    meta = (
+        f"<p><time>{post.date}</time></p>" if post.date and post.type == "post" else ""
+    )
+    tags = "".join(
+        f'<a href="/tags/{slugify(tag)}/">{html.escape(tag)}</a> ' for tag in post.tags
+    )
+    body = (
+        f"<article><h1>{html.escape(post.title)}</h1>{meta}"
+        f"{body_html}"
+        f"{f'<p>{tags.strip()}</p>' if tags else ''}</article>"
+    )
+    return _layout(settings, f"{post.title} - {settings.blog_title}", body)
+
+
+def _post_list(entries: list[dict[str, Any]]) -> str:
+    items = "".join(
+        f"<li><time>{entry['date']}</time> "
+        f'<a href="{entry["url"]}">{html.escape(entry["title"])}</a></li>'
+        for entry in entries
+    )
+    return f"<ul>{items}</ul>"
+
+
+def render_index_page(entries: list[dict[str, Any]], settings: Settings) -> str:
+    """Render the homepage listing every post, newest first."""
+    body = f"<p>{html.escape(settings.blog_description)}</p>{_post_list(entries)}"
+    return _layout(settings, settings.blog_title, body)
+
+
+def render_tag_page(tag: str, entries: list[dict[str, Any]], settings: Settings) -> str:
+    """Render the listing page for one tag."""
+    body = f"<h1>Tagged “{html.escape(tag)}”</h1>{_post_list(entries)}"
+    return _layout(settings, f"{tag} - {settings.blog_title}", body)
+
+
+class RenderedSource(NamedTuple):
+    """A rendered page plus the metadata the manifest keeps for its source."""
+
+    path: str
+    output_path: str
+    metadata: dict[str, Any]
+    page: str
+
+
+def render_source(
+    path: str,
+    text: str,
+    settings: Settings,
+    cache: RenderCache | None = None,
+    steps: dict[str, StepStats] | None = None,
+) -> RenderedSource:
+    """Parse frontmatter and render the full page for one markdown source.
+
+    Parse and render times are added to ``steps`` when given.
+    """
+    start = time.perf_counter()
+    post = parse_post(path, text)
+    parsed = time.perf_counter()
+    body_html = cache.render(post.body, settings.theme) if cache else None
+    page = render_post_page(post, settings, body_html)
+    if steps is not None:
+        record_step(steps, "parse", parsed - start, 1)
+        record_step(steps, "render", time.perf_counter() - parsed, 1)
+    return RenderedSource(path, post.output_path, post_metadata(post), page)
+
+
+# Per-worker-process state, installed once by the pool initializer
+_worker_settings: Settings | None = None
+_worker_cache: RenderCache | None = None
+
+
+def _init_render_worker(
+    settings: Settings, cache_db_path: str | None, cache_max_bytes: int
+) -> None:
+    global _worker_settings, _worker_cache
+    _worker_settings = settings
+    if cache_db_path is not None:
+        _worker_cache = RenderCache(Database(cache_db_path), cache_max_bytes)
+
+
+def _render_each(
+    sources: Iterable[tuple[str, str]],
+    settings: Settings,
+    cache: RenderCache | None,
+    steps: dict[str, StepStats] | None,
+    errors: dict[str, str] | None,
+) -> Iterator[RenderedSource]:
+    for path, text in sources:
+        if errors is None:
+            yield render_source(path, text, settings, cache, steps)
+            continue
+        try:
+            yield render_source(path, text, settings, cache, steps)
+        except FrontmatterError as exc:
+            errors[path] = str(exc)
+
+
+def _render_chunk(
+    chunk: list[tuple[str, str]], collect_errors: bool
+) -> tuple[list[RenderedSource], int, int, dict[str, StepStats], dict[str, str]]:
+    assert _worker_settings is not None
+    before = _worker_cache.stats() if _worker_cache else {"hits": 0, "misses": 0}
+    steps: dict[str, StepStats] = {}
+    errors: dict[str, str] | None = {} if collect_errors else None
+    rendered = list(_render_each(chunk, _worker_settings, _worker_cache, steps, errors))
+    after = _worker_cache.stats() if _worker_cache else before
+    hits, misses = after["hits"] - before["hits"], after["misses"] - before["misses"]
+    return rendered, hits, misses, steps, errors or {}
+
+
+def render_sources(
+    sources: Iterable[tuple[str, str]],
+    settings: Settings,
+    workers: int = 1,
+    chunk_size: int = RENDER_CHUNK_SIZE,
+    cache: RenderCache | None = None,
+    steps: dict[str, StepStats] | None = None,
+    errors: dict[str, str] | None = None,
+) -> Iterator[RenderedSource]:
+    """Render (path, markdown) pairs, yielding results in input order.
+
+    With ``workers`` > 1 the work is split into chunks and fanned out over a
+    process pool. Each worker receives the settings once through the pool
+    initializer and reuses the module-level markdown parser for every file.
+    When a ``cache`` is given, workers open their own connection to its
+    database and report their hits and misses back to it. Per-step timings
+    are added to ``steps`` when given. With an ``errors`` dict, sources with
+    invalid frontmatter are recorded there and skipped instead of raising.
+    """
+    if workers <= 1:
+        yield from _render_each(sources, settings, cache, steps, errors)
+        return
+
+    items = list(sources)
+    chunks = [items[i : i + chunk_size] for i in range(0, len(items), chunk_size)]
+    with ProcessPoolExecutor(
+        max_workers=min(workers, len(chunks)) or 1,
+        initializer=_init_render_worker,
+        initargs=(
+            settings,
+            cache.db.db_path if cache else None,
+            cache.max_bytes if cache else 0,
+        ),
+    ) as pool:
+        results = pool.map(_render_chunk, chunks, [errors is not None] * len(chunks))
+        for rendered, hits, misses, chunk_steps, chunk_errors in results:
+            if errors is not None:
+                errors.update(chunk_errors)
+            if cache:
+                cache.record(hits=hits, misses=misses)
+            if steps is not None:
+                for name, stats in chunk_steps.items():
+                    record_step(
+                        steps, name, stats.seconds, stats.items, stats.cache_hits
+                    )
+            yield from rendered
+
+
+class SiteBuilder:
+    """Build the static site into ``output_dir``, re-rendering only what changed.
+
+    The manifest in ``Database`` maps every markdown source to the hash of its
+    content, the hash of the page rendered from it and the metadata aggregate
+    pages need. Aggregate pages (``index.html`` and ``tags/<tag>/index.html``)
+    record which sources they were built from, so a change to one post only
+    re-renders that post and the aggregates that list it. The content and
+    search index is updated from the same sources; ``search.json`` and the
+    feeds are streamed out of it whenever it changed.
+    """
+
+    def __init__(
+        self,
+        db: Database,
+        output_dir: str | Path,
+        settings: Settings,
+        workers: int = 1,
+        render_cache: RenderCache | None = None,
+    ):
+        self.db = db
+        self.output_dir = Path(output_dir)
+        self.settings = settings
+        self.workers = workers
+        self.render_cache = render_cache
+
+    def build(self, sources: Mapping[str, str], full: bool = False) -> BuildReport:
+        """Build the site from ``sources`` (path -> markdown) and report what changed.
+
+        ``sources`` is the complete set of content; manifest entries for paths
+        that are no longer present are treated as deletions. ``full`` ignores
+        the manifest and rebuilds everything. Sources that fail to parse, or
+        that render to an output path another source already uses, are listed
+        in ``errors`` and keep their previous output, if any.
+        """
+        start = time.perf_counter()
+        report = BuildReport(steps={name: StepStats() for name in BUILD_STEPS})
+        config = config_hash(self.settings)
+        manifest = self.db.get_build_sources()
+        sources = {path: text for path, text in sources.items() if path.endswith(".md")}
+
+        # Work out which sources need rendering; unchanged ones are parse cache hits
+        records: dict[str, SourceRecord] = {}
+        changed: list[str] = []
+        with self._step(report, "parse"):
+            for path, text in sources.items():
+                digest = content_hash(text)
+                record = manifest.get(path)
+                if (
+                    not full
+                    and record is not None
+                    and record.content_hash == digest
+                    and record.config_hash == config
+                    and (self.output_dir / record.output_path).exists()
+                ):
+                    records[path] = record
+                    report.unchanged += 1
+                else:
+                    changed.append(path)
+                    records[path] = SourceRecord(path, digest, config, "", "", {})
+            deleted = [path for path in manifest if path not in sources]
+
+            # Output path -> the source it belongs to; unchanged sources keep theirs.
+            # Another source may have overwritten a shared output before it was
+            # deleted or moved, so the remaining owner is rendered and written again
+            owners = {
+                records[path].output_path: path
+                for path in sources
+                if path not in changed
+            }
+            forced: set[str] = set()
+            for path in deleted + [path for path in changed if path in manifest]:
+                owner = owners.get(manifest[path].output_path)
+                if owner is not None and owner not in forced:
+                    forced.add(owner)
+                    changed.append(owner)
+                    records[owner] = SourceRecord(
+                        owner, records[owner].content_hash, config, "", "", {}
+                    )
+                    report.unchanged -= 1
+
+        written: list[SourceRecord] = []
+        cache_hits = self.render_cache.stats()["hits"] if self.render_cache else 0
+        rendered = render_sources(
+            ((path, sources[path]) for path in changed),
+            self.settings,
+            self.workers,
+            cache=self.render_cache,
+            steps=report.steps,
+            errors=report.errors,
+        )
+        for path, output_path, metadata, page in rendered:
+            if self._escapes(output_path):
+                report.errors[path] = (
+                    f"{path}: renders to {output_path}, outside the output directory"
+                )
+                continue
+            owner = owners.setdefault(output_path, path)
+            if owner != path:
+                report.errors[path] = (
+                    f"{path}: renders to {output_path}, which {owner} uses"
+                )
+                continue
+            record = records[path]
+            record.output_path = output_path
+            record.output_hash = content_hash(page)
+            record.metadata = metadata
+            previous = manifest.get(path)
+            if (
+                not full
+                and path not in forced
+                and previous is not None
+                and previous.output_hash == record.output_hash
+                and previous.output_path == record.output_path
+                and (self.output_dir / record.output_path).exists()
+            ):
+                report.unchanged += 1
+                record_step(report.steps, "write", cache_hits=1)
+            else:
+                self._write(record.output_path, page, report)
+            written.append(record)
+        # Failed sources stay as the last good build left them, unless another
+        # source now owns their output, and the next build tries them again
+        for path in report.errors:
+            changed.remove(path)
+            previous = manifest.get(path)
+            if previous is not None and owners.get(previous.output_path, path) == path:
+                records[path] = previous
+            else:
+                del records[path]
+        report.rendered = len(changed)
+        if self.render_cache:
+            record_step(
+                report.steps,
+                "render",
+                cache_hits=self.render_cache.stats()["hits"] - cache_hits,
+            )
+
+        # Remove pages whose source was deleted or now renders elsewhere
+        live = {record.output_path for record in records.values()}
+        stale = [manifest[path].output_path for path in deleted]
+        stale += [manifest[path].output_path for path in changed if path in manifest]
+        for output_path in sorted(set(stale) - live):
+            self._delete(output_path, report)
+
+        with self._step(report, "aggregate"):
+            outputs, deleted_outputs = self._build_aggregates(
+                records, set(changed) | set(deleted), config, full, report
+            )
+
+            # Keep the search index in step with the sources and refresh its shard
+            indexed, unindexed = sync_from_sources(self.db, sources)
+            if (
+                full
+                or indexed
+                or unindexed
+                or not (self.output_dir / SEARCH_SHARD_PATH).exists()
+            ):
+                self._write(SEARCH_SHARD_PATH, render_search_shard(self.db), report)
+            else:
+                report.unchanged += 1
+            feeds = [
+                path
+                for rss_path, atom_path, _ in FEEDS
+                for path in (rss_path, atom_path)
+            ]
+            config_changed = any(
+                record.config_hash != config for record in manifest.values()
+            )
+            if (
+                full
+                or indexed
+                or unindexed
+                or config_changed
+                or not all((self.output_dir / path).exists() for path in feeds)
+            ):
+                self._write_feeds(report)
+            else:
+                report.unchanged += len(feeds)
+        self._write_stylesheet(report)
+        self.db.save_build(written, deleted, outputs, deleted_outputs)
+        report.elapsed = time.perf_counter() - start
+        return report
+
+    @contextmanager
+    def _step(self, report: BuildReport, name: str) -> Iterator[None]:
+        """Add the time (less file writes), outputs written and skipped to ``name``."""
+        write = report.steps["write"]
+        start, writing = time.perf_counter(), write.seconds
+        rebuilt, unchanged = len(report.rebuilt), report.unchanged
+        yield
+        record_step(
+            report.steps,
+            name,
+            time.perf_counter() - start - (write.seconds - writing),
+            len(report.rebuilt) - rebuilt,
+            report.unchanged - unchanged,
+        )
+
+    def _plan_aggregates(
+        self, records: dict[str, SourceRecord]
+    ) -> dict[str, list[str]]:
+        """Map each aggregate output path to its source paths, in display order."""
+        posts = sorted(
+            (
+                record
+                for record in records.values()
+                if record.metadata["type"] == "post"
+            ),
+            key=lambda record: (record.metadata["date"], record.path),
+            reverse=True,
+        )
+        plan: dict[str, list[str]] = {
+            "index.html": [record.path for record in posts],
+        }
+        for record in posts:
+            for tag in record.metadata["tags"]:
+                plan.setdefault(f"tags/{slugify(tag)}/index.html", []).append(
+                    record.path
+                )
+        return plan
+
+    def _build_aggregates(
+        self,
+        records: dict[str, SourceRecord],
+        touched: set[str],
+        config: str,
+        full: bool,
+        report: BuildReport,
+    ) -> tuple[list[OutputRecord], list[str]]:
+        plan = self._plan_aggregates(records)
+        previous = self.db.get_build_outputs()
+        if full:
+            affected = set(plan)
+        else:
+            affected = self.db.get_build_dependents(touched)
+            affected |= {
+                output
+                for output, deps in plan.items()
+                if output not in previous
+                or not (self.output_dir / output).exists()
+                or touched.intersection(deps)
+            }
+
+        outputs: list[OutputRecord] = []
+        for output_path in sorted(affected & plan.keys()):
+            deps = plan[output_path]
+            entries = [records[path].metadata for path in deps]
+            inputs = content_hash(json.dumps([config, deps, entries]))
+            old = previous.get(output_path)
+            if (
+                not full
+                and old is not None
+                and old.inputs_hash == inputs
+                and (self.output_dir / output_path).exists()
+            ):
+                continue
+            page = self._render_aggregate(output_path, entries)
+            self._write(output_path, page, report)
+            outputs.append(OutputRecord(output_path, inputs, content_hash(page), deps))
+        report.unchanged += len(plan) - len(outputs)
+
+        deleted_outputs = [path for path in previous if path not in plan]
+        for output_path in deleted_outputs:
+            self._delete(output_path, report)
+        return outputs, deleted_outputs
+
+    def _render_aggregate(self, output_path: str, entries: list[dict[str, Any]]) -> str:
+        if output_path == "index.html":
+            return render_index_page(entries, self.settings)
+        tag = self._tag_name(output_path, entries)
+        return render_tag_page(tag, entries, self.settings)
+
+    @staticmethod
+    def _tag_name(output_path: str, entries: list[dict[str, Any]]) -> str:
+        tag_slug = output_path.split("/")[1]
+        for entry in entries:
+            for tag in entry["tags"]:
+                if slugify(tag) == tag_slug:
+                    return str(tag)
+        return tag_slug
+
+    def _write_feeds(self, report: BuildReport) -> None:
+        if self.render_cache is not None:
+            cache, theme = self.render_cache, self.settings.theme
+            entries = feed_entries(self.db, lambda body: cache.render(body, theme))
+        else:
+            entries = feed_entries(self.db)
+        written = write_feeds(self.output_dir, self.settings, entries)
+        report.rebuilt.extend(written)
+        # Feeds are rendered and written as a stream, so their time stays with the
+        # aggregates
+        record_step(report.steps, "write", items=len(written))
+
+    def _write_stylesheet(self, report: BuildReport) -> None:
+        target = self.output_dir / STYLESHEET_PATH
+        css = self.settings.custom_css
+        if not css:
+            if target.exists():
+                self._delete(STYLESHEET_PATH, report)
+        elif target.exists() and target.read_text(encoding="utf-8") == css:
+            report.unchanged += 1
+        else:
+            self._write(STYLESHEET_PATH, css, report)
+
+    def _escapes(self, output_path: str) -> bool:
+        """Whether ``output_path`` resolves outside the output directory."""
+        root = self.output_dir.resolve()
+        return not (root / output_path).resolve().is_relative_to(root)
+
+    def _write(self, output_path: str, content: str, report: BuildReport) -> None:
+        if self._escapes(output_path):
+            report.errors[output_path] = f"{output_path}: outside the output directory"
+            return
+        start = time.perf_counter()
+        target = self.output_dir / output_path
+        target.parent.mkdir(parents=True, exist_ok=True)
+        target.write_text(content, encoding="utf-8")
+        report.rebuilt.append(output_path)
+        record_step(report.steps, "write", time.perf_counter() - start, 1)
+
+    def _delete(self, output_path: str, report: BuildReport) -> None:
+        if self._escapes(output_path):
+            report.errors[output_path] = f"{output_path}: outside the output directory"
+            return
+        start = time.perf_counter()
+        target = self.output_dir / output_path
+        if target.exists():
+            target.unlink()
+        report.deleted.append(output_path)
+        record_step(report.steps, "write", time.perf_counter() - start, 1)
+
+
+def build_site(
+    db: Database,
+    output_dir: str | Path,
+    sources: Mapping[str, str],
+    settings: Settings | None = None,
+    full: bool = False,
+    workers: int = 1,
+    render_cache: RenderCache | None = None,
+) -> BuildReport:
+    """Build the site using the stored settings unless ``settings`` is given."""
+    settings = settings or db.get_settings()
+    if settings is None:
+        raise ValueError("Blog settings must be configured before building the site")
+    builder = SiteBuilder(db, output_dir, settings, workers, render_cache)
+    return builder.build(sources, full=full)
+
+
+def read_sources(source_dir: str | Path) -> dict[str, str]:
+    """Load every markdown file under ``source_dir`` keyed by its relative path."""
+    root = Path(source_dir)
+    return {
+        path.relative_to(root).as_posix(): path.read_text(encoding="utf-8")
+        for path in sorted(root.rglob("*.md"))
+    }
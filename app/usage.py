@@ -0,0 +1,86 @@
+# ABOUTME: Batched API key usage tracking that keeps SQLite writes off the request path
+# ABOUTME: Aggregates last_used/request counts in memory and flushes them periodically
+import logging
+import threading
+import time
+from datetime import datetime
+
+from app.database import Database
+
+logger = logging.getLogger("blogbot.usage")
+
+# Seconds between background flushes; also the most usage a crash can lose
+DEFAULT_FLUSH_INTERVAL = 30.0
+
+
+class APIKeyUsageTracker:
+    """Accumulate per-key usage in memory and write it to ``api_keys`` in batches.
+
+    ``record`` is called once per authenticated request and only touches a
+    dict. A background thread flushes the aggregate every ``interval``
+    seconds with a single ``executemany`` transaction, and ``stop`` performs a
+    final flush on shutdown.
+    """
+
+    def __init__(self, db: Database, interval: float = DEFAULT_FLUSH_INTERVAL):
+        self.db = db
+        self.interval = interval
+        self._pending: dict[int, tuple[float, int]] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def record(self, key_id: int) -> None:
+        """Note that ``key_id`` was just used."""
+        now = time.time()
+        with self._lock:
+            previous = self._pending.get(key_id)
+            self._pending[key_id] = (now, previous[1] + 1 if previous else 1)
+
+    def flush(self) -> int:
+        """Write pending usage to the database and return the number of keys updated."""
+        with self._lock:
+            pending, self._pending = self._pending, {}
+        if not pending:
+            return 0
+        try:
+            self.db.record_api_key_usage(
+                (key_id, datetime.fromtimestamp(last_used), count)
+                for key_id, (last_used, count) in pending.items()
+            )
+        except Exception:
+            # Put the usage back so the next flush retries it
+            with self._lock:
+                for key_id, (last_used, count) in pending.items():
+                    current = self._pending.get(key_id)
+                    if current:
+                        last_used = max(last_used, current[0])
+                        count += current[1]
+                    self._pending[key_id] = (last_used, count)
+            raise
+        return len(pending)
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval):
+            try:
+                self.flush()
+            except Exception:
+                logger.exception("Failed to flush API key usage")
+
+    def start(self) -> None:
+        """Start the background flush thread."""
+        if self._thread is not None:
+            return
+        self._stopped.clear()
+        self._thread = threading.Thread(
+            target=self._run, name="api-key-usage-flush", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the background thread and flush whatever is still pending."""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
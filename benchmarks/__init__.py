@@ -0,0 +1,2 @@
+# ABOUTME: Performance benchmarks for BlogBot, runnable as `python -m benchmarks.<name>`
+# ABOUTME: Kept out of the pytest suite so timing noise never fails CI
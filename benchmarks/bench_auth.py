@@ -0,0 +1,62 @@
+# ABOUTME: Benchmark for API key authentication throughput against 10k stored keys
+# ABOUTME: Run with `poetry run python -m benchmarks.bench_auth [keys] [lookups]`
+import random
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from app.database import Database, hash_api_key
+from app.models import APIKey
+
+
+def scan_authenticate(db: Database, raw_key: str) -> bool:
+    """Resolve a key the naive way, by listing every key and comparing hashes."""
+    key_hash = hash_api_key(raw_key)
+    return any(key.key_hash == key_hash and key.is_active for key in db.list_api_keys())
+
+
+def lookups_per_second(authenticate, raw_keys: list) -> float:
+    start = time.perf_counter()
+    for raw_key in raw_keys:
+        authenticate(raw_key)
+    return len(raw_keys) / (time.perf_counter() - start)
+
+
+def run(keys: int = 10_000, lookups: int = 20_000) -> None:
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        raw_keys = [f"key-{i:06d}" for i in range(keys)]
+        for raw_key in raw_keys:
+            db.create_api_key(
+                APIKey(
+                    name=raw_key,
+                    key_hash=hash_api_key(raw_key),
+                    permissions=["read", "write"],
+                )
+            )
+
+        # A realistic mix: a handful of hot agent keys plus some unknown keys
+        hot = rng.sample(raw_keys, 20)
+        workload = [
+            rng.choice(hot) if rng.random() < 0.9 else f"bogus-{rng.randrange(100)}"
+            for _ in range(lookups)
+        ]
+
+        scan = lookups_per_second(lambda k: scan_authenticate(db, k), workload[:20])
+        db._auth_cache.maxsize = 0
+        indexed = lookups_per_second(db.authenticate, workload)
+        db._auth_cache.maxsize = 4096
+        cached = lookups_per_second(db.authenticate, workload)
+        db.close()
+
+    print(f"{keys} keys, {lookups} lookups")
+    print(f"list_api_keys scan:   {scan:10.0f} auth/s")
+    print(f"indexed, no cache:    {indexed:10.0f} auth/s  ({indexed / scan:.0f}x)")
+    print(f"indexed + LRU cache:  {cached:10.0f} auth/s  ({cached / scan:.0f}x)")
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
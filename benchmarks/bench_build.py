@@ -0,0 +1,53 @@
+# ABOUTME: Benchmark comparing full and incremental static site builds on a large corpus
+# ABOUTME: Run with `poetry run python -m benchmarks.bench_build [posts]`
+import sys
+import tempfile
+from pathlib import Path
+
+from app.database import Database
+from app.models import Settings
+from app.services.render_cache import RenderCache
+from app.services.static_site import SiteBuilder
+from benchmarks.corpus import generate_corpus
+
+
+def run(posts: int = 5000) -> None:
+    sources = generate_corpus(posts)
+    settings = Settings("Bench", "Benchmark blog", "user/repo")
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        # Same setup as `blogbot build`; the archive feeds reuse cached fragments
+        builder = SiteBuilder(
+            db, Path(tmp) / "site", settings, render_cache=RenderCache(db)
+        )
+
+        full = builder.build(sources, full=True)
+        noop = builder.build(sources)
+
+        typo_path = "posts/post-00042.md"
+        sources[typo_path] = sources[typo_path].replace("Section 1", "Section One")
+        typo = builder.build(sources)
+
+        new_path = f"posts/post-{posts:05d}.md"
+        sources[new_path] = (
+            "---\ntitle: Brand new\ndate: 2030-01-01\ntags: [python]\n---\nHi"
+        )
+        added = builder.build(sources)
+        db.close()
+
+    print(f"{posts} posts")
+    for label, report in [
+        ("full rebuild", full),
+        ("no changes", noop),
+        ("one-line typo fix", typo),
+        ("new post", added),
+    ]:
+        print(
+            f"{label:18} {report.elapsed * 1000:9.1f} ms  "
+            f"rendered={report.rendered:<5} written={len(report.rebuilt):<5} "
+            f"({full.elapsed / report.elapsed:.0f}x faster than full)"
+        )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
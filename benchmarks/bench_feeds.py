@@ -0,0 +1,59 @@
+# ABOUTME: Benchmark of peak memory while writing full-content RSS and Atom feeds
+# ABOUTME: Run with `poetry run python -m benchmarks.bench_feeds [posts ...]`
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable, Iterable
+from pathlib import Path
+
+from app.database import Database
+from app.models import Settings
+from app.services.content_index import sync_from_sources
+from app.services.feeds import feed_entries, write_feeds
+from benchmarks.corpus import generate_corpus
+
+
+def measure(work: Callable[[], object]) -> tuple[float, float]:
+    """Return (seconds, peak traced MB) of running ``work``."""
+    tracemalloc.start()
+    start = time.perf_counter()
+    work()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak / 1024 / 1024
+
+
+def run(sizes: Iterable[int] = (20000,)) -> None:
+    settings = Settings(
+        "Bench", "Benchmark blog", "user/repo", github_pages_url="https://x.io"
+    )
+    for posts in sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(str(Path(tmp) / "bench.db"))
+            sync_from_sources(db, generate_corpus(posts))
+            site = Path(tmp) / "site"
+
+            def streaming(db: Database = db, site: Path = site) -> None:
+                write_feeds(site, settings, feed_entries(db))
+
+            def materialized(db: Database = db, site: Path = site) -> None:
+                # Every rendered entry held at once, as a whole-document build would
+                entries = list(feed_entries(db))
+                write_feeds(site, settings, entries)
+
+            stream_time, stream_peak = measure(streaming)
+            size = (
+                sum(path.stat().st_size for path in site.rglob("*.xml")) / 1024 / 1024
+            )
+            full_time, full_peak = measure(materialized)
+            db.close()
+
+        print(f"{posts} posts, {size:.1f} MB of feeds (recent + archive, RSS + Atom)")
+        print(f"  streaming     {stream_time:6.1f} s  peak {stream_peak:7.1f} MB")
+        print(f"  materialized  {full_time:6.1f} s  peak {full_peak:7.1f} MB")
+
+
+if __name__ == "__main__":
+    run([int(arg) for arg in sys.argv[1:]] or [20000])
@@ -0,0 +1,98 @@
+# ABOUTME: Micro-benchmark of the home page: pooled vs per-call SQLite connections
+# ABOUTME: Run with `poetry run python -m benchmarks.bench_home [requests]`
+import logging
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from pathlib import Path
+
+import anyio.from_thread
+from starlette.testclient import TestClient
+
+import app.main as main
+from app.database import Database
+from app.models import Settings
+
+# Each measurement is repeated and the median reported, so one slow round
+# (GC pause, page cache miss) does not skew the comparison
+ROUNDS = 5
+
+
+class ClosingConnection(sqlite3.Connection):
+    """Connection that closes itself when its ``with`` block ends."""
+
+    def __exit__(self, *exc_info: object) -> bool:
+        try:
+            return bool(super().__exit__(*exc_info))
+        finally:
+            self.close()
+
+
+class ConnectPerCallDatabase(Database):
+    """Database variant reproducing the old connect-per-call behaviour."""
+
+    def _connection(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.db_path, factory=ClosingConnection)
+        conn.row_factory = sqlite3.Row
+        return conn
+
+
+def median_rate(operation: Callable[[], object], count: int) -> float:
+    """Run ``operation`` ``count`` times per round; median operations per second."""
+    operation()  # Warm up routing, caches and the connection
+    rates = []
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(count):
+            operation()
+        rates.append(count / (time.perf_counter() - start))
+    return statistics.median(rates)
+
+
+def requests_per_second(db: Database, requests: int) -> float:
+    """Serve `/` `requests` times per round against `db` and return the throughput."""
+    main.db = db
+    client = TestClient(main.app)
+    # Serve every request from one event loop, as a real server does, instead
+    # of a fresh loop and worker thread per request (which would also give the
+    # pooled database a new connection per request). Skips the app lifespan.
+    with anyio.from_thread.start_blocking_portal() as portal:
+        client.portal = portal
+        return median_rate(lambda: client.get("/"), requests)
+
+
+def settings_reads_per_second(db: Database, reads: int) -> float:
+    """Read the settings row `reads` times per round, bypassing the cache."""
+    return median_rate(db._load_settings, reads)
+
+
+def run(requests: int = 2000) -> None:
+    logging.disable(logging.INFO)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = str(Path(tmp) / "bench.db")
+        seed = Database(path)
+        seed.save_settings(Settings("Bench", "Benchmark blog", "user/repo"))
+        seed.close()
+
+        per_call = ConnectPerCallDatabase(path)
+        pooled = Database(path)
+        before = requests_per_second(per_call, requests)
+        after = requests_per_second(pooled, requests)
+        reads_before = settings_reads_per_second(per_call, requests * 10)
+        reads_after = settings_reads_per_second(pooled, requests * 10)
+        pooled.close()
+
+    print(f"GET /        connect-per-call: {before:9.0f} req/s")
+    print(f"GET /        pooled:           {after:9.0f} req/s  ({after / before:.2f}x)")
+    print(f"get_settings connect-per-call: {reads_before:9.0f} ops/s")
+    print(
+        f"get_settings pooled:           {reads_after:9.0f} ops/s  "
+        f"({reads_after / reads_before:.2f}x)"
+    )
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 2000)
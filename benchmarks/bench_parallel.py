@@ -0,0 +1,39 @@
+# ABOUTME: Benchmark showing how full-build rendering scales with worker processes
+# ABOUTME: Run with `python -m benchmarks.bench_parallel [posts] [max_workers]`
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+from app.database import Database
+from app.models import Settings
+from app.services.static_site import SiteBuilder
+from benchmarks.corpus import generate_corpus
+
+
+def run(posts: int = 5000, max_workers: int = 0) -> None:
+    max_workers = max_workers or os.cpu_count() or 1
+    sources = generate_corpus(posts)
+    settings = Settings("Bench", "Benchmark blog", "user/repo")
+    counts = sorted(
+        {1, *(2**i for i in range(1, 8) if 2**i <= max_workers), max_workers}
+    )
+
+    print(f"{posts} posts, {os.cpu_count()} cores available")
+    baseline = None
+    for workers in counts:
+        with tempfile.TemporaryDirectory() as tmp:
+            db = Database(str(Path(tmp) / "bench.db"))
+            builder = SiteBuilder(db, Path(tmp) / "site", settings, workers=workers)
+            report = builder.build(sources, full=True)
+            db.close()
+        baseline = baseline or report.elapsed
+        print(
+            f"workers={workers:<3} {report.elapsed:7.2f} s  "
+            f"speedup {baseline / report.elapsed:5.2f}x"
+        )
+
+
+if __name__ == "__main__":
+    args = [int(arg) for arg in sys.argv[1:3]]
+    run(*args)
@@ -0,0 +1,156 @@
+# ABOUTME: Micro-benchmark of row hydration: sqlite3.Row and dicts vs row factories
+# ABOUTME: Run with `poetry run python -m benchmarks.bench_rows [rows]`
+import json
+import sys
+import tempfile
+import time
+import tracemalloc
+from collections.abc import Callable
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+from typing import Any
+
+from app.database import Database, hash_api_key
+from app.models import PERMISSIONS, APIKey, ContentItem, permission_names
+
+# The JSON text the api_keys.permissions column used to hold, per bitmask
+LEGACY_PERMISSIONS = {
+    mask: json.dumps(sorted(permission_names(mask)))
+    for mask in range(1 << len(PERMISSIONS))
+}
+
+
+@dataclass
+class DictContentItem:
+    """ContentItem as it was before slots: one __dict__ per instance."""
+
+    path: str
+    sha: str
+    title: str
+    date: str = ""
+    type: str = "post"
+    slug: str = ""
+    tags: list[str] = field(default_factory=list)
+
+
+@dataclass
+class DictAPIKey:
+    name: str
+    key_hash: str
+    permissions: list[str]
+    created_at: datetime = field(default_factory=datetime.now)
+    is_active: bool = True
+    last_used: Any = None
+    request_count: int = 0
+
+
+def old_list_content(db: Database, limit: int) -> list[DictContentItem]:
+    """The old list_content hydration: SELECT *, Row lookups, json.loads per row."""
+    with db._connection() as conn:
+        rows = conn.execute(
+            "SELECT * FROM content_index ORDER BY date DESC, path DESC LIMIT ?",
+            (limit,),
+        ).fetchall()
+    return [
+        DictContentItem(
+            path=row["path"],
+            sha=row["sha"],
+            title=row["title"],
+            date=row["date"],
+            type=row["type"],
+            slug=row["slug"],
+            tags=json.loads(row["tags"]),
+        )
+        for row in rows
+    ]
+
+
+def old_list_api_keys(db: Database) -> list[DictAPIKey]:
+    """The previous list_api_keys hydration (permissions were JSON text)."""
+    with db._connection() as conn:
+        rows = conn.execute(
+            "SELECT * FROM api_keys ORDER BY created_at DESC"
+        ).fetchall()
+    return [
+        DictAPIKey(
+            name=row["name"],
+            key_hash=row["key_hash"],
+            permissions=json.loads(LEGACY_PERMISSIONS[row["permission_bits"]]),
+            is_active=bool(row["is_active"]),
+            created_at=datetime.fromisoformat(row["created_at"]),
+            last_used=(
+                datetime.fromisoformat(row["last_used"]) if row["last_used"] else None
+            ),
+            request_count=row["request_count"],
+        )
+        for row in rows
+    ]
+
+
+def measure(query: Callable[[], list[Any]], repeat: int = 20) -> tuple[float, int, int]:
+    """Return (best seconds per call, rows, bytes still allocated for the result)."""
+    query()
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        query()
+        best = min(best, time.perf_counter() - start)
+    tracemalloc.start()
+    result = query()
+    retained = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return best, len(result), retained
+
+
+def run(rows: int = 5000) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        db = Database(str(Path(tmp) / "bench.db"))
+        db.upsert_content(
+            [
+                ContentItem(
+                    f"posts/{i:05d}.md",
+                    f"{i:040x}",
+                    f"Post {i}",
+                    f"2020-01-{i % 28 + 1:02d}",
+                    "post",
+                    f"post-{i}",
+                    ["python", "web"][: i % 3],
+                )
+                for i in range(rows)
+            ]
+        )
+        for i in range(rows // 10):
+            db.create_api_key(
+                APIKey(f"key {i}", hash_api_key(str(i)), list(PERMISSIONS[: i % 3]))
+            )
+
+        cases = [
+            (
+                "list_content",
+                lambda: old_list_content(db, rows),
+                lambda: db.list_content(limit=rows),
+            ),
+            ("list_api_keys", lambda: old_list_api_keys(db), db.list_api_keys),
+        ]
+        for name, old, new in cases:
+            before = measure(old)
+            after = measure(new)
+            print(f"{name} ({before[1]} rows)")
+            for label, (seconds, count, retained) in (
+                ("Row + dict", before),
+                ("factory + slots", after),
+            ):
+                print(
+                    f"  {label:16} {seconds / count * 1e6:7.2f} us/row  "
+                    f"{retained / count:7.0f} B/row retained"
+                )
+            print(
+                f"  speedup {before[0] / after[0]:.2f}x, "
+                f"memory {before[2] / after[2]:.2f}x"
+            )
+        db.close()
+
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 5000)
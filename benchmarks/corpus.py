@@ -0,0 +1,159 @@
+# ABOUTME: Deterministic synthetic blog corpus generator for benchmarks
+# ABOUTME: Produces posts with frontmatter, tags, code and images, plus the image files
+import functools
+import io
+import random
+from datetime import date, timedelta
+from typing import Any, NamedTuple
+
+from app.services.images import PILLOW_AVAILABLE
+
+TAGS = [
+    "python",
+    "web",
+    "sqlite",
+    "performance",
+    "design",
+    "testing",
+    "devops",
+    "writing",
+    "books",
+    "travel",
+    "music",
+    "security",
+    "databases",
+    "html",
+]
+
+WORDS = [
+    "the",
+    "quick",
+    "brown",
+    "fox",
+    "jumps",
+    "over",
+    "lazy",
+    "dog",
+    "static",
+    "site",
+    "markdown",
+    "render",
+    "cache",
+    "github",
+    "pages",
+    "publish",
+    "build",
+    "incremental",
+    "feed",
+    "index",
+    "tag",
+    "post",
+    "page",
+    "editor",
+    "preview",
+    "latency",
+    "throughput",
+    "memory",
+    "disk",
+    "network",
+    "request",
+    "response",
+]
+
+CODE_SNIPPETS = [
+    (
+        "python",
+        "def handler(request):\n"
+        "    post = load(request.path)\n"
+        "    return render(post)\n",
+    ),
+    (
+        "sql",
+        "SELECT path, title FROM content_index\nWHERE date < ?\nORDER BY date DESC;\n",
+    ),
+    ("bash", "poetry install\npoetry run blogbot build content site --full\n"),
+    (
+        "javascript",
+        "const res = await fetch('/api/search?q=' + query);\n"
+        "render(await res.json());\n",
+    ),
+]
+
+# One post in this many embeds an image, one in this many a code block
+IMAGE_EVERY = 5
+CODE_EVERY = 3
+
+# Size of generated images; large enough that every responsive variant is made
+IMAGE_SIZE = (1800, 1200)
+
+
+class Corpus(NamedTuple):
+    """Markdown sources and the images they reference, keyed by repository path."""
+
+    sources: dict[str, str]
+    images: dict[str, bytes]
+
+
+def _paragraph(rng: random.Random, words: int) -> str:
+    text = " ".join(rng.choice(WORDS) for _ in range(words))
+    return text[0].upper() + text[1:] + "."
+
+
+def image_path(index: int) -> str:
+    """Repository path of the image embedded by post ``index``."""
+    return f"images/{2015 + index % 10}/figure-{index:05d}.jpg"
+
+
+def generate_post(index: int, rng: random.Random) -> str:
+    """Return one markdown post with YAML frontmatter."""
+    published = date(2015, 1, 1) + timedelta(days=index % 3650, seconds=index)
+    tags = ", ".join(rng.sample(TAGS, rng.randint(1, 3)))
+    sections = []
+    for section in range(rng.randint(2, 5)):
+        sections.append(f"## Section {section + 1}\n")
+        sections.extend(_paragraph(rng, rng.randint(30, 90)) + "\n" for _ in range(2))
+    if index % CODE_EVERY == 0:
+        language, code = rng.choice(CODE_SNIPPETS)
+        sections.insert(2, f"```{language}\n{code}```\n")
+    if index % IMAGE_EVERY == 0:
+        sections.insert(1, f"![Figure {index}](/{image_path(index)})\n")
+    return (
+        f"---\ntitle: Post number {index}\ndate: {published.isoformat()}\n"
+        f"tags: [{tags}]\ntype: post\n---\n\n" + "\n".join(sections)
+    )
+
+
+@functools.lru_cache(maxsize=1)
+def _gradients() -> tuple[Any, Any]:
+    from PIL import Image
+
+    gradient = Image.linear_gradient("L").resize(IMAGE_SIZE)
+    return gradient, gradient.transpose(Image.Transpose.FLIP_LEFT_RIGHT)
+
+
+def generate_image(index: int) -> bytes:
+    """Return a deterministic JPEG; a colour gradient when Pillow is available."""
+    if not PILLOW_AVAILABLE:
+        # Without Pillow images are never decoded, so any distinct bytes will do
+        return b"\xff\xd8\xff\xe0" + index.to_bytes(4, "big") + b"\xff\xd9"
+    from PIL import Image
+
+    red, green = _gradients()
+    blue = Image.new("L", IMAGE_SIZE, (index * 37) % 256)
+    buffer = io.BytesIO()
+    Image.merge("RGB", (red, green, blue)).save(buffer, "JPEG", quality=85)
+    return buffer.getvalue()
+
+
+def generate_corpus(posts: int, seed: int = 0) -> dict[str, str]:
+    """Return ``posts`` synthetic posts keyed by repository path."""
+    rng = random.Random(seed)
+    return {f"posts/post-{i:05d}.md": generate_post(i, rng) for i in range(posts)}
+
+
+def generate_site(posts: int, seed: int = 0) -> Corpus:
+    """Return ``posts`` synthetic posts together with every image they embed."""
+    return Corpus(
+        generate_corpus(posts, seed),
+        {image_path(i): generate_image(i) for i in range(0, posts, IMAGE_EVERY)},
+    )
@@ -0,0 +1,384 @@
+# ABOUTME: Benchmarks for the database, markdown, builds, feeds, images and HTTP routes
+# ABOUTME: Run with `python -m benchmarks.suite --output new.json [--compare old.json]`
+import argparse
+import itertools
+import json
+import logging
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass
+from datetime import UTC, datetime
+from pathlib import Path
+from typing import Any
+
+from app.database import Database, hash_api_key
+from app.models import APIKey, Settings
+from app.services.content_index import content_item, sync_from_sources
+from app.services.feeds import feed_entries, write_feeds
+from app.services.images import VariantCache, build_images
+from app.services.markdown import parse_post, render_markdown
+from app.services.optimize import optimize_site
+from app.services.preview import BlockRenderer
+from app.services.render_cache import RenderCache
+from app.services.search import search
+from app.services.static_site import SiteBuilder
+from benchmarks.corpus import Corpus, generate_site
+
+# Results slower than the baseline by more than this fraction count as regressions
+DEFAULT_THRESHOLD = 0.10
+
+SETTINGS = Settings("Bench", "Benchmark blog", "user/repo")
+
+
+@dataclass
+class Result:
+    """Timing of one benchmark; seconds are per operation."""
+
+    median: float
+    best: float
+    ops: int  # Operations per timed run
+    runs: int
+
+
+def timed(operation: Callable[[], Any], ops: int = 1, runs: int = 5) -> Result:
+    """Time ``runs`` runs of ``ops`` calls to ``operation`` after one warm-up call."""
+    operation()
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for _ in range(ops):
+            operation()
+        samples.append((time.perf_counter() - start) / ops)
+    return Result(statistics.median(samples), min(samples), ops, runs)
+
+
+def once(operation: Callable[[], Any]) -> Result:
+    """Time a single call, for operations that cannot be repeated unchanged."""
+    start = time.perf_counter()
+    operation()
+    elapsed = time.perf_counter() - start
+    return Result(elapsed, elapsed, 1, 1)
+
+
+class Context:
+    """Shared inputs of one suite run: the corpus and a scratch directory."""
+
+    def __init__(self, corpus: Corpus, workdir: Path):
+        self.corpus = corpus
+        self.workdir = workdir
+        self._databases: list[Database] = []
+
+    def database(self, name: str) -> Database:
+        db = Database(str(self.workdir / name))
+        self._databases.append(db)
+        return db
+
+    def close(self) -> None:
+        for db in self._databases:
+            db.close()
+
+
+Group = Callable[[Context], dict[str, Result]]
+GROUPS: dict[str, Group] = {}
+
+
+def group(name: str) -> Callable[[Group], Group]:
+    def register(func: Group) -> Group:
+        GROUPS[name] = func
+        return func
+
+    return register
+
+
+@group("database")
+def bench_database(ctx: Context) -> dict[str, Result]:
+    db = ctx.database("crud.db")
+    results = {}
+    results["save_settings"] = timed(lambda: db.save_settings(SETTINGS), ops=200)
+    results["update_settings"] = timed(
+        lambda: db.update_settings({"theme": "dark"}), ops=200
+    )
+    results["get_settings"] = timed(db.get_settings, ops=5000)
+    results["load_settings_uncached"] = timed(db._load_settings, ops=2000)
+
+    counter = itertools.count()
+    results["create_api_key"] = timed(
+        lambda: db.create_api_key(
+            APIKey("bench", hash_api_key(f"key-{next(counter)}"), ["read", "write"])
+        ),
+        ops=200,
+    )
+    results["list_api_keys"] = timed(db.list_api_keys, ops=20)
+    results["authenticate"] = timed(lambda: db.authenticate("key-7"), ops=5000)
+    uncached = itertools.cycle([f"key-{i}" for i in range(200)])
+    results["authenticate_uncached"] = timed(
+        lambda: (db._auth_cache.clear(), db.authenticate(next(uncached))), ops=2000
+    )
+
+    parsed = [
+        content_item(path, str(i), text)
+        for i, (path, text) in enumerate(ctx.corpus.sources.items())
+    ]
+    items = [item for item, _ in parsed]
+    bodies = {item.path: body for item, body in parsed}
+    results["upsert_content_batch"] = timed(
+        lambda: db.upsert_content(items, bodies), runs=3
+    )
+    results["list_content"] = timed(lambda: db.list_content(limit=50), ops=500)
+    results["list_content_by_tag"] = timed(
+        lambda: db.list_content(tag="python", limit=50), ops=500
+    )
+    results["search_content"] = timed(lambda: search(db, "render cache"), ops=200)
+    return results
+
+
+@group("markdown")
+def bench_markdown(ctx: Context) -> dict[str, Result]:
+    sources = list(ctx.corpus.sources.items())[:200]
+    posts = [parse_post(path, text) for path, text in sources]
+    texts = itertools.cycle(sources)
+    bodies = itertools.cycle(post.body for post in posts)
+
+    # A long draft being edited: the preview re-renders only the edited block
+    draft = "\n\n".join(post.body for post in posts[:20])
+    renderer = BlockRenderer()
+    edits = itertools.count()
+    return {
+        "parse_post": timed(lambda: parse_post(*next(texts)), ops=len(sources)),
+        "render_markdown": timed(lambda: render_markdown(next(bodies)), ops=len(posts)),
+        "render_long_draft": timed(lambda: render_markdown(draft), ops=20),
+        "preview_one_edit": timed(
+            lambda: renderer.render(
+                draft.replace("## Section 1", f"## Section 1.{next(edits)}", 1)
+            ),
+            ops=20,
+        ),
+    }
+
+
+@group("build")
+def bench_build(ctx: Context) -> dict[str, Result]:
+    sources = dict(ctx.corpus.sources)
+    db = ctx.database("build.db")
+    output = ctx.workdir / "site"
+    builder = SiteBuilder(db, output, SETTINGS, render_cache=RenderCache(db))
+    results = {"full_cold": once(lambda: builder.build(sources, full=True))}
+    results["full_warm_render_cache"] = once(lambda: builder.build(sources, full=True))
+    results["noop"] = timed(lambda: builder.build(sources), runs=3)
+    results["optimize_cold"] = once(lambda: optimize_site(db, output))
+    results["optimize_noop"] = timed(lambda: optimize_site(db, output), runs=3)
+
+    path = next(iter(sources))
+    edits = itertools.count()
+
+    def edit() -> None:
+        sources[path] = sources[path].replace(
+            "## Section 1", f"## Section 1.{next(edits)}", 1
+        )
+        builder.build(sources)
+
+    results["one_edit"] = timed(edit, runs=3)
+    return results
+
+
+@group("feeds")
+def bench_feeds(ctx: Context) -> dict[str, Result]:
+    db = ctx.database("feeds.db")
+    sync_from_sources(db, ctx.corpus.sources)
+    output = ctx.workdir / "feeds"
+    return {
+        "write_feeds": timed(
+            lambda: write_feeds(output, SETTINGS, feed_entries(db)), runs=3
+        )
+    }
+
+
+@group("images")
+def bench_images(ctx: Context) -> dict[str, Result]:
+    output = ctx.workdir / "image-site"
+    cache = VariantCache(ctx.workdir / "image-cache")
+    images = ctx.corpus.images
+    return {
+        "build_cold": once(lambda: build_images(images, output, cache)),
+        "build_cached": timed(lambda: build_images(images, output, cache), runs=3),
+    }
+
+
+@group("http")
+def bench_http(ctx: Context) -> dict[str, Result]:
+    # Importing the app opens BLOGBOT_DB, so point it at the scratch directory first
+    os.environ.setdefault("BLOGBOT_DB", str(ctx.workdir / "app.db"))
+    from starlette.testclient import TestClient
+
+    import app.main as main
+
+    db = ctx.database("http.db")
+    db.save_settings(SETTINGS)
+    db.create_api_key(APIKey("bench", hash_api_key("bench-key"), ["read", "write"]))
+    sync_from_sources(db, ctx.corpus.sources)
+    previous = main.db
+    main.db = db
+    logging.disable(logging.INFO)
+    try:
+        client = TestClient(main.app)
+        auth = {"Authorization": "Bearer bench-key"}
+        etag = client.get("/api/content", headers=auth).headers["etag"]
+        revalidate = {**auth, "If-None-Match": etag}
+        preview = next(iter(ctx.corpus.sources.values()))
+        return {
+            "get_health": timed(lambda: client.get("/health"), ops=200),
+            "get_api_content": timed(
+                lambda: client.get("/api/content", headers=auth), ops=200
+            ),
+            "get_api_content_304": timed(
+                lambda: client.get("/api/content", headers=revalidate), ops=200
+            ),
+            "get_api_search": timed(
+                lambda: client.get("/api/search?q=render+cache", headers=auth), ops=200
+            ),
+            "post_preview": timed(
+                lambda: client.post("/preview", data={"content": preview}), ops=200
+            ),
+            "get_metrics": timed(lambda: client.get("/metrics"), ops=100),
+        }
+    finally:
+        logging.disable(logging.NOTSET)
+        main.db = previous
+
+
+@group("startup")
+def bench_startup(ctx: Context) -> dict[str, Result]:
+    # Each run is a fresh interpreter, as on a cold start of the web process
+    env = {
+        **os.environ,
+        "BLOGBOT_DB": str(ctx.workdir / "startup.db"),
+        "BLOGBOT_LOG_LEVEL": "WARNING",
+    }
+
+    def python(code: str) -> Callable[[], Any]:
+        return lambda: subprocess.run([sys.executable, "-c", code], env=env, check=True)
+
+    first_request = (
+        "from starlette.testclient import TestClient\n"
+        "import app.main\n"
+        "with TestClient(app.main.app) as client:\n"
+        "    client.get('/health')\n"
+    )
+    return {
+        "interpreter": timed(python("pass")),
+        "import_app": timed(python("import app.main")),
+        "first_request": timed(python(first_request)),
+    }
+
+
+def _commit() -> str | None:
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def run(posts: int, groups: list[str]) -> dict[str, Any]:
+    """Run the selected groups and return the results document."""
+    corpus = generate_site(posts)
+    results: dict[str, dict[str, float]] = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        ctx = Context(corpus, Path(tmp))
+        try:
+            for name in groups:
+                print(f"{name}...", file=sys.stderr)
+                for bench, result in GROUPS[name](ctx).items():
+                    results[f"{name}.{bench}"] = asdict(result)
+        finally:
+            ctx.close()
+    return {
+        "meta": {
+            "commit": _commit(),
+            "date": datetime.now(UTC).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "posts": posts,
+            "images": len(corpus.images),
+        },
+        "results": results,
+    }
+
+
+def _format_time(seconds: float) -> str:
+    for unit, scale in (("s", 1.0), ("ms", 1e-3), ("us", 1e-6)):
+        if seconds >= scale:
+            return f"{seconds / scale:8.2f} {unit}"
+    return f"{seconds / 1e-9:8.0f} ns"
+
+
+def report(
+    document: dict[str, Any],
+    baseline: dict[str, Any] | None = None,
+    threshold: float = DEFAULT_THRESHOLD,
+) -> int:
+    """Print results (against ``baseline`` if given); return how many regressed."""
+    old = (baseline or {}).get("results", {})
+    regressions = 0
+    for name, result in document["results"].items():
+        line = f"{name:42} {_format_time(result['median'])}"
+        if name in old:
+            ratio = result["median"] / old[name]["median"]
+            flag = ""
+            if ratio > 1 + threshold:
+                regressions += 1
+                flag = "  REGRESSION"
+            line += (
+                f"  {ratio:5.2f}x vs {_format_time(old[name]['median']).strip()}{flag}"
+            )
+        print(line)
+    return regressions
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.suite")
+    parser.add_argument(
+        "--posts", type=int, default=1000, help="Posts in the synthetic corpus"
+    )
+    parser.add_argument(
+        "--only",
+        help=f"Comma-separated groups to run (default all: {','.join(GROUPS)})",
+    )
+    parser.add_argument("--output", help="Write the results as JSON to this file")
+    parser.add_argument(
+        "--compare", help="Results JSON of an earlier run to compare against"
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help="Slowdown fraction reported as a regression (default 0.10)",
+    )
+    args = parser.parse_args(argv)
+
+    groups = args.only.split(",") if args.only else list(GROUPS)
+    unknown = [name for name in groups if name not in GROUPS]
+    if unknown:
+        parser.error(f"unknown groups: {', '.join(unknown)}")
+
+    document = run(args.posts, groups)
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+    regressions = report(document, baseline, args.threshold)
+    if args.output:
+        Path(args.output).write_text(json.dumps(document, indent=2) + "\n")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
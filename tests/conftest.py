@@ -0,0 +1,119 @@
+# ABOUTME: Shared pytest fixtures: stub GitHub API, temporary database and blog content
+# ABOUTME: Provides a threaded local stub HTTP server with per-route handlers
+import json
+import os
+import tempfile
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+# Keep `import app.main` from creating blog.db in the working directory
+os.environ.setdefault(
+    "BLOGBOT_DB", os.path.join(tempfile.mkdtemp(prefix="blogbot-test-"), "blog.db")
+)
+
+from app.database import Database  # noqa: E402 - after BLOGBOT_DB is set
+from app.models import Settings  # noqa: E402
+
+
+class StubGitHub:
+    """Minimal threaded HTTP server standing in for api.github.com.
+
+    Routes map (method, path) to a callable taking the request handler and
+    returning (status, headers, payload); payload is JSON-encoded unless bytes.
+    """
+
+    def __init__(self):
+        self.routes = {}
+        self.requests = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+        self.delay = 0.0
+        self._lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+
+            def log_message(self, *args):
+                pass
+
+            def _handle(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = self.rfile.read(length) if length else b""
+                self.request_body = body
+                with stub._lock:
+                    stub.in_flight += 1
+                    stub.max_in_flight = max(stub.max_in_flight, stub.in_flight)
+                    stub.requests.append(
+                        (self.command, self.path, dict(self.headers), body)
+                    )
+                time.sleep(stub.delay)
+                route = stub.routes.get((self.command, self.path.split("?")[0]))
+                status, headers, payload = (
+                    route(self) if route else (404, {}, {"message": "Not Found"})
+                )
+                data = (
+                    payload
+                    if isinstance(payload, bytes)
+                    else json.dumps(payload).encode()
+                )
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+                with stub._lock:
+                    stub.in_flight -= 1
+
+            do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = _handle  # noqa: N815
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.url = f"http://127.0.0.1:{self.server.server_address[1]}"
+        self.thread = threading.Thread(
+            target=self.server.serve_forever,
+            kwargs={"poll_interval": 0.01},
+            daemon=True,
+        )
+        self.thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@pytest.fixture
+def stub():
+    server = StubGitHub()
+    yield server
+    server.close()
+
+
+@pytest.fixture
+def temp_db():
+    """Create a temporary database for testing."""
+    fd, path = tempfile.mkstemp(suffix=".db")
+    os.close(fd)
+    db = Database(path)
+    yield db
+    db.close()
+    os.unlink(path)
+
+
+@pytest.fixture
+def settings():
+    return Settings("Test Blog", "A blog", "user/repo", github_pages_url="https://x.io")
+
+
+def markdown_post(title, date, tags=(), body="Body"):
+    tag_list = ", ".join(tags)
+    return f"---\ntitle: {title}\ndate: {date}\ntags: [{tag_list}]\n---\n{body}\n"
+
+
+@pytest.fixture
+def post():
+    """Build a post's markdown: ``post(title, date, tags=(), body="Body")``."""
+    return markdown_post
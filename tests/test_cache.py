@@ -0,0 +1,167 @@
+# ABOUTME: Unit tests for the in-process caches backing the database layer
+# ABOUTME: Tests read-through loading, version-based staleness and invalidation
+from dataclasses import FrozenInstanceError
+
+import pytest
+
+from app.cache import MISSING, LRUCache, SingleRowCache
+from app.models import Settings
+
+
+class VersionedSource:
+    """Fake single-row table that counts loads and exposes a data version."""
+
+    def __init__(self):
+        self.version = 0
+        self.loads = 0
+        self.value = Settings("Blog", "Desc", "user/repo")
+
+    def load(self):
+        self.loads += 1
+        return self.value
+
+    def data_version(self):
+        return self.version
+
+
+class TestSingleRowCache:
+    """Test the version-validated single-row read-through cache."""
+
+    def test_repeated_reads_load_once(self):
+        """Reads are served from memory while the version is unchanged."""
+        source = VersionedSource()
+        cache = SingleRowCache(source.load, source.data_version)
+
+        for _ in range(5):
+            assert cache.get().blog_title == "Blog"
+
+        assert source.loads == 1
+
+    def test_version_change_reloads(self):
+        """A changed data version forces a fresh load."""
+        source = VersionedSource()
+        cache = SingleRowCache(source.load, source.data_version)
+        cache.get()
+
+        source.value = Settings("Renamed", "Desc", "user/repo")
+        source.version += 1
+
+        assert cache.get().blog_title == "Renamed"
+        assert source.loads == 2
+
+    def test_invalidate_reloads(self):
+        """Invalidation drops the entry even if the version is unchanged."""
+        source = VersionedSource()
+        cache = SingleRowCache(source.load, source.data_version)
+        cache.get()
+
+        cache.invalidate()
+        cache.get()
+
+        assert source.loads == 2
+
+    def test_invalidate_during_load_is_not_overwritten(self):
+        """A load racing with invalidation does not repopulate the cache."""
+        source = VersionedSource()
+        cache = SingleRowCache(
+            lambda: (cache.invalidate(), source.load())[1], source.data_version
+        )
+        cache.get()
+        cache.get()
+
+        assert source.loads == 2
+
+    def test_returns_shared_frozen_value(self):
+        """Hits hand out the cached instance; frozen models cannot be corrupted."""
+        source = VersionedSource()
+        cache = SingleRowCache(source.load, source.data_version)
+
+        with pytest.raises(FrozenInstanceError):
+            cache.get().blog_title = "Mutated"
+
+        assert cache.get() is cache.get()
+        assert cache.get().blog_title == "Blog"
+
+    def test_caches_missing_row(self):
+        """An absent row is cached as None too."""
+        loads = []
+        cache = SingleRowCache(lambda: loads.append(1), lambda: 0)
+
+        assert cache.get() is None
+        assert cache.get() is None
+        assert len(loads) == 1
+
+
+class TestLRUCache:
+    """Test the bounded, version-aware LRU cache."""
+
+    def test_get_missing_returns_sentinel(self):
+        """Misses return MISSING so None can be cached."""
+        cache = LRUCache(2)
+        assert cache.get("a") is MISSING
+
+        cache.put("a", None)
+        assert cache.get("a") is None
+
+    def test_evicts_least_recently_used(self):
+        """The oldest untouched entry is evicted when full."""
+        cache = LRUCache(2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+
+        assert cache.get("a") == 1
+        assert cache.get("b") is MISSING
+        assert cache.get("c") == 3
+
+    def test_counts_hits_and_misses(self):
+        """Lookups are counted for the cache metrics."""
+        cache = LRUCache(2)
+        cache.get("a")
+        cache.put("a", 1)
+        cache.get("a")
+        cache.get("a")
+
+        assert (cache.hits, cache.misses) == (2, 1)
+
+    def test_version_change_clears(self):
+        """A new version drops everything stored under the old one."""
+        cache = LRUCache(4)
+        cache.get("a", version=1)
+        cache.put("a", 1, version=1)
+        assert cache.get("a", version=1) == 1
+
+        assert cache.get("a", version=2) is MISSING
+        assert len(cache) == 0
+
+    def test_put_with_stale_version_is_ignored(self):
+        """Values loaded under an outdated version are not stored."""
+        cache = LRUCache(4)
+        cache.get("a", version=2)
+        cache.put("a", 1, version=1)
+
+        assert cache.get("a", version=2) is MISSING
+
+    def test_discard_where(self):
+        """Entries can be evicted by value."""
+        cache = LRUCache(4)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.discard_where(lambda value: value == 1)
+
+        assert cache.get("a") is MISSING
+        assert cache.get("b") == 2
+
+    def test_evicts_to_byte_budget(self):
+        """Entries are evicted until the summed sizes fit in maxbytes."""
+        cache = LRUCache(10, maxbytes=5, sizeof=len)
+        cache.put("a", "aa")
+        cache.put("b", "bb")
+        cache.put("c", "cc")
+        cache.put("d", "too long")
+
+        assert cache.get("a") is MISSING
+        assert cache.get("d") is MISSING
+        assert (cache.get("b"), cache.get("c")) == ("bb", "cc")
+        assert cache.nbytes == 4
@@ -0,0 +1,165 @@
+# ABOUTME: Tests for the blogbot command line interface
+# ABOUTME: Runs build against a temporary content directory and publish against a stub
+import pstats
+
+from app.cli import main
+from app.database import Database
+from app.models import DeploymentConfig, Settings
+
+
+class TestBuildCommand:
+    """Test `blogbot build`."""
+
+    def test_build_from_directory(self, tmp_path, capsys):
+        """Markdown under the source directory is built into the output directory."""
+        db_path = str(tmp_path / "blog.db")
+        db = Database(db_path)
+        db.save_settings(Settings("CLI Blog", "Desc", "user/repo"))
+        db.close()
+        content = tmp_path / "content" / "posts"
+        content.mkdir(parents=True)
+        (content / "hello.md").write_text(
+            "---\ntitle: Hello\ndate: 2025-03-01\n---\nHi\n"
+        )
+
+        code = main(
+            [
+                "--db",
+                db_path,
+                "build",
+                str(tmp_path / "content"),
+                str(tmp_path / "site"),
+                "--workers",
+                "2",
+            ]
+        )
+
+        assert code == 0
+        assert (tmp_path / "site" / "2025-03-01-hello.html").exists()
+        assert "+ 2025-03-01-hello.html" in capsys.readouterr().out
+
+    def test_build_optimizes_the_site(self, tmp_path, capsys):
+        """Pages are minified and assets fingerprinted after the build."""
+        db_path = str(tmp_path / "blog.db")
+        db = Database(db_path)
+        db.save_settings(Settings("CLI Blog", "Desc", "user/repo"))
+        db.close()
+        content = tmp_path / "content" / "posts"
+        content.mkdir(parents=True)
+        (content / "hello.md").write_text(
+            "---\ntitle: Hello\ndate: 2025-03-01\n---\nHi\n"
+        )
+
+        code = main(
+            [
+                "--db",
+                db_path,
+                "build",
+                str(tmp_path / "content"),
+                str(tmp_path / "site"),
+            ]
+        )
+
+        assert code == 0
+        assert (tmp_path / "site" / "asset-manifest.json").exists()
+        assert " minified, 0 unchanged" in capsys.readouterr().out
+
+    def test_build_publishes_images(self, tmp_path, capsys):
+        """Images in the content directory are copied into the site."""
+        db_path = str(tmp_path / "blog.db")
+        db = Database(db_path)
+        db.save_settings(Settings("CLI Blog", "Desc", "user/repo"))
+        db.close()
+        images = tmp_path / "content" / "images" / "2025"
+        images.mkdir(parents=True)
+        (images / "anim.gif").write_bytes(b"GIF89a")
+
+        code = main(
+            [
+                "--db",
+                db_path,
+                "build",
+                str(tmp_path / "content"),
+                str(tmp_path / "site"),
+            ]
+        )
+
+        assert code == 0
+        assert (tmp_path / "site/images/2025/anim.gif").read_bytes() == b"GIF89a"
+        assert "1 originals" in capsys.readouterr().out
+
+    def test_build_without_settings_fails(self, tmp_path, capsys):
+        """Building before settings are configured reports an error."""
+        code = main(
+            [
+                "--db",
+                str(tmp_path / "blog.db"),
+                "build",
+                str(tmp_path),
+                str(tmp_path / "site"),
+            ]
+        )
+
+        assert code == 1
+        assert "settings" in capsys.readouterr().err
+
+
+class TestSyncCommand:
+    """Test `blogbot sync`."""
+
+    def test_sync_without_settings_fails(self, tmp_path, capsys):
+        """Syncing needs the content repository from settings."""
+        code = main(
+            ["--db", str(tmp_path / "blog.db"), "sync", str(tmp_path / "m.git")]
+        )
+
+        assert code == 1
+        assert "settings" in capsys.readouterr().err
+
+
+class TestPublishCommand:
+    """Test `blogbot publish`."""
+
+    def test_dry_run_lists_changes_without_pushing(
+        self, tmp_path, stub, monkeypatch, capsys
+    ):
+        """A dry run against an empty Pages branch lists every output as added."""
+        monkeypatch.setenv("GITHUB_API_URL", stub.url)
+        db_path = str(tmp_path / "blog.db")
+        db = Database(db_path)
+        db.save_settings(Settings("CLI Blog", "Desc", "u/blog"))
+        db.save_deployment_config(DeploymentConfig("u/site"))
+        db.close()
+
+        code = main(
+            [
+                "--db",
+                db_path,
+                "publish",
+                "--dry-run",
+                "--output-dir",
+                str(tmp_path / "site"),
+                "--profile",
+                str(tmp_path / "publish.prof"),
+            ]
+        )
+
+        out = capsys.readouterr().out
+        assert code == 0
+        assert "  A index.html" in out
+        assert "render" in out and "upload" in out
+        assert all(method == "GET" for method, *_ in stub.requests)
+        assert pstats.Stats(str(tmp_path / "publish.prof")).total_calls > 0
+
+    def test_publish_without_deployment_fails(self, tmp_path, capsys):
+        db_path = str(tmp_path / "blog.db")
+        db = Database(db_path)
+        db.save_settings(Settings("CLI Blog", "Desc", "u/blog"))
+        db.close()
+
+        code = main(
+            ["--db", db_path, "publish", "--output-dir", str(tmp_path / "site")]
+        )
+
+        assert code == 1
+        assert "Deployment" in capsys.readouterr().err
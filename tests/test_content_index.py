@@ -0,0 +1,121 @@
+# ABOUTME: Tests for the SQLite frontmatter index of the content repository
+# ABOUTME: Covers filtering, keyset pagination and SHA-based incremental syncing
+
+from app.models import ContentItem
+from app.services.content_index import index_file, remove_file, sync_from_mirror
+from app.services.github import TreeEntry, git_blob_sha
+
+
+def item(path, date, content_type="post", tags=()):
+    return ContentItem(
+        path, "sha-" + path, path.upper(), date, content_type, path, list(tags)
+    )
+
+
+class FakeMirror:
+    """Just enough of ContentMirror for indexing."""
+
+    def __init__(self, files):
+        self.files = files
+        self.reads = []
+
+    def list_files(self):
+        return [
+            TreeEntry(path, git_blob_sha(text.encode()), len(text))
+            for path, text in self.files.items()
+        ]
+
+    def read_many(self, paths):
+        self.reads.extend(paths)
+        return {path: self.files[path].encode() for path in paths}
+
+
+class TestListContent:
+    """Test querying the index."""
+
+    def test_newest_first(self, temp_db):
+        temp_db.upsert_content(
+            [item("a", "2025-01-01"), item("b", "2025-03-01"), item("c", "2025-02-01")]
+        )
+
+        assert [i.path for i in temp_db.list_content()] == ["b", "c", "a"]
+
+    def test_filter_by_type_and_tag(self, temp_db):
+        temp_db.upsert_content(
+            [
+                item("a", "2025-01-01", tags=["python"]),
+                item("b", "2025-02-01", tags=["web"]),
+                item("about", "", "page", tags=["python"]),
+            ]
+        )
+
+        assert [i.path for i in temp_db.list_content(content_type="page")] == ["about"]
+        assert [i.path for i in temp_db.list_content(tag="python")] == ["a", "about"]
+        assert [
+            i.path for i in temp_db.list_content(content_type="post", tag="python")
+        ] == ["a"]
+
+    def test_keyset_pagination(self, temp_db):
+        """Pages continue after the (date, path) cursor, including ties on date."""
+        temp_db.upsert_content(
+            [item(f"p{i}", "2025-01-01" if i < 3 else "2025-02-01") for i in range(6)]
+        )
+
+        first = temp_db.list_content(limit=4)
+        rest = temp_db.list_content(before=(first[-1].date, first[-1].path), limit=4)
+
+        assert [i.path for i in first] == ["p5", "p4", "p3", "p2"]
+        assert [i.path for i in rest] == ["p1", "p0"]
+
+    def test_update_replaces_tags(self, temp_db):
+        temp_db.upsert_content([item("a", "2025-01-01", tags=["old"])])
+        temp_db.upsert_content([item("a", "2025-01-01", tags=["new"])])
+
+        assert temp_db.list_content(tag="old") == []
+        assert [i.tags for i in temp_db.list_content(tag="new")] == [["new"]]
+
+
+class TestIndexMaintenance:
+    """Test incremental index updates."""
+
+    def test_index_and_remove_file(self, temp_db):
+        index_file(
+            temp_db, "posts/a.md", "---\ntitle: A\ndate: 2025-01-01\ntags: [x]\n---\n"
+        )
+
+        assert [i.title for i in temp_db.list_content(tag="x")] == ["A"]
+
+        remove_file(temp_db, "posts/a.md")
+        assert temp_db.list_content() == []
+
+    def test_sync_reparses_only_changed_files(self, temp_db):
+        """Only files whose blob SHA changed are read and parsed again."""
+        mirror = FakeMirror(
+            {
+                "posts/a.md": "---\ntitle: A\ndate: 2025-01-01\n---\n",
+                "posts/b.md": "---\ntitle: B\ndate: 2025-01-02\n---\n",
+                "images/x.png": "binary",
+            }
+        )
+        assert sync_from_mirror(temp_db, mirror) == (2, 0)
+
+        mirror.reads.clear()
+        mirror.files["posts/a.md"] = "---\ntitle: A2\ndate: 2025-01-01\n---\n"
+        del mirror.files["posts/b.md"]
+
+        assert sync_from_mirror(temp_db, mirror) == (1, 1)
+        assert mirror.reads == ["posts/a.md"]
+        assert [i.title for i in temp_db.list_content()] == ["A2"]
+
+    def test_sync_keeps_entry_for_invalid_frontmatter(self, temp_db):
+        """A file that stops parsing keeps its last entry and is retried next sync."""
+        mirror = FakeMirror({"posts/a.md": "---\ntitle: A\ndate: 2025-01-01\n---\n"})
+        sync_from_mirror(temp_db, mirror)
+        mirror.files["posts/a.md"] = "---\ntitle: [oops\n---\n"
+
+        assert sync_from_mirror(temp_db, mirror) == (0, 0)
+        assert [i.title for i in temp_db.list_content()] == ["A"]
+
+        mirror.reads.clear()
+        sync_from_mirror(temp_db, mirror)
+        assert mirror.reads == ["posts/a.md"]
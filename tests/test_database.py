@@ -2,20 +2,24 @@
 # ABOUTME: Tests database setup, CRUD operations, and data persistence
 import pytest
 import tempfile
+import json
 import os
+import sqlite3
+import threading
 from datetime import datetime
 
-from app.database import Database
-from app.models import Settings, APIKey, DeploymentConfig
+from app.database import SCHEMA_VERSION, Database, hash_api_key, model_row_factory
+from app.models import APIKey, ContentItem, DeploymentConfig, Settings
 
 
 @pytest.fixture
 def temp_db():
     """Create a temporary database for testing."""
-    fd, path = tempfile.mkstemp(suffix='.db')
+    fd, path = tempfile.mkstemp(suffix=".db")
     os.close(fd)
     db = Database(path)
     yield db
+    db.close()
     os.unlink(path)
 
 
@@ -30,6 +34,212 @@ class TestDatabaseSetup:
         # Tables should exist (this will be tested once we implement the schema)
         # For now, just verify the database object exists
         assert temp_db is not None
+    
+    def test_adds_usage_columns_to_existing_database(self):
+        """Databases created before usage tracking gain the new columns."""
+        fd, path = tempfile.mkstemp(suffix=".db")
+        os.close(fd)
+        with sqlite3.connect(path) as conn:
+            conn.execute("""
+                CREATE TABLE api_keys (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    name TEXT NOT NULL,
+                    key_hash TEXT NOT NULL UNIQUE,
+                    permissions TEXT NOT NULL,
+                    is_active BOOLEAN DEFAULT 1,
+                    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            conn.execute(
+                "INSERT INTO api_keys (name, key_hash, permissions) "
+                "VALUES ('Legacy', 'legacy', '[\"write\", \"read\", \"admin\"]')"
+            )
+        conn.close()
+
+        db = Database(path)
+        key_id = db.create_api_key(APIKey("Old", "hash", ["read"]))
+        retrieved = db.get_api_key(key_id)
+        legacy = db.list_api_keys()[-1]
+        db.close()
+        os.unlink(path)
+
+        assert retrieved.last_used is None
+        assert retrieved.request_count == 0
+        assert retrieved.permissions == ["read"]
+        # JSON permissions become bits; names that were never checked are dropped
+        assert (legacy.name, legacy.permissions) == ("Legacy", ["read", "write"])
+
+    def test_dropped_permissions_are_logged(self, tmp_path, caplog):
+        """Each unknown permission name is logged against its key."""
+        path = str(tmp_path / "old.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE api_keys (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                "key_hash TEXT NOT NULL UNIQUE, permissions TEXT NOT NULL)"
+            )
+            conn.execute(
+                "INSERT INTO api_keys (name, key_hash, permissions) "
+                "VALUES ('Legacy', 'legacy', '[\"admin\", \"read\"]')"
+            )
+        conn.close()
+
+        db = Database(path)
+        with caplog.at_level("WARNING", logger="blogbot.database"):
+            db.init_schema()
+        db.close()
+
+        assert [record.getMessage() for record in caplog.records] == [
+            "Dropping unknown permission 'admin' from API key 1 (Legacy)"
+        ]
+
+    def test_unreadable_permissions_keep_the_old_column(self, tmp_path):
+        """A failed migration rolls back and leaves the JSON column in place."""
+        path = str(tmp_path / "old.db")
+        with sqlite3.connect(path) as conn:
+            conn.execute(
+                "CREATE TABLE api_keys (id INTEGER PRIMARY KEY, name TEXT NOT NULL, "
+                "key_hash TEXT NOT NULL UNIQUE, permissions TEXT NOT NULL)"
+            )
+            conn.execute(
+                "INSERT INTO api_keys (name, key_hash, permissions) "
+                "VALUES ('Broken', 'broken', 'not json')"
+            )
+        conn.close()
+
+        db = Database(path)
+        with pytest.raises(json.JSONDecodeError):
+            db.init_schema()
+        db.close()
+
+        with sqlite3.connect(path) as conn:
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(api_keys)")}
+            stored = conn.execute("SELECT permissions FROM api_keys").fetchone()[0]
+        conn.close()
+        assert "permissions" in columns
+        assert stored == "not json"
+
+    def test_single_row_moved_to_fixed_id(self, tmp_path):
+        """Settings stored under another id by older versions are found and upserted."""
+        path = str(tmp_path / "old.db")
+        first = Database(path)
+        first.save_settings(Settings("Old", "Desc", "user/repo"))
+        with first._connection() as conn:
+            conn.execute("UPDATE settings SET id = 5")
+            conn.execute("PRAGMA user_version = 1")
+        first.close()
+
+        db = Database(path)
+        db.save_settings(Settings("New", "Desc", "user/repo"))
+        with db._connection() as conn:
+            count = conn.execute("SELECT COUNT(*) FROM settings").fetchone()[0]
+
+        assert db.get_settings().blog_title == "New"
+        assert count == 1
+        db.close()
+
+    def test_schema_created_on_first_use(self, tmp_path):
+        """Constructing a Database touches nothing; the first query makes the schema."""
+        path = tmp_path / "lazy.db"
+        db = Database(str(path))
+        assert not path.exists()
+
+        assert db.get_settings() is None
+        db.close()
+        with sqlite3.connect(path) as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+
+        assert version == SCHEMA_VERSION
+
+    def test_current_schema_is_not_recreated(self, tmp_path, monkeypatch):
+        """Opening a database already at SCHEMA_VERSION skips the DDL."""
+        path = str(tmp_path / "current.db")
+        first = Database(path)
+        first.init_schema()
+        first.close()
+
+        def fail(self, conn):
+            raise AssertionError("schema recreated")
+
+        monkeypatch.setattr(Database, "_create_schema", fail)
+        db = Database(path)
+        db.init_schema()
+        db.save_settings(Settings("Blog", "About", "user/repo"))
+
+        assert db.get_settings().blog_title == "Blog"
+        db.close()
+
+
+class TestRowFactory:
+    """Test hydrating models straight from row tuples."""
+
+    def test_builds_model_with_converters(self):
+        factory = model_row_factory(ContentItem, tags=json.loads)
+
+        row = ("posts/a.md", "sha", "A", "2025-01-01", "post", "a", '["x"]', 9.5)
+        item = factory(None, row)
+
+        assert item == ContentItem(
+            "posts/a.md", "sha", "A", "2025-01-01", "post", "a", ["x"]
+        )
+
+    def test_unknown_converter_rejected(self):
+        with pytest.raises(ValueError):
+            model_row_factory(ContentItem, body=str)
+
+    def test_list_queries_hydrate_models(self, temp_db):
+        temp_db.create_api_key(APIKey("A", "hash-a", ["read"]))
+        temp_db.create_api_key(APIKey("B", "hash-b", ["read", "write"]))
+
+        keys = temp_db.list_api_keys()
+
+        assert {key.name: key.permissions for key in keys} == {
+            "A": ["read"], "B": ["read", "write"],
+        }
+        assert all(isinstance(key.created_at, datetime) for key in keys)
+
+
+class TestConnectionPool:
+    """Test the per-thread pooled connection layer."""
+
+    def test_connection_reused_within_thread(self, temp_db):
+        """Repeated calls on one thread share a single connection."""
+        assert temp_db._connection() is temp_db._connection()
+
+    def test_connection_per_thread(self, temp_db):
+        """Each worker thread gets its own connection."""
+        other = []
+        thread = threading.Thread(target=lambda: other.append(temp_db._connection()))
+        thread.start()
+        thread.join()
+
+        assert other[0] is not temp_db._connection()
+
+    def test_wal_and_synchronous_pragmas(self, temp_db):
+        """Connections use WAL journaling with synchronous=NORMAL."""
+        conn = temp_db._connection()
+        assert conn.execute("PRAGMA journal_mode").fetchone()[0] == "wal"
+        assert conn.execute("PRAGMA synchronous").fetchone()[0] == 1
+
+    def test_close_then_reopen(self, temp_db):
+        """Closing the pool does not break later operations."""
+        temp_db.save_settings(Settings("Blog", "Desc", "user/repo"))
+        temp_db.close()
+
+        assert temp_db.get_settings().blog_title == "Blog"
+
+    def test_exited_thread_connection_closed(self, temp_db):
+        """A connection whose thread has exited is closed by the next opener."""
+        other = []
+        thread = threading.Thread(target=lambda: other.append(temp_db._connection()))
+        thread.start()
+        thread.join()
+
+        temp_db._connection()
+
+        assert thread not in temp_db._connections
+        with pytest.raises(sqlite3.ProgrammingError):
+            other[0].execute("SELECT 1")
 
 
 class TestSettingsOperations:
@@ -87,6 +297,111 @@ class TestSettingsOperations:
         """Test getting settings when none have been created."""
         settings = temp_db.get_settings()
         assert settings is None
+    
+    def test_cached_settings_see_other_worker_writes(self, temp_db):
+        """A write through another Database instance invalidates the cache."""
+        temp_db.save_settings(Settings("First", "Desc", "user/repo"))
+        assert temp_db.get_settings().blog_title == "First"
+
+        other_worker = Database(temp_db.db_path)
+        other_worker.save_settings(Settings("Second", "Desc", "user/repo"))
+        other_worker.close()
+
+        assert temp_db.get_settings().blog_title == "Second"
+
+    def test_unrelated_writes_keep_cache_warm(self, temp_db):
+        """Writes to other tables, from any connection, do not reload settings."""
+        temp_db.save_settings(Settings("First", "Desc", "user/repo"))
+        temp_db.get_settings()
+        hits, misses = temp_db.cache_stats()["settings"]
+
+        other_worker = Database(temp_db.db_path)
+        other_worker.save_deployment_config(DeploymentConfig(target_repo="user/a"))
+        other_worker.close()
+
+        assert temp_db.get_settings().blog_title == "First"
+        assert temp_db.cache_stats()["settings"] == (hits + 1, misses)
+
+    def test_raw_sql_write_invalidates_cache(self, temp_db):
+        """Writes that bypass Database still bump the table version."""
+        temp_db.save_settings(Settings("First", "Desc", "user/repo"))
+        temp_db.get_settings()
+
+        with sqlite3.connect(temp_db.db_path) as conn:
+            conn.execute("UPDATE settings SET blog_title = 'Edited'")
+
+        assert temp_db.get_settings().blog_title == "Edited"
+
+    def test_save_upserts_single_row(self, temp_db):
+        """Saving again updates the row in place: same id, created_at kept."""
+        temp_db.save_settings(Settings("First", "Desc", "user/repo"))
+        with temp_db._connection() as conn:
+            conn.execute(
+                "UPDATE settings SET created_at = '2000-01-01', "
+                "updated_at = '2000-01-01'"
+            )
+
+        temp_db.save_settings(Settings("Second", "Desc", "user/repo"))
+        with temp_db._connection() as conn:
+            rows = conn.execute(
+                "SELECT id, created_at, updated_at FROM settings"
+            ).fetchall()
+
+        assert len(rows) == 1
+        assert (rows[0]["id"], rows[0]["created_at"]) == (1, "2000-01-01")
+        assert rows[0]["updated_at"] != "2000-01-01"
+
+    def test_partial_update(self, temp_db):
+        """update_settings changes only the given fields."""
+        temp_db.save_settings(Settings("Blog", "Desc", "user/repo", custom_css="a {}"))
+
+        updated = temp_db.update_settings({"theme": "dark", "custom_css": None})
+
+        assert updated == Settings("Blog", "Desc", "user/repo", theme="dark")
+        assert temp_db.get_settings() == updated
+
+    def test_partial_update_without_settings(self, temp_db):
+        """There is nothing to patch before the first save."""
+        assert temp_db.update_settings({"theme": "dark"}) is None
+        assert temp_db.get_settings() is None
+
+    def test_partial_update_rejects_unknown_fields(self, temp_db):
+        temp_db.save_settings(Settings("Blog", "Desc", "user/repo"))
+
+        with pytest.raises(ValueError):
+            temp_db.update_settings({"theme": "dark", "id": 7})
+        assert temp_db.get_settings().theme == "default"
+
+    def test_readers_never_see_missing_settings(self, temp_db):
+        """Readers in another worker always find settings while they are rewritten."""
+        temp_db.save_settings(Settings("Blog 0", "Desc", "user/repo"))
+        reader_db = Database(temp_db.db_path)
+        stop = threading.Event()
+        missing = []
+        reads = []
+
+        def read():
+            while not stop.is_set():
+                settings = reader_db._load_settings()
+                reads.append(1)
+                if settings is None:
+                    missing.append(1)
+
+        readers = [threading.Thread(target=read) for _ in range(3)]
+        for thread in readers:
+            thread.start()
+        for i in range(200):
+            if i % 2:
+                temp_db.update_settings({"blog_title": f"Blog {i}"})
+            else:
+                temp_db.save_settings(Settings(f"Blog {i}", "Desc", "user/repo"))
+        stop.set()
+        for thread in readers:
+            thread.join()
+        reader_db.close()
+
+        assert reads
+        assert missing == []
 
 
 class TestAPIKeyOperations:
@@ -147,6 +462,75 @@ class TestAPIKeyOperations:
         assert retrieved.is_active is False
 
 
+class TestAuthentication:
+    """Test resolving raw API keys through the hashed lookup cache."""
+
+    def test_authenticate_valid_key(self, temp_db):
+        """A known active key resolves to its ID and parsed permissions."""
+        key_id = temp_db.create_api_key(APIKey(
+            name="Agent", key_hash=hash_api_key("secret"), permissions=["read", "write"]
+        ))
+
+        result = temp_db.authenticate("secret")
+
+        assert result.key_id == key_id
+        assert result.name == "Agent"
+        assert result.permissions == frozenset({"read", "write"})
+
+    def test_authenticate_unknown_key(self, temp_db):
+        """An unknown key returns None."""
+        assert temp_db.authenticate("nope") is None
+
+    def test_negative_cache_cleared_on_create(self, temp_db):
+        """A key rejected earlier authenticates once it is created."""
+        assert temp_db.authenticate("later") is None
+
+        temp_db.create_api_key(APIKey(
+            name="Later", key_hash=hash_api_key("later"), permissions=["read"]
+        ))
+
+        assert temp_db.authenticate("later") is not None
+
+    def test_deactivated_key_rejected_immediately(self, temp_db):
+        """Deactivation evicts the cached key."""
+        key_id = temp_db.create_api_key(APIKey(
+            name="Agent", key_hash=hash_api_key("secret"), permissions=["read"]
+        ))
+        assert temp_db.authenticate("secret") is not None
+
+        temp_db.deactivate_api_key(key_id)
+
+        assert temp_db.authenticate("secret") is None
+
+    def test_deactivation_by_other_worker(self, temp_db):
+        """Deactivation through another Database instance is noticed."""
+        key_id = temp_db.create_api_key(APIKey(
+            name="Agent", key_hash=hash_api_key("secret"), permissions=["read"]
+        ))
+        assert temp_db.authenticate("secret") is not None
+
+        other_worker = Database(temp_db.db_path)
+        other_worker.deactivate_api_key(key_id)
+        other_worker.close()
+
+        assert temp_db.authenticate("secret") is None
+
+    def test_usage_flush_keeps_cache_warm(self, temp_db):
+        """Recording usage does not drop resolved keys."""
+        key_id = temp_db.create_api_key(APIKey(
+            name="Agent", key_hash=hash_api_key("secret"), permissions=["read"]
+        ))
+        temp_db.authenticate("secret")
+        hits, misses = temp_db.cache_stats()["api_keys"]
+
+        other_worker = Database(temp_db.db_path)
+        other_worker.record_api_key_usage([(key_id, datetime.now(), 3)])
+        other_worker.close()
+
+        assert temp_db.authenticate("secret") is not None
+        assert temp_db.cache_stats()["api_keys"] == (hits + 1, misses)
+
+
 class TestDeploymentConfigOperations:
     """Test CRUD operations for deployment configuration."""
     
@@ -193,4 +577,15 @@ class TestDeploymentConfigOperations:
         assert retrieved.target_repo == "user/new-repo"
         assert retrieved.target_branch == "gh-pages"
         assert retrieved.custom_domain == "newdomain.com"
-        assert retrieved.auto_deploy is False
\ No newline at end of file
+        assert retrieved.auto_deploy is False
+
+    def test_cached_config_see_other_worker_writes(self, temp_db):
+        """A write through another Database instance invalidates the cache."""
+        temp_db.save_deployment_config(DeploymentConfig(target_repo="user/a"))
+        assert temp_db.get_deployment_config().target_repo == "user/a"
+
+        other_worker = Database(temp_db.db_path)
+        other_worker.save_deployment_config(DeploymentConfig(target_repo="user/b"))
+        other_worker.close()
+
+        assert temp_db.get_deployment_config().target_repo == "user/b"
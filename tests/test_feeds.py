@@ -0,0 +1,125 @@
+# ABOUTME: Tests for the streaming RSS and Atom feed writers
+# ABOUTME: Checks feed validity, recent/archive variants and lazily pulled entries
+import xml.etree.ElementTree as ET
+from dataclasses import replace
+
+import pytest
+
+from app.services.content_index import index_file
+from app.services.feeds import FeedEntry, FeedWriter, feed_entries, write_feeds
+
+ATOM = "{http://www.w3.org/2005/Atom}"
+
+
+@pytest.fixture
+def settings(settings):
+    return replace(settings, blog_title="Test & Blog", github_pages_url="https://x.io/")
+
+
+def entries(count):
+    for i in range(count, 0, -1):
+        yield FeedEntry(
+            f"Post {i}", f"/post-{i}", f"2025-01-{i:02d}", f"<p>Body {i} & more</p>"
+        )
+
+
+class TestWriteFeeds:
+    """Test writing feed variants in one pass."""
+
+    def test_recent_and_archive_variants(self, settings, tmp_path):
+        written = write_feeds(
+            tmp_path,
+            settings,
+            entries(5),
+            [("feed.xml", "atom.xml", 2), ("all.xml", "all-atom.xml", None)],
+        )
+
+        assert written == ["feed.xml", "atom.xml", "all.xml", "all-atom.xml"]
+        rss = ET.parse(tmp_path / "feed.xml").getroot()
+        assert [item.findtext("title") for item in rss.iter("item")] == [
+            "Post 5",
+            "Post 4",
+        ]
+        archive = ET.parse(tmp_path / "all-atom.xml").getroot()
+        assert len(archive.findall(f"{ATOM}entry")) == 5
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_rss_content(self, settings, tmp_path):
+        write_feeds(tmp_path, settings, entries(1), [("feed.xml", "atom.xml", None)])
+
+        channel = ET.parse(tmp_path / "feed.xml").getroot().find("channel")
+        item = channel.find("item")
+        assert channel.findtext("title") == "Test & Blog"
+        assert item.findtext("link") == "https://x.io/post-1"
+        assert item.findtext("pubDate") == "Wed, 01 Jan 2025 00:00:00 +0000"
+        assert item.findtext("description") == "<p>Body 1 & more</p>"
+
+    def test_atom_content(self, settings, tmp_path):
+        write_feeds(tmp_path, settings, entries(3), [("feed.xml", "atom.xml", None)])
+
+        feed = ET.parse(tmp_path / "atom.xml").getroot()
+        entry = feed.find(f"{ATOM}entry")
+        assert feed.findtext(f"{ATOM}updated") == "2025-01-03T00:00:00Z"
+        assert entry.find(f"{ATOM}link").get("href") == "https://x.io/post-3"
+        assert entry.findtext(f"{ATOM}content") == "<p>Body 3 & more</p>"
+
+    def test_empty_feeds_are_valid(self, settings, tmp_path):
+        write_feeds(tmp_path, settings, iter(()), [("feed.xml", "atom.xml", 10)])
+
+        assert ET.parse(tmp_path / "feed.xml").getroot().find("channel/item") is None
+        assert ET.parse(tmp_path / "atom.xml").getroot().tag == f"{ATOM}feed"
+
+    def test_bounded_feeds_stop_pulling_entries(self, settings, tmp_path):
+        """Without an archive variant only the newest N entries are consumed."""
+        pulled = []
+
+        def source():
+            for entry in entries(20):
+                pulled.append(entry)
+                yield entry
+
+        write_feeds(tmp_path, settings, source(), [("feed.xml", "atom.xml", 3)])
+
+        assert len(pulled) == 3
+
+    def test_failure_keeps_previous_feed(self, settings, tmp_path):
+        """A failing entry source leaves the last complete feed in place."""
+        write_feeds(tmp_path, settings, entries(1), [("feed.xml", "atom.xml", None)])
+
+        def broken():
+            yield from entries(2)
+            raise RuntimeError("render failed")
+
+        with pytest.raises(RuntimeError):
+            write_feeds(tmp_path, settings, broken(), [("feed.xml", "atom.xml", None)])
+
+        assert "Post 1" in (tmp_path / "feed.xml").read_text()
+        assert "Post 2" not in (tmp_path / "feed.xml").read_text()
+        assert not list(tmp_path.glob("*.tmp"))
+
+    def test_writer_must_implement_markup(self, settings, tmp_path):
+        """A writer missing a markup hook fails before any file is opened."""
+
+        class Partial(FeedWriter):
+            def _header(self, first):
+                return ""
+
+        with pytest.raises(TypeError):
+            Partial(tmp_path, "feed.xml", settings)
+        assert not list(tmp_path.iterdir())
+
+
+class TestFeedEntries:
+    """Test pulling feed entries from the content index."""
+
+    def test_posts_newest_first_with_rendered_bodies(self, temp_db):
+        index_file(temp_db, "a.md", "---\ntitle: A\ndate: 2025-01-01\n---\n*one*\n")
+        index_file(temp_db, "b.md", "---\ntitle: B\ndate: 2025-02-01\n---\ntwo\n")
+        index_file(temp_db, "about.md", "---\ntitle: About\ntype: page\n---\nme\n")
+
+        result = list(feed_entries(temp_db))
+
+        assert [entry.title for entry in result] == ["B", "A"]
+        assert result[1] == FeedEntry(
+            "A", "/2025-01-01-a", "2025-01-01", "<p><em>one</em></p>\n"
+        )
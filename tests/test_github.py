@@ -0,0 +1,204 @@
+# ABOUTME: Tests for the async GitHub API client against a local stub HTTP server
+# ABOUTME: Covers ETag revalidation, concurrency, retries, errors and rate-limit pacing
+import base64
+import json
+
+import pytest
+
+from app.services import github
+from app.services.github import GitHubClient, GitHubError, RateLimitScheduler
+
+
+@pytest.fixture
+async def client(stub):
+    github = GitHubClient(token="t0ken", base_url=stub.url, max_concurrency=2)
+    yield github
+    await github.aclose()
+
+
+class TestContentAPI:
+    """Test reading and writing repository content."""
+
+    async def test_list_markdown(self, stub, client):
+        """Only markdown blobs are returned from the recursive tree."""
+        stub.routes[("GET", "/repos/u/r/git/trees/main")] = lambda h: (
+            200,
+            {},
+            {
+                "tree": [
+                    {"path": "posts/a.md", "sha": "s1", "type": "blob", "size": 3},
+                    {"path": "posts", "sha": "s2", "type": "tree"},
+                    {"path": "img/x.png", "sha": "s3", "type": "blob", "size": 9},
+                ]
+            },
+        )
+
+        entries = await client.list_markdown("u/r", "main")
+
+        assert [(e.path, e.sha) for e in entries] == [("posts/a.md", "s1")]
+        assert stub.requests[0][2]["Authorization"] == "Bearer t0ken"
+
+    async def test_put_file_encodes_content(self, stub, client):
+        """Files are sent base64-encoded to the contents API."""
+        stub.routes[("PUT", "/repos/u/r/contents/a.md")] = lambda h: (
+            201,
+            {},
+            {"content": {}},
+        )
+
+        await client.put_file("u/r", "a.md", b"hello", "msg", "main", sha="abc")
+
+        sent = json.loads(stub.requests[0][3])
+        assert base64.b64decode(sent["content"]) == b"hello"
+        assert sent["sha"] == "abc"
+        assert sent["branch"] == "main"
+
+    async def test_content_paths_are_quoted(self, stub, client):
+        """Spaces, '?' and '#' in a path stay part of the path."""
+        stub.routes[("GET", "/repos/u/r/contents/my%20post%3F%23.md")] = lambda h: (
+            200,
+            {},
+            b"# Post",
+        )
+
+        assert await client.get_file("u/r", "my post?#.md", "main") == b"# Post"
+
+
+class TestConditionalRequests:
+    """Test ETag caching and If-None-Match revalidation."""
+
+    async def test_304_served_from_cache(self, stub, client):
+        """A 304 returns the previously fetched body."""
+
+        def route(handler):
+            if handler.headers.get("If-None-Match") == '"v1"':
+                return 304, {"ETag": '"v1"'}, b""
+            return 200, {"ETag": '"v1"'}, b"# Post"
+
+        stub.routes[("GET", "/repos/u/r/contents/a.md")] = route
+
+        first = await client.get_file("u/r", "a.md", "main")
+        second = await client.get_file("u/r", "a.md", "main")
+
+        assert first == second == b"# Post"
+        assert client.not_modified == 1
+        assert stub.requests[1][2]["If-None-Match"] == '"v1"'
+
+    async def test_oversized_body_is_not_cached(self, stub, monkeypatch):
+        """Bodies larger than the cache's byte budget are not kept for revalidation."""
+        monkeypatch.setattr(github, "ETAG_CACHE_BYTES", 4)
+        stub.routes[("GET", "/repos/u/r/contents/a.md")] = lambda h: (
+            200,
+            {"ETag": '"v1"'},
+            b"# Post",
+        )
+
+        client = GitHubClient(base_url=stub.url)
+        try:
+            await client.get_file("u/r", "a.md", "main")
+            await client.get_file("u/r", "a.md", "main")
+        finally:
+            await client.aclose()
+
+        assert "If-None-Match" not in stub.requests[1][2]
+
+
+class TestConcurrency:
+    """Test that concurrent fetches are bounded."""
+
+    async def test_semaphore_bounds_in_flight_requests(self, stub, client):
+        """No more than max_concurrency requests reach the server at once."""
+        stub.delay = 0.05
+        for i in range(6):
+            stub.routes[("GET", f"/repos/u/r/contents/{i}.md")] = lambda h: (
+                200,
+                {},
+                b"x",
+            )
+
+        files = await client.get_files("u/r", [f"{i}.md" for i in range(6)], "main")
+
+        assert len(files) == 6
+        assert stub.max_in_flight <= 2
+
+
+class TestErrorsAndRetries:
+    """Test error mapping and retry behaviour."""
+
+    async def test_not_found_raises_with_action(self, stub, client):
+        """Errors carry the spec's detail and remediation fields."""
+        with pytest.raises(GitHubError) as excinfo:
+            await client.get_file("u/missing", "a.md", "main")
+
+        assert excinfo.value.status == 404
+        assert (
+            excinfo.value.to_dict()["action"]
+            == "Check repository exists and you have access"
+        )
+
+    async def test_retries_server_errors(self, stub, client, monkeypatch):
+        """Transient 5xx responses are retried."""
+        monkeypatch.setattr("app.services.github.RETRY_BACKOFF", 0)
+        calls = []
+
+        def flaky(handler):
+            calls.append(1)
+            return (
+                (502, {}, {"message": "bad gateway"})
+                if len(calls) < 3
+                else (200, {}, b"ok")
+            )
+
+        stub.routes[("GET", "/repos/u/r/contents/a.md")] = flaky
+
+        assert await client.get_file("u/r", "a.md", "main") == b"ok"
+        assert len(calls) == 3
+
+
+class TestRateLimitScheduler:
+    """Test pacing decisions from rate-limit headers."""
+
+    def make(self, remaining, reset_in, reserve=100):
+        now = [1000.0]
+        slept = []
+
+        async def sleep(seconds):
+            slept.append(seconds)
+            now[0] += seconds
+
+        scheduler = RateLimitScheduler(
+            reserve=reserve, clock=lambda: now[0], sleep=sleep
+        )
+        scheduler.update(
+            {
+                "x-ratelimit-remaining": str(remaining),
+                "x-ratelimit-reset": str(now[0] + reset_in),
+            }
+        )
+        return scheduler, slept
+
+    async def test_no_delay_with_plenty_of_quota(self):
+        scheduler, slept = self.make(remaining=4000, reset_in=600)
+        await scheduler.acquire()
+        assert slept == []
+
+    async def test_spreads_requests_when_quota_low(self):
+        """Below the reserve the remaining quota is spread over the window."""
+        scheduler, slept = self.make(remaining=10, reset_in=100)
+        await scheduler.acquire()
+        assert slept == [pytest.approx(10.0)]
+
+    async def test_waits_for_reset_when_exhausted(self):
+        scheduler, slept = self.make(remaining=0, reset_in=30)
+        await scheduler.acquire()
+        assert slept == [pytest.approx(30.0)]
+
+    async def test_updates_from_responses(self, stub, client):
+        """Headers from responses feed the scheduler."""
+        stub.routes[("GET", "/repos/u/r/contents/a.md")] = lambda h: (
+            200,
+            {"X-RateLimit-Remaining": "42", "X-RateLimit-Reset": "9999999999"},
+            b"x",
+        )
+        await client.get_file("u/r", "a.md", "main")
+        assert client.scheduler.remaining == 42
@@ -0,0 +1,164 @@
+# ABOUTME: Tests for the HTTP caching middleware: ETags, 304s and compression
+# ABOUTME: Runs a Starlette app wrapped in HTTPCacheMiddleware through the test client
+import pytest
+from starlette.applications import Starlette
+from starlette.datastructures import Headers
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.http_cache import HTTPCacheMiddleware, choose_encoding, etag_matches, make_etag
+
+LARGE = "blog post " * 500
+
+
+def build_app():
+    async def small(request):
+        return PlainTextResponse("hello")
+
+    async def large(request):
+        return PlainTextResponse(LARGE)
+
+    async def tagged(request):
+        return JSONResponse({"sha": "abc"}, headers={"ETag": '"abc"'})
+
+    async def blob(request):
+        """Same ETag for every path, like content served by git blob SHA."""
+        path = request.path_params["path"]
+        return JSONResponse({"path": path, "body": LARGE}, headers={"ETag": '"blob"'})
+
+    async def stream(request):
+        return StreamingResponse(iter([b"data: 1\n\n"]), media_type="text/event-stream")
+
+    async def echo(request):
+        return PlainTextResponse(LARGE)
+
+    return Starlette(
+        routes=[
+            Route("/small", small),
+            Route("/large", large),
+            Route("/api/tagged", tagged),
+            Route("/api/blob/{path}", blob),
+            Route("/stream", stream),
+            Route("/echo", echo, methods=["POST"]),
+        ],
+        middleware=[Middleware(HTTPCacheMiddleware)],
+    )
+
+
+@pytest.fixture
+def client():
+    return TestClient(build_app())
+
+
+def middleware(client):
+    """The HTTPCacheMiddleware instance of the client's app."""
+    app = client.app.middleware_stack
+    while not isinstance(app, HTTPCacheMiddleware):
+        app = app.app
+    return app
+
+
+class TestHelpers:
+    """Test the ETag and Accept-Encoding helpers."""
+
+    def test_etag_matching_ignores_encoding_suffix_and_weakness(self):
+        etag = make_etag(b"body")
+        encoded = etag[:-1] + '-gzip"'
+
+        assert etag_matches(Headers({"if-none-match": encoded}), etag)
+        assert etag_matches(Headers({"if-none-match": f'"other", W/{etag}'}), encoded)
+        assert etag_matches(Headers({"if-none-match": "*"}), etag)
+        assert not etag_matches(Headers({"if-none-match": '"other"'}), etag)
+        assert not etag_matches(Headers(), etag)
+
+    def test_choose_encoding_honours_quality(self):
+        assert choose_encoding(Headers({"accept-encoding": "gzip, deflate"})) == "gzip"
+        assert choose_encoding(Headers({"accept-encoding": "gzip;q=0"})) is None
+        assert choose_encoding(Headers({"accept-encoding": "identity"})) is None
+
+
+class TestValidation:
+    """Test ETags, Cache-Control and 304 responses."""
+
+    def test_etag_and_cache_control_added(self, client):
+        response = client.get("/small")
+
+        assert response.headers["etag"] == make_etag(b"hello")
+        assert response.headers["cache-control"] == "no-cache"
+
+    def test_matching_if_none_match_returns_304(self, client):
+        etag = client.get("/small").headers["etag"]
+
+        response = client.get("/small", headers={"If-None-Match": etag})
+
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+
+    def test_route_etag_is_kept(self, client):
+        response = client.get("/api/tagged")
+        revalidated = client.get("/api/tagged", headers={"If-None-Match": '"abc"'})
+
+        assert response.headers["etag"] == '"abc"'
+        assert response.headers["cache-control"] == "private, no-cache"
+        assert revalidated.status_code == 304
+
+    def test_post_is_not_validated(self, client):
+        response = client.post("/echo", headers={"If-None-Match": "*"})
+
+        assert response.status_code == 200
+        assert "etag" not in response.headers
+
+
+class TestCompression:
+    """Test compression and the compressed-variant cache."""
+
+    def test_large_text_is_gzipped(self, client):
+        response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert response.headers["content-encoding"] == "gzip"
+        assert response.headers["etag"].endswith('-gzip"')
+        assert "accept-encoding" in response.headers["vary"].lower()
+        assert response.text == LARGE
+
+    def test_small_and_unaccepted_responses_are_identity(self, client):
+        small = client.get("/small", headers={"Accept-Encoding": "gzip"})
+        plain = client.get("/large", headers={"Accept-Encoding": "identity"})
+
+        assert "content-encoding" not in small.headers
+        assert "content-encoding" not in plain.headers
+        assert plain.text == LARGE
+
+    def test_compressed_body_is_cached(self, client):
+        for _ in range(3):
+            response = client.get("/large", headers={"Accept-Encoding": "gzip"})
+
+        assert middleware(client).compressions == 1
+        assert response.text == LARGE
+
+    def test_shared_etag_on_other_paths_is_not_reused(self, client):
+        """Identical content on two paths still gets each path's own body."""
+        first = client.get("/api/blob/a.md", headers={"Accept-Encoding": "gzip"})
+        second = client.get("/api/blob/b.md", headers={"Accept-Encoding": "gzip"})
+
+        assert first.headers["etag"] == second.headers["etag"]
+        assert first.json()["path"] == "a.md"
+        assert second.json()["path"] == "b.md"
+
+    def test_gzipped_etag_revalidates(self, client):
+        etag = client.get("/large", headers={"Accept-Encoding": "gzip"}).headers["etag"]
+
+        response = client.get(
+            "/large", headers={"Accept-Encoding": "gzip", "If-None-Match": etag}
+        )
+
+        assert response.status_code == 304
+
+    def test_streaming_responses_pass_through(self, client):
+        response = client.get("/stream", headers={"Accept-Encoding": "gzip"})
+
+        assert response.text == "data: 1\n\n"
+        assert "etag" not in response.headers
+        assert "content-encoding" not in response.headers
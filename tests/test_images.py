@@ -0,0 +1,155 @@
+# ABOUTME: Tests for the image pipeline: upload dedup, variants and srcset markup
+# ABOUTME: Variant tests need Pillow and are skipped when it is not installed
+import base64
+import io
+import json
+from datetime import date
+
+import pytest
+
+from app.services.github import GitHubClient
+from app.services.images import (
+    PILLOW_AVAILABLE,
+    VariantCache,
+    build_images,
+    image_dimensions,
+    image_markup,
+    make_variants,
+    store_image,
+    upload_path,
+    variant_paths,
+    variant_widths,
+)
+
+needs_pillow = pytest.mark.skipif(
+    not PILLOW_AVAILABLE, reason="Pillow is not installed"
+)
+
+
+def png(width, height, color=(200, 30, 30)):
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.new("RGB", (width, height), color).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+class TestPaths:
+    """Test upload paths, variant widths and markup."""
+
+    def test_upload_path(self):
+        assert (
+            upload_path("My Cat Photo.PNG", date(2025, 3, 1))
+            == "images/2025/my-cat-photo.png"
+        )
+        assert upload_path("../../etc/x.jpg", date(2025, 3, 1)) == "images/2025/x.jpg"
+
+    def test_variant_widths_never_upscale(self):
+        assert variant_widths(4000) == [480, 960, 1600]
+        assert variant_widths(700) == [480, 700]
+        assert variant_widths(300) == [300]
+        assert variant_widths(0) == []
+
+    @needs_pillow
+    def test_markup_has_srcset(self):
+        markup = image_markup("images/2025/cat.png", 1200, 800, alt='A "cat"')
+
+        assert (
+            'srcset="/images/2025/cat-480w.webp 480w, /images/2025/cat-960w.webp 960w, '
+            '/images/2025/cat-1200w.webp 1200w"' in markup
+        )
+        assert (
+            '<img src="/images/2025/cat.png" alt="A &quot;cat&quot;" '
+            'width="1200" height="800"' in markup
+        )
+
+    def test_gif_markup_is_plain_markdown(self):
+        assert (
+            image_markup("images/2025/anim.gif", 800, 600)
+            == "![](/images/2025/anim.gif)"
+        )
+        assert variant_paths("images/2025/anim.gif", 800) == []
+
+
+@needs_pillow
+class TestVariants:
+    """Test generating and caching variants."""
+
+    def test_make_variants(self):
+        from PIL import Image
+
+        variants = make_variants(png(1000, 500), [480, 1000])
+
+        resized = Image.open(io.BytesIO(variants[480]))
+        assert resized.format == "WEBP"
+        assert resized.size == (480, 240)
+        assert image_dimensions(variants[1000]) == (1000, 500)
+
+    def test_build_uses_cache(self, tmp_path):
+        """A second build with the same originals encodes nothing."""
+        images = {"images/2025/a.png": png(1000, 500), "images/2025/b.gif": b"GIF89a"}
+        cache = VariantCache(tmp_path / "cache")
+
+        first = build_images(images, tmp_path / "site", cache)
+        assert first.generated == 3
+        assert (tmp_path / "site/images/2025/a-960w.webp").exists()
+        assert (tmp_path / "site/images/2025/b.gif").read_bytes() == b"GIF89a"
+
+        second = build_images(images, tmp_path / "other-site", cache)
+        assert (second.generated, second.cached) == (0, 3)
+
+        again = build_images(images, tmp_path / "site", cache)
+        assert again.written == []
+
+    def test_build_removes_stale_images(self, tmp_path):
+        build_images({"images/2025/a.png": png(600, 400)}, tmp_path)
+
+        report = build_images({}, tmp_path)
+
+        assert sorted(report.deleted) == [
+            "images/2025/a-480w.webp",
+            "images/2025/a-600w.webp",
+            "images/2025/a.png",
+        ]
+
+
+class TestStoreImage:
+    """Test committing uploads to the content repo with dedup."""
+
+    @pytest.fixture
+    def uploads(self, stub):
+        """Record PUTs to the contents API."""
+        puts = []
+
+        def put(handler):
+            puts.append((handler.path, json.loads(handler.request_body)))
+            return 201, {}, {"content": {}}
+
+        for path in ("cat.png", "cat-3fc4ccfe.png"):
+            stub.routes[("PUT", f"/repos/u/blog/contents/images/2025/{path}")] = put
+        return puts
+
+    async def test_identical_upload_is_stored_once(self, temp_db, stub, uploads):
+        async with GitHubClient(base_url=stub.url) as client:
+            first, first_dup = await store_image(
+                temp_db, client, "u/blog", "main", "cat.png", b"one", date(2025, 1, 1)
+            )
+            second, second_dup = await store_image(
+                temp_db, client, "u/blog", "main", "other.png", b"one", date(2025, 1, 1)
+            )
+
+        assert (first_dup, second_dup) == (False, True)
+        assert second.path == first.path == "images/2025/cat.png"
+        assert len(uploads) == 1
+        assert base64.b64decode(uploads[0][1]["content"]) == b"one"
+
+    async def test_name_clash_gets_hash_suffix(self, temp_db, stub, uploads):
+        async with GitHubClient(base_url=stub.url) as client:
+            await store_image(
+                temp_db, client, "u/blog", "main", "cat.png", b"one", date(2025, 1, 1)
+            )
+            image, _ = await store_image(
+                temp_db, client, "u/blog", "main", "cat.png", b"two", date(2025, 1, 1)
+            )
+
+        assert image.path == "images/2025/cat-3fc4ccfe.png"
@@ -0,0 +1,162 @@
+# ABOUTME: Tests for the SQLite-backed background job queue and its asyncio worker
+# ABOUTME: Covers coalescing, progress, retries, lease reclaiming and the worker loop
+import asyncio
+import time
+
+import pytest
+
+from app.jobs import JobError, JobWorker
+
+
+@pytest.fixture
+def worker(temp_db):
+    return JobWorker(temp_db, retry_delay=0.0)
+
+
+class TestJobQueue:
+    """Test the jobs table operations."""
+
+    def test_queued_jobs_coalesce(self, temp_db):
+        """Enqueueing a kind that is already queued joins the queued job."""
+        first = temp_db.enqueue_job("publish", time.time())
+        second = temp_db.enqueue_job("publish", time.time())
+        other = temp_db.enqueue_job("index", time.time())
+
+        assert second.id == first.id
+        assert second.requests == 2
+        assert other.id != first.id
+
+    def test_running_job_does_not_absorb_new_requests(self, temp_db):
+        """A request arriving while a job runs queues one follow-up job."""
+        running = temp_db.enqueue_job("publish", time.time())
+        temp_db.claim_job(time.time() + 60)
+
+        follow_up = temp_db.enqueue_job("publish", time.time())
+        again = temp_db.enqueue_job("publish", time.time())
+
+        assert follow_up.id != running.id
+        assert again.id == follow_up.id
+
+    def test_claim_respects_run_after(self, temp_db):
+        """Jobs are not claimed before they are due."""
+        temp_db.enqueue_job("publish", time.time() + 60)
+
+        assert temp_db.claim_job(time.time() + 60) is None
+        assert temp_db.next_job_time() > time.time()
+
+    def test_expired_lease_is_reclaimed(self, temp_db):
+        """A running job whose worker stopped renewing it is claimed again."""
+        job = temp_db.enqueue_job("publish", time.time())
+        temp_db.claim_job(lease_until=time.time() - 1)
+
+        reclaimed = temp_db.claim_job(time.time() + 60)
+
+        assert reclaimed.id == job.id
+        assert reclaimed.attempts == 2
+
+    def test_delete_finished_jobs(self, temp_db):
+        """Only finished jobs older than the cutoff are deleted."""
+        done = temp_db.enqueue_job("publish", time.time())
+        temp_db.claim_job(time.time() + 60)
+        temp_db.finish_job(done.id, "succeeded")
+        temp_db.enqueue_job("publish", time.time())
+
+        assert temp_db.delete_finished_jobs(time.time() + 1) == 1
+        assert [job.state for job in temp_db.list_jobs()] == ["queued"]
+
+
+class TestJobWorker:
+    """Test running jobs through registered handlers."""
+
+    async def test_success_records_progress_and_result(self, worker, temp_db):
+        """A handler's progress and result are stored on the job."""
+        seen = []
+
+        async def handler(job, progress):
+            progress("build", 0.5)
+            seen.append(temp_db.get_job(job.id).stage)
+            return {"pages": 3}
+
+        worker.register("publish", handler)
+        worker.enqueue("publish")
+        job = await worker.run_once()
+
+        assert seen == ["build"]
+        assert job.state == "succeeded"
+        assert job.progress == 1
+        assert job.result == {"pages": 3}
+
+    async def test_failures_are_retried(self, worker):
+        """An unexpected error puts the job back in the queue until it succeeds."""
+        attempts = []
+
+        async def flaky(job, progress):
+            attempts.append(job.attempts)
+            if len(attempts) < 2:
+                raise RuntimeError("GitHub unavailable")
+            return {}
+
+        worker.register("publish", flaky)
+        worker.enqueue("publish")
+        first = await worker.run_once()
+        second = await worker.run_once()
+
+        assert first.state == "queued"
+        assert "GitHub unavailable" in first.error
+        assert second.state == "succeeded"
+        assert attempts == [1, 2]
+
+    async def test_gives_up_after_max_attempts(self, worker):
+        """The job fails once every attempt has been used."""
+
+        async def broken(job, progress):
+            raise RuntimeError("boom")
+
+        worker.register("publish", broken)
+        worker.enqueue("publish")
+        for _ in range(3):
+            job = await worker.run_once()
+
+        assert job.state == "failed"
+        assert job.attempts == 3
+        assert await worker.run_once() is None
+
+    async def test_job_error_is_not_retried(self, worker):
+        """Failures retrying cannot fix finish the job immediately."""
+
+        async def misconfigured(job, progress):
+            raise JobError("Deployment must be configured")
+
+        worker.register("publish", misconfigured)
+        worker.enqueue("publish")
+        job = await worker.run_once()
+
+        assert job.state == "failed"
+        assert job.error == "Deployment must be configured"
+
+    def test_enqueue_unknown_kind_rejected(self, worker):
+        with pytest.raises(ValueError):
+            worker.enqueue("deploy")
+
+    async def test_burst_within_debounce_runs_once(self, temp_db):
+        """Requests arriving inside the debounce window share one run."""
+        runs = []
+        worker = JobWorker(temp_db)
+
+        async def handler(job, progress):
+            runs.append(job.requests)
+            return {}
+
+        worker.register("publish", handler, debounce=0.2)
+        await worker.start()
+        try:
+            jobs = [worker.enqueue("publish") for _ in range(5)]
+            for _ in range(100):
+                if temp_db.get_job(jobs[0].id).finished:
+                    break
+                await asyncio.sleep(0.02)
+        finally:
+            await worker.stop()
+
+        assert len({job.id for job in jobs}) == 1
+        assert runs == [5]
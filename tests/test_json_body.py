@@ -0,0 +1,48 @@
+# ABOUTME: Tests for the middleware rejecting JSON bodies that are not objects
+# ABOUTME: Runs a Starlette app wrapped in JSONBodyMiddleware through the test client
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.json_body import JSONBodyMiddleware
+
+
+@pytest.fixture
+def client():
+    async def echo(request):
+        return JSONResponse({"body": (await request.body()).decode()})
+
+    app = Starlette(
+        routes=[Route("/echo", echo, methods=["POST"])],
+        middleware=[Middleware(JSONBodyMiddleware)],
+    )
+    return TestClient(app)
+
+
+class TestJSONBody:
+    """Test which request bodies reach the app."""
+
+    def test_object_is_replayed(self, client):
+        response = client.post("/echo", json={"a": 1})
+
+        assert response.status_code == 200
+        assert response.json() == {"body": '{"a":1}'}
+
+    @pytest.mark.parametrize("body", [b"5", b'["a"]', b"{oops"])
+    def test_other_json_rejected(self, client, body):
+        response = client.post(
+            "/echo", content=body, headers={"Content-Type": "application/json"}
+        )
+
+        assert response.status_code == 400
+        assert "action" in response.json()
+
+    def test_other_content_types_pass_through(self, client):
+        response = client.post(
+            "/echo", content=b"5", headers={"Content-Type": "text/plain"}
+        )
+
+        assert response.json() == {"body": "5"}
@@ -0,0 +1,429 @@
+# ABOUTME: Route tests for the FastHTML application
+# ABOUTME: Exercises API key authentication and the JSON API on a temporary database
+import io
+import re
+from datetime import date
+
+import pytest
+from starlette.testclient import TestClient
+
+import app.main as main
+from app.database import hash_api_key
+from app.models import APIKey, ContentItem, Settings
+from app.services.images import PILLOW_AVAILABLE
+
+
+@pytest.fixture
+def temp_db(temp_db, monkeypatch):
+    """Point the app at a temporary database."""
+    monkeypatch.setattr(main, "db", temp_db)
+    return temp_db
+
+
+@pytest.fixture
+def client(temp_db):
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def auth(temp_db):
+    """Create an API key and return the matching request headers."""
+    temp_db.create_api_key(APIKey("Test", hash_api_key("secret"), ["read", "write"]))
+    return {"Authorization": "Bearer secret"}
+
+
+class TestHealth:
+    def test_health_is_public(self, client):
+        response = client.get("/health")
+
+        assert response.status_code == 200
+        assert response.json()["status"] == "ok"
+        assert set(response.json()["preview_cache"]) == {"hits", "misses"}
+
+
+class TestAPIAuthentication:
+    """Test the Bearer key guard on /api/ routes."""
+
+    def test_missing_key_rejected(self, client):
+        response = client.get("/api/content")
+
+        assert response.status_code == 401
+        assert "action" in response.json()
+
+    def test_invalid_key_rejected(self, client, temp_db):
+        response = client.get("/api/content", headers={"Authorization": "Bearer wrong"})
+        assert response.status_code == 401
+
+    def test_valid_key_accepted(self, client, auth):
+        assert client.get("/api/content", headers=auth).status_code == 200
+
+    def test_deactivated_key_rejected(self, client, temp_db):
+        key_id = temp_db.create_api_key(APIKey("Old", hash_api_key("old"), ["read"]))
+        temp_db.deactivate_api_key(key_id)
+
+        response = client.get("/api/content", headers={"Authorization": "Bearer old"})
+        assert response.status_code == 401
+
+    def test_other_schemes_rejected(self, client, auth):
+        response = client.get("/api/content", headers={"Authorization": "Basic secret"})
+        assert response.status_code == 401
+
+
+class TestPreview:
+    """Test the editor's block preview."""
+
+    def preview(self, client, content, blocks=None):
+        data = {"content": content}
+        if blocks is not None:
+            data["blocks"] = blocks
+        return client.post("/preview", data=data, headers={"HX-Request": "true"})
+
+    def block_ids(self, html):
+        return re.findall(r'<div id="(b-[^"]+)"', html)
+
+    def test_full_render_without_blocks(self, client):
+        """Frontmatter is stripped and every block gets its own element."""
+        response = self.preview(client, "---\ntitle: T\n---\n# Title\n\nBody\n")
+
+        assert response.text.startswith('<div id="preview">')
+        assert "title: T" not in response.text
+        assert len(self.block_ids(response.text)) == 2
+
+    def test_edit_returns_only_changed_block(self, client):
+        first = self.preview(client, "# Title\n\nOne\n\nTwo\n")
+        ids = self.block_ids(first.text)
+
+        response = self.preview(
+            client, "# Title\n\nOne, edited\n\nTwo\n", ",".join(ids)
+        )
+
+        assert response.headers["hx-reswap"] == "none"
+        assert f'hx-swap-oob="delete" id="{ids[1]}"' in response.text
+        assert f'hx-swap-oob="afterend:#{ids[0]}"' in response.text
+        assert "One, edited" in response.text
+        assert "Two" not in response.text
+
+    def test_unchanged_document_returns_nothing(self, client):
+        first = self.preview(client, "One\n\nTwo\n")
+
+        response = self.preview(
+            client, "One\n\nTwo\n", ",".join(self.block_ids(first.text))
+        )
+
+        assert "<div" not in response.text
+
+    def test_half_typed_frontmatter_renders_body(self, client):
+        """Frontmatter that does not parse yet does not fail the preview."""
+        response = self.preview(client, "---\ntitle: [oops\n---\n# Title\n")
+
+        assert response.status_code == 200
+        assert "<h1>Title</h1>" in response.text
+        assert "oops" not in response.text
+
+    def test_first_block_inserted_into_empty_pane(self, client):
+        response = self.preview(client, "One\n", "")
+
+        assert 'hx-swap-oob="afterbegin:#preview"' in response.text
+
+
+class TestListContent:
+    """Test GET /api/content."""
+
+    def test_filters_and_paginates(self, client, auth, temp_db):
+        temp_db.upsert_content(
+            [
+                ContentItem(
+                    f"posts/{i}.md",
+                    "sha",
+                    f"Post {i}",
+                    f"2025-01-0{i}",
+                    "post",
+                    f"p{i}",
+                    ["python"] if i % 2 else [],
+                )
+                for i in range(1, 6)
+            ]
+        )
+
+        first = client.get("/api/content?limit=2", headers=auth).json()
+        second = client.get(
+            f"/api/content?limit=2&before={first['next']}", headers=auth
+        ).json()
+        tagged = client.get("/api/content?tag=python", headers=auth).json()
+
+        assert [item["title"] for item in first["items"]] == ["Post 5", "Post 4"]
+        assert [item["title"] for item in second["items"]] == ["Post 3", "Post 2"]
+        assert [item["title"] for item in tagged["items"]] == [
+            "Post 5",
+            "Post 3",
+            "Post 1",
+        ]
+        assert tagged["next"] is None
+        assert first["items"][0] == {
+            "path": "posts/5.md",
+            "title": "Post 5",
+            "date": "2025-01-05",
+            "type": "post",
+            "slug": "p5",
+            "tags": ["python"],
+        }
+
+    def test_before_date(self, client, auth, temp_db):
+        """A bare date cursor returns items strictly older than that date."""
+        temp_db.upsert_content(
+            [
+                ContentItem("a.md", "sha", "A", "2025-01-01"),
+                ContentItem("b.md", "sha", "B", "2025-02-01"),
+            ]
+        )
+
+        response = client.get("/api/content?before=2025-02-01", headers=auth).json()
+
+        assert [item["title"] for item in response["items"]] == ["A"]
+
+
+class TestSearch:
+    """Test GET /api/search."""
+
+    def test_ranked_results_with_snippets(self, client, auth, temp_db):
+        temp_db.upsert_content(
+            [
+                ContentItem("a.md", "sha", "Caching", "2025-01-01", slug="caching"),
+                ContentItem("b.md", "sha", "Other", "2025-01-02", slug="other"),
+            ],
+            {"a.md": "How <b>caching</b> works", "b.md": "Mentions caching once"},
+        )
+
+        results = client.get("/api/search?q=caching", headers=auth).json()["results"]
+
+        assert [result["path"] for result in results] == ["a.md", "b.md"]
+        assert results[0]["url"] == "/2025-01-01-caching"
+        assert "&lt;b&gt;<mark>caching</mark>" in results[0]["snippet"]
+
+    def test_empty_query(self, client, auth):
+        response = client.get("/api/search?q=%20", headers=auth).json()
+        assert response["results"] == []
+
+
+class TestImageUpload:
+    """Test POST /api/images."""
+
+    @pytest.fixture
+    def content_repo(self, stub, temp_db, monkeypatch):
+        """Point uploads at the stub GitHub server and count contents API writes."""
+        monkeypatch.setenv("GITHUB_API_URL", stub.url)
+        temp_db.save_settings(Settings("Blog", "Desc", "u/blog"))
+        puts = []
+        path = f"/repos/u/blog/contents/images/{date.today().year}/cat.png"
+        stub.routes[("PUT", path)] = lambda handler: (puts.append(path), (201, {}, {}))[
+            1
+        ]
+        return puts
+
+    def test_duplicate_upload_reuses_stored_file(self, client, auth, content_repo):
+        upload = {"file": ("cat.png", b"not really a png", "image/png")}
+
+        first = client.post("/api/images", headers=auth, files=upload).json()
+        second = client.post("/api/images", headers=auth, files=upload).json()
+
+        assert first["path"] == f"images/{date.today().year}/cat.png"
+        assert first["markdown"] == f"![](/{first['path']})"
+        assert (first["deduplicated"], second["deduplicated"]) == (False, True)
+        assert second["path"] == first["path"]
+        assert len(content_repo) == 1
+
+    @pytest.mark.skipif(not PILLOW_AVAILABLE, reason="Pillow is not installed")
+    def test_returns_srcset_markup(self, client, auth, content_repo):
+        from PIL import Image
+
+        buffer = io.BytesIO()
+        Image.new("RGB", (1000, 600)).save(buffer, "PNG")
+        response = client.post(
+            "/api/images",
+            headers=auth,
+            data={"alt": "A cat"},
+            files={"file": ("cat.png", buffer.getvalue(), "image/png")},
+        ).json()
+
+        assert (response["width"], response["height"]) == (1000, 600)
+        assert len(response["variants"]) == 3
+        assert (
+            "srcset=" in response["markdown"] and 'alt="A cat"' in response["markdown"]
+        )
+
+    def test_rejects_non_images(self, client, auth, content_repo):
+        response = client.post(
+            "/api/images",
+            headers=auth,
+            files={"file": ("notes.txt", b"hi", "text/plain")},
+        )
+
+        assert response.status_code == 400
+        assert content_repo == []
+
+
+class TestGetContent:
+    """Test GET /api/content/{path}."""
+
+    def test_blob_sha_etag_revalidates(self, client, auth, stub, temp_db, monkeypatch):
+        monkeypatch.setenv("GITHUB_API_URL", stub.url)
+        temp_db.save_settings(Settings("Blog", "Desc", "u/blog"))
+        text = b"---\ntitle: Hello\n---\nBody"
+        path = "/repos/u/blog/contents/posts/hello.md"
+        stub.routes[("GET", path)] = lambda handler: (200, {}, text)
+
+        response = client.get("/api/content/posts/hello.md", headers=auth)
+        etag = response.headers["etag"]
+        revalidated = client.get(
+            "/api/content/posts/hello.md", headers={**auth, "If-None-Match": etag}
+        )
+
+        assert response.json()["content"] == text.decode()
+        assert etag == f'"{response.json()["sha"]}"'
+        assert response.headers["cache-control"] == "private, no-cache"
+        assert revalidated.status_code == 304
+
+    def test_requires_settings(self, client, auth):
+        assert client.get("/api/content/posts/x.md", headers=auth).status_code == 409
+
+
+class TestSettingsAPI:
+    """Test GET/PUT /api/settings."""
+
+    def test_not_configured(self, client, auth):
+        response = client.get("/api/settings", headers=auth)
+
+        assert response.status_code == 404
+        assert "action" in response.json()
+
+    def test_first_save_needs_required_fields(self, client, auth, temp_db):
+        incomplete = client.put(
+            "/api/settings", headers=auth, json={"blog_title": "Blog"}
+        )
+        created = client.put(
+            "/api/settings",
+            headers=auth,
+            json={
+                "blog_title": "Blog",
+                "blog_description": "About",
+                "github_repo": "user/repo",
+            },
+        )
+
+        assert incomplete.status_code == 400
+        assert "blog_description" in incomplete.json()["detail"]
+        assert created.status_code == 200
+        assert temp_db.get_settings() == Settings("Blog", "About", "user/repo")
+
+    def test_put_patches_only_given_fields(self, client, auth, temp_db):
+        """Fields left out of the body keep their stored values."""
+        temp_db.save_settings(Settings("Blog", "About", "user/repo", custom_css="a {}"))
+
+        response = client.put(
+            "/api/settings",
+            headers=auth,
+            json={
+                "theme": "dark",
+                "custom_css": None,
+            },
+        )
+
+        assert response.json() == {
+            "blog_title": "Blog",
+            "blog_description": "About",
+            "github_repo": "user/repo",
+            "github_branch": "main",
+            "github_pages_url": None,
+            "theme": "dark",
+            "custom_css": None,
+        }
+        assert client.get("/api/settings", headers=auth).json()["theme"] == "dark"
+
+    def test_invalid_bodies_rejected(self, client, auth, temp_db):
+        temp_db.save_settings(Settings("Blog", "About", "user/repo"))
+
+        for body in ({"colour": "red"}, {"blog_title": None}, {"theme": 3}):
+            response = client.put("/api/settings", headers=auth, json=body)
+            assert response.status_code == 400, body
+        for body in (5, ["blog_title"]):
+            response = client.put("/api/settings", headers=auth, json=body)
+            assert response.status_code == 400, body
+            assert response.json()["detail"] == "The body must be a JSON object"
+        response = client.put(
+            "/api/settings",
+            headers={**auth, "Content-Type": "application/json"},
+            content=b"{not json",
+        )
+        assert response.status_code == 400
+        # Other content types reach the handler, which checks the body itself
+        response = client.put(
+            "/api/settings",
+            headers={**auth, "Content-Type": "text/plain"},
+            content=b"5",
+        )
+        assert response.status_code == 400
+        assert response.json()["error"] == "Invalid settings"
+        assert temp_db.get_settings() == Settings("Blog", "About", "user/repo")
+
+
+class TestPublishJobs:
+    """Test POST /api/publish and the job status routes."""
+
+    @pytest.fixture(autouse=True)
+    def jobs_db(self, temp_db, monkeypatch):
+        monkeypatch.setattr(main.jobs, "db", temp_db)
+
+    def test_burst_of_publishes_coalesces(self, client, auth):
+        responses = [client.post("/api/publish", headers=auth) for _ in range(3)]
+
+        assert [r.status_code for r in responses] == [202, 202, 202]
+        assert len({r.json()["id"] for r in responses}) == 1
+        assert [r.json()["coalesced"] for r in responses] == [False, True, True]
+        assert responses[-1].json()["requests"] == 3
+
+    def test_dry_run_is_a_separate_job(self, client, auth):
+        """Dry runs queue their own job rather than joining a real publish."""
+        publish = client.post("/api/publish", headers=auth).json()
+        dry_run = client.post("/api/publish?dry_run=1", headers=auth).json()
+
+        assert dry_run["kind"] == "publish_dry_run"
+        assert dry_run["id"] != publish["id"]
+        assert not dry_run["coalesced"]
+
+    def test_job_status(self, client, auth):
+        job = client.post("/api/publish", headers=auth).json()
+
+        status = client.get(job["url"], headers=auth)
+        fragment = client.get(job["url"], headers={**auth, "HX-Request": "true"})
+
+        assert status.json()["state"] == "queued"
+        assert 'hx-trigger="every 1s"' in fragment.text
+        assert client.get("/api/jobs/999", headers=auth).status_code == 404
+
+    def test_events_stream_until_finished(self, client, auth, temp_db):
+        job = client.post("/api/publish", headers=auth).json()
+        temp_db.claim_job(0)
+        temp_db.finish_job(job["id"], "succeeded", result={"pages": 1})
+
+        response = client.get(job["events"], headers=auth)
+
+        assert response.headers["content-type"].startswith("text/event-stream")
+        assert response.text.startswith("event: done\ndata: ")
+        assert '"pages": 1' in response.text
+
+
+class TestMetrics:
+    """Test the /metrics endpoint."""
+
+    def test_exposes_request_and_database_metrics(self, client, auth):
+        client.get("/api/content", headers=auth)
+
+        response = client.get("/metrics")
+
+        assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+        assert 'route="/api/content",status="200"' in response.text
+        assert (
+            'blogbot_db_query_duration_seconds_count{method="list_content"}'
+            in response.text
+        )
+        assert 'blogbot_cache_hits_total{cache="api_keys"}' in response.text
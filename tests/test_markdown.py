@@ -0,0 +1,93 @@
+# ABOUTME: Unit tests for markdown processing and frontmatter parsing
+# ABOUTME: Tests slug generation, URL rules and HTML rendering
+import pytest
+
+from app.services.markdown import FrontmatterError, parse_post, render_markdown, slugify
+
+
+class TestSlugify:
+    """Test URL slug generation."""
+
+    def test_basic_title(self):
+        """Titles become lowercase dash-separated slugs."""
+        assert slugify("My Post Title") == "my-post-title"
+
+    def test_strips_punctuation(self):
+        """Punctuation is dropped and runs of separators collapse."""
+        assert (
+            slugify("Hello, World!  Again_and -- again")
+            == "hello-world-again-and-again"
+        )
+
+
+class TestParsePost:
+    """Test frontmatter parsing into Post objects."""
+
+    def test_full_frontmatter(self):
+        """All documented frontmatter fields are parsed."""
+        post = parse_post(
+            "posts/x.md",
+            (
+                "---\ntitle: My Post\ndate: 2025-06-12\ntags: [python, web]\n"
+                "type: post\nslug: custom\n---\nBody text\n"
+            ),
+        )
+
+        assert post.title == "My Post"
+        assert post.date == "2025-06-12"
+        assert post.tags == ["python", "web"]
+        assert post.slug == "custom"
+        assert post.body.strip() == "Body text"
+        assert post.url == "/2025-06-12-custom"
+        assert post.output_path == "2025-06-12-custom.html"
+
+    def test_defaults_without_frontmatter(self):
+        """Missing fields fall back to the file name and post type."""
+        post = parse_post("posts/hello-there.md", "Just text")
+
+        assert post.title == "hello-there"
+        assert post.slug == "hello-there"
+        assert post.type == "post"
+        assert post.tags == []
+        assert post.url == "/hello-there"
+
+    def test_page_url(self):
+        """Pages live at /slug/."""
+        post = parse_post("pages/about.md", "---\ntitle: About\ntype: page\n---\nHi")
+
+        assert post.url == "/about/"
+        assert post.output_path == "about/index.html"
+
+    def test_slug_cannot_leave_the_site(self):
+        """An explicit slug is slugified, so path separators and ".." are dropped."""
+        page = parse_post("p.md", "---\ntype: page\nslug: ../../escaped\n---\n")
+        post = parse_post("q.md", "---\nslug: ../../x\n---\n")
+
+        assert page.output_path == "escaped/index.html"
+        assert post.output_path == "x.html"
+
+    def test_comma_separated_tags(self):
+        """Tags given as a comma-separated string are split."""
+        post = parse_post("p.md", "---\ntitle: T\ntags: a, b ,c\n---\n")
+        assert post.tags == ["a", "b", "c"]
+
+    def test_invalid_frontmatter(self):
+        """Unparseable YAML raises FrontmatterError carrying the body."""
+        with pytest.raises(
+            FrontmatterError, match="p.md: invalid frontmatter"
+        ) as raised:
+            parse_post("p.md", "---\ntitle: [oops\n---\nBody\n")
+
+        assert raised.value.body == "Body"
+
+
+class TestRenderMarkdown:
+    """Test markdown to HTML rendering."""
+
+    def test_renders_inline_markup(self):
+        """Emphasis and paragraphs are rendered."""
+        assert render_markdown("Hello *world*") == "<p>Hello <em>world</em></p>\n"
+
+    def test_renders_tables(self):
+        """GFM-style tables are enabled."""
+        assert "<table>" in render_markdown("| a | b |\n|---|---|\n| 1 | 2 |\n")
@@ -0,0 +1,196 @@
+# ABOUTME: Tests for the metrics registry, Prometheus output and request instrumentation
+# ABOUTME: Covers histograms, timed Database methods, request IDs and log sampling
+import json
+import logging
+
+import pytest
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.responses import PlainTextResponse
+from starlette.routing import Route
+from starlette.testclient import TestClient
+
+from app.logs import JSONFormatter, request_id
+from app.metrics import (
+    Metric,
+    Registry,
+    RequestMetricsMiddleware,
+    http_requests,
+    timed_methods,
+)
+
+
+class TestRegistry:
+    """Test metric types and the text exposition format."""
+
+    def test_counter_and_label_escaping(self):
+        registry = Registry()
+        counter = registry.counter("hits_total", "Hits", ["path"])
+        counter.inc('/a"b')
+        counter.inc('/a"b', amount=2)
+
+        text = registry.render()
+
+        assert "# TYPE hits_total counter" in text
+        assert 'hits_total{path="/a\\"b"} 3' in text
+
+    def test_metric_types_must_render_samples(self):
+        class Gauge(Metric):
+            kind = "gauge"
+
+        with pytest.raises(TypeError):
+            Gauge("temperature", "Temperature")
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = Registry()
+        histogram = registry.histogram(
+            "latency_seconds", "Latency", ["route"], buckets=(0.1, 1)
+        )
+        for value in (0.05, 0.5, 0.5, 5):
+            histogram.observe(value, "/x")
+
+        lines = registry.render().splitlines()
+
+        assert 'latency_seconds_bucket{route="/x",le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{route="/x",le="1"} 3' in lines
+        assert 'latency_seconds_bucket{route="/x",le="+Inf"} 4' in lines
+        assert 'latency_seconds_count{route="/x"} 4' in lines
+        assert 'latency_seconds_sum{route="/x"} 6.05' in lines
+
+    def test_callback_read_at_scrape_time(self):
+        registry = Registry()
+        state = {"hits": 1}
+        registry.callback(
+            "cache_hits_total",
+            "Hits",
+            ["cache"],
+            lambda: {("auth",): state["hits"]},
+            kind="counter",
+        )
+        state["hits"] = 7
+
+        assert 'cache_hits_total{cache="auth"} 7' in registry.render()
+
+    def test_registering_twice_returns_same_metric(self):
+        registry = Registry()
+        assert registry.counter("a_total", "A") is registry.counter("a_total", "A")
+
+
+class TestTimedMethods:
+    """Test the class decorator timing public methods."""
+
+    def test_public_methods_and_generators_are_timed(self):
+        histogram = Registry().histogram("calls_seconds", "Calls", ["method"])
+
+        @timed_methods(histogram)
+        class Store:
+            def get(self, key):
+                return key * 2
+
+            def scan(self):
+                yield from range(3)
+
+            def _private(self):
+                return None
+
+        store = Store()
+
+        assert store.get(2) == 4
+        assert list(store.scan()) == [0, 1, 2]
+        store._private()
+        assert histogram.count("get") == 1
+        assert histogram.count("scan") == 1
+        assert histogram.count("_private") == 0
+        assert Store.get.__name__ == "get"
+
+
+def build_app(**options):
+    async def item(request):
+        logging.getLogger("blogbot.test").info("handling")
+        return PlainTextResponse(request.path_params["item_id"])
+
+    async def health(request):
+        return PlainTextResponse("ok")
+
+    return Starlette(
+        routes=[Route("/items/{item_id}", item), Route("/health", health)],
+        middleware=[Middleware(RequestMetricsMiddleware, **options)],
+    )
+
+
+@pytest.fixture
+def records():
+    """Capture log records emitted through the root logger."""
+    captured = []
+
+    class Capture(logging.Handler):
+        def emit(self, record):
+            captured.append((record, request_id.get()))
+
+    handler = Capture()
+    root = logging.getLogger()
+    root.addHandler(handler)
+    level = root.level
+    root.setLevel(logging.INFO)
+    yield captured
+    root.removeHandler(handler)
+    root.setLevel(level)
+
+
+class TestRequestMetricsMiddleware:
+    """Test request IDs, route labels and access log sampling."""
+
+    def test_request_id_generated_and_propagated(self, records):
+        client = TestClient(build_app())
+
+        response = client.get("/items/1")
+
+        rid = response.headers["x-request-id"]
+        assert len(rid) == 32
+        access = [record for record, _ in records if record.name == "blogbot.access"]
+        assert (records[0][0].getMessage(), records[0][1]) == ("handling", rid)
+        assert access[0].status == 200
+
+    def test_client_request_id_reused(self):
+        client = TestClient(build_app())
+
+        response = client.get("/items/1", headers={"X-Request-ID": "abc123"})
+
+        assert response.headers["x-request-id"] == "abc123"
+
+    def test_route_template_is_the_label(self):
+        client = TestClient(build_app())
+        before = http_requests.value("GET", "/items/{item_id}", "200")
+
+        client.get("/items/1")
+        client.get("/items/2")
+        client.get("/missing")
+
+        assert http_requests.value("GET", "/items/{item_id}", "200") == before + 2
+        assert http_requests.value("GET", "/items/1", "200") == 0
+        assert http_requests.value("GET", "unmatched", "404") >= 1
+
+    def test_sampled_paths_are_not_logged(self, records):
+        client = TestClient(build_app(sampled_paths={"/health": 0.0}))
+
+        client.get("/health")
+
+        assert not [record for record, _ in records if record.name == "blogbot.access"]
+
+
+class TestJSONFormatter:
+    def test_includes_request_id_and_extra_fields(self):
+        record = logging.LogRecord(
+            "blogbot", logging.INFO, "", 0, "GET %s", ("/x",), None
+        )
+        record.status = 200
+        token = request_id.set("rid-1")
+        try:
+            entry = json.loads(JSONFormatter().format(record))
+        finally:
+            request_id.reset(token)
+
+        assert entry["message"] == "GET /x"
+        assert entry["request_id"] == "rid-1"
+        assert entry["status"] == 200
+        assert entry["level"] == "INFO"
@@ -3,11 +3,19 @@
 import pytest
 import tempfile
 import os
-from dataclasses import dataclass, field
+from dataclasses import FrozenInstanceError, dataclass, field
 from datetime import datetime
 from typing import Optional, List
 
-from app.models import Settings, APIKey, DeploymentConfig
+from app.models import (
+    PERMISSIONS,
+    APIKey,
+    ContentItem,
+    DeploymentConfig,
+    Settings,
+    permission_mask,
+    permission_names,
+)
 
 
 class TestSettings:
@@ -106,4 +114,32 @@ class TestDeploymentConfig:
         )
         
         assert config.custom_domain == "myblog.com"
-        assert config.auto_deploy is False
\ No newline at end of file
+        assert config.auto_deploy is False
+
+
+class TestCompactModels:
+    """Test slots, frozen config models and the permission bitmask."""
+
+    def test_models_are_slotted(self):
+        item = ContentItem("posts/a.md", "sha", "A")
+
+        assert not hasattr(item, "__dict__")
+        with pytest.raises(AttributeError):
+            item.extra = 1
+
+    def test_config_models_are_frozen(self):
+        with pytest.raises(FrozenInstanceError):
+            Settings("Blog", "Desc", "user/repo").theme = "dark"
+        with pytest.raises(FrozenInstanceError):
+            DeploymentConfig("user/site").auto_deploy = False
+
+    def test_permission_mask_round_trip(self):
+        mask = permission_mask(["write", "read"])
+
+        assert mask == (1 << len(PERMISSIONS)) - 1
+        assert permission_names(mask) == frozenset({"read", "write"})
+        assert permission_names(permission_mask([])) == frozenset()
+
+    def test_unknown_permission_rejected(self):
+        with pytest.raises(ValueError):
+            permission_mask(["read", "admin"])
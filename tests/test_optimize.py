@@ -0,0 +1,172 @@
+# ABOUTME: Tests for the post-build optimization stage
+# ABOUTME: Covers minification, fingerprinting, the manifest and skipping unchanged ones
+import json
+from dataclasses import replace
+
+import pytest
+
+from app.services.optimize import (
+    MANIFEST_PATH,
+    fingerprint_path,
+    minify_css,
+    minify_html,
+    optimize_site,
+    rewrite_references,
+)
+from app.services.static_site import SiteBuilder
+
+
+@pytest.fixture
+def settings(settings):
+    return replace(settings, custom_css="body {\n  color: red;\n}\n")
+
+
+@pytest.fixture
+def sources():
+    return {
+        "posts/a.md": (
+            "---\ntitle: Alpha\ndate: 2025-01-01\n---\nSome *text*\n\n    code\n"
+        ),
+        "posts/b.md": "---\ntitle: Beta\ndate: 2025-02-01\n---\nMore text\n",
+    }
+
+
+class TestMinifyHTML:
+    """Test HTML minification."""
+
+    def test_collapses_whitespace_between_blocks(self):
+        assert minify_html("<ul>\n  <li>One</li>\n  <li>Two</li>\n</ul>\n") == (
+            "<ul><li>One</li><li>Two</li></ul>"
+        )
+
+    def test_keeps_inline_spacing(self):
+        """Spaces between inline elements render, so one is kept."""
+        assert minify_html("<p><a>x</a>   <a>y</a></p>") == "<p><a>x</a> <a>y</a></p>"
+
+    def test_keeps_preformatted_text(self):
+        markup = "<pre><code>a\n\n    b</code></pre>"
+
+        assert minify_html(f"<div>\n{markup}\n</div>") == f"<div>{markup}</div>"
+
+    def test_drops_comments_but_not_conditional_comments(self):
+        assert minify_html("<p>a<!-- note --></p><!--[if IE]>x<![endif]-->") == (
+            "<p>a</p><!--[if IE]>x<![endif]-->"
+        )
+
+
+class TestMinifyCSS:
+    """Test CSS minification."""
+
+    def test_removes_comments_and_whitespace(self):
+        assert (
+            minify_css("/* theme */\nbody ,  p {\n  color: red;\n}\n")
+            == "body,p{color: red}"
+        )
+
+    def test_keeps_strings(self):
+        assert (
+            minify_css('a::after { content: "  ;}  "; }')
+            == 'a::after{content: "  ;}  "}'
+        )
+
+    def test_keeps_descendant_combinators(self):
+        """``div :first-child`` and ``div:first-child`` select different elements."""
+        assert minify_css("div :first-child { margin: calc(1px + 2px); }") == (
+            "div :first-child{margin: calc(1px + 2px)}"
+        )
+
+
+class TestFingerprinting:
+    """Test content-hashed asset names and reference rewriting."""
+
+    def test_name_follows_content(self):
+        path = fingerprint_path("assets/custom.css", b"a{}")
+
+        assert path.startswith("assets/custom.") and path.endswith(".css")
+        assert path == fingerprint_path("assets/custom.css", b"a{}")
+        assert path != fingerprint_path("assets/custom.css", b"b{}")
+
+    def test_rewrites_root_relative_references(self):
+        manifest = {"assets/custom.css": "assets/custom.0123456789.css"}
+
+        assert (
+            rewrite_references(
+                '<link href="/assets/custom.css"><a href="/assets/custom.css.bak">',
+                manifest,
+            )
+            == '<link href="/assets/custom.0123456789.css">'
+            '<a href="/assets/custom.css.bak">'
+        )
+
+    def test_rewrites_earlier_fingerprints(self):
+        manifest = {"assets/custom.css": "assets/custom.0123456789.css"}
+
+        assert rewrite_references(
+            '<link href="/assets/custom.abcdefabcd.css">', manifest
+        ) == ('<link href="/assets/custom.0123456789.css">')
+
+
+class TestOptimizeSite:
+    """Test optimizing a built site in place."""
+
+    def build(self, db, settings, sources, output):
+        SiteBuilder(db, output, settings).build(sources)
+        return optimize_site(db, output)
+
+    def test_fingerprints_and_minifies(self, temp_db, settings, sources, tmp_path):
+        """Pages link the minified, fingerprinted stylesheet listed in the manifest."""
+        report = self.build(temp_db, settings, sources, tmp_path)
+        manifest = json.loads((tmp_path / MANIFEST_PATH).read_text())
+        fingerprinted = manifest["assets/custom.css"]
+        page = (tmp_path / "index.html").read_text()
+
+        assert report.fingerprinted == manifest
+        assert (tmp_path / fingerprinted).read_text() == "body{color: red}"
+        assert f'href="/{fingerprinted}"' in page
+        assert "\n" not in page.strip()
+
+    def test_repeat_run_skips_everything(self, temp_db, settings, sources, tmp_path):
+        first = self.build(temp_db, settings, sources, tmp_path)
+
+        second = self.build(temp_db, settings, sources, tmp_path)
+
+        assert second.minified == []
+        assert second.unchanged == len(first.minified)
+
+    def test_rebuilt_page_is_optimized_again(
+        self, temp_db, settings, sources, tmp_path
+    ):
+        """Only pages the build rewrote are minified again."""
+        self.build(temp_db, settings, sources, tmp_path)
+
+        sources["posts/b.md"] = sources["posts/b.md"].replace("More", "Less")
+        report = self.build(temp_db, settings, sources, tmp_path)
+
+        assert report.minified == ["2025-02-01-beta.html"]
+
+    def test_css_change_refingerprints(self, temp_db, settings, sources, tmp_path):
+        """A new stylesheet gets a new name; the old copy is removed."""
+        old = self.build(temp_db, settings, sources, tmp_path).fingerprinted[
+            "assets/custom.css"
+        ]
+
+        restyled = replace(settings, custom_css="body { color: blue }")
+        report = self.build(temp_db, restyled, sources, tmp_path)
+        new = report.fingerprinted["assets/custom.css"]
+
+        assert new != old
+        assert report.deleted == [old]
+        assert f'href="/{new}"' in (tmp_path / "2025-01-01-alpha.html").read_text()
+
+    def test_parallel_matches_serial(self, temp_db, settings, sources, tmp_path):
+        serial, parallel = tmp_path / "serial", tmp_path / "parallel"
+        SiteBuilder(temp_db, serial, settings).build(sources)
+        SiteBuilder(temp_db, parallel, settings).build(sources, full=True)
+
+        optimize_site(temp_db, serial)
+        optimize_site(temp_db, parallel, workers=2, chunk_size=1)
+
+        for page in serial.rglob("*.html"):
+            assert (
+                page.read_bytes() == (parallel / page.relative_to(serial)).read_bytes()
+            )
@@ -0,0 +1,153 @@
+# ABOUTME: Tests for the block-level editor preview
+# ABOUTME: Checks blocks render like the whole document, block caching and block diffs
+import pytest
+
+from app.services.markdown import render_markdown
+from app.services.preview import BlockRenderer, diff_blocks, split_blocks
+from app.services.render_cache import RenderCache
+
+# Documents whose blank lines do not all separate top-level blocks
+TRICKY = {
+    "loose list": "- one\n\n- two\n\n  continued\n\nAfter\n",
+    "list after paragraph": "Intro\n- one\n\n- two\n",
+    "fence with blank lines": "```python\na = 1\n\nb = 2\n```\n\nAfter\n",
+    "nested fences": "~~~~\n```\n\n~~~\nstill code\n~~~~\n\nAfter\n",
+    "html comment": "<!-- note\n\nstill a note -->\n\nAfter\n",
+    "raw pre": "<pre>\nx\n\ny\n</pre>\n\nAfter\n",
+    "fence after html": "<div>\n```\n\n```\n</div>\n",
+    "indented code": "    code\n\n    more code\n\nAfter\n",
+    "fence in list item": "- item\n  ```\n  a\n\n  b\n  ```\n- next\n",
+    "reference link": "See [the docs][docs].\n\n[docs]: https://example.com\n",
+    "leading blank lines": "\n\n# Title\n\n\n",
+    "post": (
+        "# Title\n\nIntro with *emphasis*\nand a [link](https://example.com).\n\n"
+        "## Steps\n\n1. First\n2. Second\n\n   Detail\n\n> Quote\n> more\n\n"
+        "| a | b |\n|---|---|\n| 1 | 2 |\n\n---\n\n![Image](images/a.jpg)\n"
+    ),
+}
+
+
+def joined(body: str) -> str:
+    return "".join(block.html for block in BlockRenderer().render(body))
+
+
+class TestSplitBlocks:
+    """Test the top-level block scanner."""
+
+    def test_splits_at_blank_lines(self):
+        assert split_blocks("# Title\n\nOne\ntwo\n\nThree\n") == [
+            "# Title\n",
+            "One\ntwo\n",
+            "Three\n",
+        ]
+
+    def test_keeps_fenced_code_together(self):
+        source = "```\na\n\nb\n```\n"
+
+        assert split_blocks(source) == [source]
+
+    def test_reference_definitions_keep_one_block(self):
+        """Reference links resolve across blocks, so the document stays whole."""
+        source = TRICKY["reference link"]
+
+        assert split_blocks(source) == [source]
+
+    def test_empty_body(self):
+        assert split_blocks("") == []
+        assert split_blocks("\n\n") == []
+
+    @pytest.mark.parametrize("name", sorted(TRICKY))
+    def test_blocks_render_like_document(self, name):
+        source = TRICKY[name]
+
+        assert joined(source) == render_markdown(source)
+
+
+class TestBlockRenderer:
+    """Test per-block rendering and caching."""
+
+    def test_unchanged_blocks_are_cached(self):
+        """Re-rendering after an edit only renders the edited block."""
+        renderer = BlockRenderer()
+        renderer.render("# Title\n\nOne\n\nTwo\n")
+        renderer.render("# Title\n\nOne, edited\n\nTwo\n")
+
+        assert renderer.stats() == {"hits": 2, "misses": 4}
+
+    def test_ids_survive_edits_elsewhere(self):
+        renderer = BlockRenderer()
+        before = renderer.render("One\n\nTwo\n")
+        after = renderer.render("One!\n\nTwo\n")
+
+        assert before[1].id == after[1].id
+        assert before[0].id != after[0].id
+
+    def test_repeated_blocks_get_distinct_ids(self):
+        blocks = BlockRenderer().render("Same\n\nSame\n")
+
+        assert blocks[0].html == blocks[1].html
+        assert blocks[0].id != blocks[1].id
+
+    def test_misses_fall_back_to_the_render_cache(self, temp_db):
+        """A fresh renderer reuses blocks another one stored in SQLite."""
+        cache = RenderCache(temp_db)
+        BlockRenderer(cache).render("# Title\n\nBody\n")
+
+        blocks = BlockRenderer(cache).render("# Title\n\nBody\n")
+
+        assert "".join(block.html for block in blocks) == render_markdown(
+            "# Title\n\nBody\n"
+        )
+        assert cache.stats() == {"hits": 2, "misses": 2}
+
+    def test_theme_changes_ids(self):
+        renderer = BlockRenderer()
+
+        assert (
+            renderer.render("One\n", "default")[0].id
+            != renderer.render("One\n", "dark")[0].id
+        )
+
+
+class TestDiffBlocks:
+    """Test diffing the client's block IDs against a new render."""
+
+    def render(self, body):
+        return BlockRenderer().render(body)
+
+    def test_no_changes(self):
+        blocks = self.render("One\n\nTwo\n")
+
+        assert diff_blocks([block.id for block in blocks], blocks) == ([], [])
+
+    def test_edited_block_replaced_in_place(self):
+        before = self.render("One\n\nTwo\n\nThree\n")
+        after = self.render("One\n\nTwo!\n\nThree\n")
+        diff = diff_blocks([block.id for block in before], after)
+
+        assert diff.deleted == [before[1].id]
+        assert diff.inserted == [(after[0].id, after[1])]
+
+    def test_insert_at_start(self):
+        before = self.render("One\n")
+        after = self.render("Zero\n\nOne\n")
+        diff = diff_blocks([block.id for block in before], after)
+
+        assert diff.deleted == []
+        assert diff.inserted == [(None, after[0])]
+
+    def test_consecutive_inserts_chain(self):
+        """Each inserted block goes after the one inserted before it."""
+        after = self.render("One\n\nTwo\n")
+        diff = diff_blocks([], after)
+
+        assert diff.inserted == [(None, after[0]), (after[0].id, after[1])]
+
+    def test_removed_block(self):
+        before = self.render("One\n\nTwo\n\nThree\n")
+        after = self.render("One\n\nThree\n")
+
+        assert diff_blocks([block.id for block in before], after) == (
+            [before[1].id],
+            [],
+        )
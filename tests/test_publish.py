@@ -0,0 +1,325 @@
+# ABOUTME: Tests for single-commit publishing through the Git Data API
+# ABOUTME: Uses an in-memory git remote served by the stub GitHub server
+import base64
+import json
+
+import pytest
+
+from app.database import Database
+from app.models import DeploymentConfig, Settings
+from app.services.github import GitHubClient
+from app.services.pipeline import run_publish
+from app.services.publish import (
+    git_blob_sha,
+    plan_files,
+    plan_site,
+    publish_files,
+    publish_site,
+)
+
+
+class FakeRemote:
+    """In-memory Git Data API for one repository, mounted on the stub server."""
+
+    def __init__(self, stub, repo="u/site", branch="gh-pages"):
+        self.branch = branch
+        self.files = {}  # Current branch content: path -> bytes
+        self.head = None
+        self.commits = 0
+        self.blob_uploads = []
+        self.blobs = {}
+        base = f"/repos/{repo}/git"
+        stub.routes[("GET", f"{base}/ref/heads/{branch}")] = self.get_ref
+        stub.routes[("POST", f"{base}/blobs")] = self.create_blob
+        stub.routes[("POST", f"{base}/trees")] = self.create_tree
+        stub.routes[("POST", f"{base}/commits")] = self.create_commit
+        stub.routes[("POST", f"{base}/refs")] = self.set_ref
+        stub.routes[("PATCH", f"{base}/refs/heads/{branch}")] = self.set_ref
+        self.stub = stub
+        self.base = base
+        self.trees = {}  # Tree SHA -> files
+        self.pending_commits = {}  # Commit SHA -> request body
+
+    def seed(self, files):
+        """Give the branch an initial commit containing ``files``."""
+        self.trees["t0"] = dict(files)
+        self._commit("c0", "t0")
+        self.files = dict(files)
+        self.head = "c0"
+
+    def _commit(self, sha, tree):
+        self.stub.routes[("GET", f"{self.base}/commits/{sha}")] = lambda h: (
+            200,
+            {},
+            {"sha": sha, "tree": {"sha": tree}},
+        )
+        self.stub.routes[("GET", f"{self.base}/trees/{tree}")] = lambda h: (
+            200,
+            {},
+            {
+                "tree": [
+                    {
+                        "path": path,
+                        "sha": git_blob_sha(data),
+                        "type": "blob",
+                        "size": len(data),
+                    }
+                    for path, data in self.trees[tree].items()
+                ]
+            },
+        )
+
+    def _body(self, handler):
+        return json.loads(handler.request_body)
+
+    def get_ref(self, handler):
+        if self.head is None:
+            return 404, {}, {"message": "Not Found"}
+        return 200, {}, {"object": {"sha": self.head}}
+
+    def create_blob(self, handler):
+        content = base64.b64decode(self._body(handler)["content"])
+        sha = git_blob_sha(content)
+        self.blobs[sha] = content
+        self.blob_uploads.append(sha)
+        return 201, {}, {"sha": sha}
+
+    def create_tree(self, handler):
+        body = self._body(handler)
+        files = dict(self.trees[body["base_tree"]]) if "base_tree" in body else {}
+        for entry in body["tree"]:
+            if entry["sha"] is None:
+                files.pop(entry["path"], None)
+            else:
+                files[entry["path"]] = self.blobs[entry["sha"]]
+        sha = f"t{len(self.trees)}"
+        self.trees[sha] = files
+        return 201, {}, {"sha": sha}
+
+    def create_commit(self, handler):
+        body = self._body(handler)
+        self.commits += 1
+        sha = f"c{self.commits}"
+        self.pending_commits[sha] = body
+        self._commit(sha, body["tree"])
+        return 201, {}, {"sha": sha}
+
+    def set_ref(self, handler):
+        sha = self._body(handler)["sha"]
+        self.head = sha
+        self.files = self.trees[self.pending_commits[sha]["tree"]]
+        return 200, {}, {"object": {"sha": sha}}
+
+
+@pytest.fixture
+def remote(stub):
+    return FakeRemote(stub)
+
+
+@pytest.fixture
+async def client(stub):
+    github = GitHubClient(base_url=stub.url, max_concurrency=4)
+    yield github
+    await github.aclose()
+
+
+class TestGitBlobSha:
+    """Test local blob hashing."""
+
+    def test_matches_git(self):
+        """Matches `git hash-object` for a known input."""
+        assert git_blob_sha(b"hello\n") == "ce013625030ba8dba906f756967f9e9ca394464a"
+
+
+class TestPublishFiles:
+    """Test single-commit publishing."""
+
+    async def test_first_publish_creates_branch(self, remote, client):
+        """Publishing to a missing branch creates it with one commit."""
+        report = await publish_files(
+            client,
+            "u/site",
+            "gh-pages",
+            {"index.html": b"<h1>Hi</h1>", "feed.xml": b"<rss/>"},
+        )
+
+        assert remote.files == {"index.html": b"<h1>Hi</h1>", "feed.xml": b"<rss/>"}
+        assert remote.commits == 1
+        assert report.uploaded == ["feed.xml", "index.html"]
+        assert report.bytes_uploaded == len(b"<h1>Hi</h1>") + len(b"<rss/>")
+
+    async def test_only_changed_blobs_uploaded(self, remote, client):
+        """Files identical on the remote are skipped."""
+        remote.seed({"index.html": b"old", "a.html": b"same"})
+
+        report = await publish_files(
+            client, "u/site", "gh-pages", {"index.html": b"new", "a.html": b"same"}
+        )
+
+        assert report.uploaded == ["index.html"]
+        assert report.skipped == 1
+        assert len(remote.blob_uploads) == 1
+        assert remote.files == {"index.html": b"new", "a.html": b"same"}
+        assert remote.commits == 1
+
+    async def test_deletes_missing_files(self, remote, client):
+        """Files no longer in the build are removed in the same commit."""
+        remote.seed({"index.html": b"x", "old.html": b"gone"})
+
+        report = await publish_files(client, "u/site", "gh-pages", {"index.html": b"x"})
+
+        assert report.deleted == ["old.html"]
+        assert remote.files == {"index.html": b"x"}
+
+    async def test_nothing_to_publish(self, remote, client):
+        """An identical build creates no commit."""
+        remote.seed({"index.html": b"x"})
+
+        report = await publish_files(client, "u/site", "gh-pages", {"index.html": b"x"})
+
+        assert report.commit_sha == ""
+        assert remote.commits == 0
+
+    async def test_publish_site_adds_cname(self, remote, client, tmp_path):
+        """Output directories are published with a CNAME for custom domains."""
+        (tmp_path / "tags").mkdir()
+        (tmp_path / "index.html").write_bytes(b"home")
+        (tmp_path / "tags" / "index.html").write_bytes(b"tags")
+
+        await publish_site(
+            client, "u/site", "gh-pages", tmp_path, custom_domain="blog.example"
+        )
+
+        assert remote.files == {
+            "index.html": b"home",
+            "tags/index.html": b"tags",
+            "CNAME": b"blog.example\n",
+        }
+
+
+class TestPlan:
+    """Test working out a publish without pushing."""
+
+    def test_plan_files(self):
+        remote = {"same.html": git_blob_sha(b"same"), "old.html": "x", "gone.html": "y"}
+
+        plan = plan_files(
+            remote, {"same.html": b"same", "old.html": b"new", "add.html": b"add"}
+        )
+
+        assert plan.added == ["add.html"]
+        assert plan.changed == ["old.html"]
+        assert plan.deleted == ["gone.html"]
+        assert plan.unchanged == 1
+        assert plan.bytes_to_upload == len(b"new") + len(b"add")
+
+    async def test_plan_site_pushes_nothing(self, remote, client, tmp_path):
+        """Planning only reads the remote tree."""
+        remote.seed({"index.html": b"old", "CNAME": b"blog.example\n"})
+        (tmp_path / "index.html").write_bytes(b"new")
+
+        plan = await plan_site(client, "u/site", "gh-pages", tmp_path, "blog.example")
+
+        assert (plan.added, plan.changed, plan.unchanged) == ([], ["index.html"], 1)
+        assert remote.commits == 0
+        assert remote.blob_uploads == []
+
+
+class TestPublishPipeline:
+    """Test fetching, building and publishing in one run."""
+
+    @pytest.fixture
+    def temp_db(self, temp_db):
+        temp_db.save_settings(Settings("Blog", "Desc", "u/blog"))
+        temp_db.save_deployment_config(
+            DeploymentConfig("u/site", custom_domain="blog.example")
+        )
+        return temp_db
+
+    @pytest.fixture
+    def content(self, stub):
+        """Content repo served through the Git Data and contents APIs."""
+        files = {
+            "posts/2025-01-01-hello.md": (
+                b"---\ntitle: Hello\ndate: 2025-01-01\n---\nHi there"
+            ),
+            "images/2025/cat.gif": b"GIF89a",
+            "README.txt": b"not published",
+        }
+        repo = FakeRemote(stub, "u/blog", "main")
+        repo.seed(files)
+        for path, data in files.items():
+            stub.routes[("GET", f"/repos/u/blog/contents/{path}")] = (
+                lambda handler, data=data: (200, {}, data)
+            )
+        return repo
+
+    async def test_publishes_built_site(
+        self, stub, remote, content, client, temp_db, tmp_path
+    ):
+        """The built pages, images and CNAME land on the Pages branch in one commit."""
+        stages = []
+
+        report = await run_publish(
+            temp_db,
+            client,
+            tmp_path / "site",
+            tmp_path / "cache",
+            progress=lambda stage, fraction: stages.append((stage, fraction)),
+        )
+
+        assert [stage for stage, _ in stages] == [
+            "fetch",
+            "build",
+            "images",
+            "optimize",
+            "publish",
+        ]
+        assert set(report.timings) == {
+            "fetch",
+            "build",
+            "images",
+            "optimize",
+            "publish",
+        }
+        assert (report.sources, report.images) == (1, 1)
+        assert remote.commits == 1
+        assert remote.files["images/2025/cat.gif"] == b"GIF89a"
+        assert remote.files["CNAME"] == b"blog.example\n"
+        assert "2025-01-01-hello.html" in remote.files
+        assert "asset-manifest.json" in remote.files
+        assert "README.txt" not in remote.files
+
+    async def test_dry_run(self, stub, remote, content, client, temp_db, tmp_path):
+        """A dry run builds the site, reports each step and lists changes, unpushed."""
+        remote.seed({"old.html": b"gone"})
+
+        report = await run_publish(
+            temp_db, client, tmp_path / "site", tmp_path / "cache", dry_run=True
+        )
+
+        assert remote.commits == 0
+        assert remote.blob_uploads == []
+        assert report.plan.deleted == ["old.html"]
+        assert "2025-01-01-hello.html" in report.plan.added
+        assert list(report.steps) == [
+            "fetch",
+            "parse",
+            "render",
+            "aggregate",
+            "write",
+            "images",
+            "optimize",
+            "upload",
+        ]
+        assert report.steps["fetch"].items == 2
+        assert report.steps["upload"].items == len(report.plan.added) + 1
+
+    async def test_requires_deployment_config(self, client, tmp_path):
+        """Publishing without a deployment target is a configuration error."""
+        db = Database(str(tmp_path / "blog.db"))
+        db.save_settings(Settings("Blog", "Desc", "u/blog"))
+
+        with pytest.raises(ValueError, match="Deployment"):
+            await run_publish(db, client, tmp_path / "site", tmp_path / "cache")
+        db.close()
@@ -0,0 +1,54 @@
+# ABOUTME: Tests for the content-addressed markdown render cache
+# ABOUTME: Verifies keying, hit/miss counting, persistence and size-bounded eviction
+
+from app.database import Database
+from app.services.render_cache import RenderCache, render_key
+
+
+class TestRenderKey:
+    """Test cache key derivation."""
+
+    def test_same_body_same_key(self):
+        assert render_key("# Hi") == render_key("# Hi")
+
+    def test_theme_changes_key(self):
+        """Different themes never share fragments."""
+        assert render_key("# Hi", "default") != render_key("# Hi", "dark")
+
+    def test_body_changes_key(self):
+        assert render_key("# Hi") != render_key("# Hi!")
+
+
+class TestRenderCache:
+    """Test rendering through the cache."""
+
+    def test_miss_then_hit(self, temp_db):
+        """The second render of a body is served from the cache."""
+        cache = RenderCache(temp_db)
+
+        first = cache.render("Hello *world*")
+        second = cache.render("Hello *world*")
+
+        assert first == second == "<p>Hello <em>world</em></p>\n"
+        assert cache.stats() == {"hits": 1, "misses": 1}
+
+    def test_persists_across_instances(self, temp_db):
+        """Fragments are stored in SQLite, not just in memory."""
+        RenderCache(temp_db).render("Persisted")
+
+        cache = RenderCache(Database(temp_db.db_path))
+        cache.render("Persisted")
+
+        assert cache.stats() == {"hits": 1, "misses": 0}
+
+    def test_evicts_least_recently_used(self, temp_db):
+        """Exceeding the size limit evicts the oldest fragments first."""
+        cache = RenderCache(temp_db, max_bytes=100)
+        cache.render("a" * 40)
+        temp_db.touch_rendered(render_key("a" * 40), 0)
+        cache.render("b" * 40)
+        cache.render("c" * 40)
+
+        assert temp_db.get_rendered(render_key("a" * 40)) is None
+        assert temp_db.get_rendered(render_key("c" * 40)) is not None
+        assert temp_db.render_cache_size() <= 100
@@ -0,0 +1,103 @@
+# ABOUTME: Tests for full-text search over the content index
+# ABOUTME: Covers query escaping, BM25 ranking, incremental updates and the static shard
+import json
+
+from app.models import Settings
+from app.services.content_index import index_file, remove_file
+from app.services.search import build_search_shard, fts_query, highlight, search
+from app.services.static_site import SiteBuilder
+
+
+class TestQuery:
+    """Test turning user input into FTS5 expressions."""
+
+    def test_words_are_quoted_with_prefix_on_last(self):
+        assert fts_query("sqlite perf") == '"sqlite" "perf"*'
+
+    def test_syntax_characters_are_dropped(self):
+        """FTS5 operators in user input are treated as plain text."""
+        assert fts_query('c++ "AND" (x') == '"c" "AND" "x"*'
+
+    def test_blank_query(self):
+        assert fts_query("  -- ") is None
+
+    def test_highlight_escapes_html(self):
+        assert highlight("<i>\x02x\x03</i>") == "&lt;i&gt;<mark>x</mark>&lt;/i&gt;"
+
+
+class TestSearch:
+    """Test searching the index."""
+
+    def test_title_outranks_body(self, temp_db, post):
+        """A title match scores above a body match."""
+        index_file(
+            temp_db, "a.md", post("Notes", "2025-01-01", body="about sqlite tuning")
+        )
+        index_file(temp_db, "b.md", post("SQLite tips", "2025-01-02", body="tips"))
+
+        hits = search(temp_db, "sqlite")
+
+        assert [hit.item.path for hit in hits] == ["b.md", "a.md"]
+        assert hits[0].score > hits[1].score
+
+    def test_matches_tags_prefixes_and_diacritics(self, temp_db, post):
+        index_file(temp_db, "a.md", post("Café culture", "2025-01-01", ["espresso"]))
+
+        assert [hit.item.path for hit in search(temp_db, "espresso")] == ["a.md"]
+        assert [hit.item.path for hit in search(temp_db, "cult")] == ["a.md"]
+        assert [hit.item.path for hit in search(temp_db, "cafe")] == ["a.md"]
+
+    def test_updates_and_deletes_are_reflected(self, temp_db, post):
+        index_file(temp_db, "a.md", post("Alpha", "2025-01-01", body="old words"))
+        index_file(temp_db, "a.md", post("Alpha", "2025-01-01", body="new words"))
+
+        assert search(temp_db, "old") == []
+        assert len(search(temp_db, "new")) == 1
+
+        remove_file(temp_db, "a.md")
+        assert search(temp_db, "new") == []
+
+    def test_snippet_marks_matches(self, temp_db, post):
+        index_file(temp_db, "a.md", post("Alpha", "2025-01-01", body="one two three"))
+
+        assert (
+            highlight(search(temp_db, "two")[0].snippet) == "one <mark>two</mark> three"
+        )
+
+
+class TestSearchShard:
+    """Test the prebuilt JSON shard for client-side search."""
+
+    def test_shard_layout(self, temp_db, post):
+        index_file(
+            temp_db, "a.md", post("Alpha", "2025-01-01", ["db"], body="sqlite sqlite")
+        )
+        index_file(temp_db, "b.md", post("Beta", "2025-02-01", body="sqlite"))
+
+        shard = build_search_shard(temp_db)
+
+        assert shard["docs"] == [
+            ["/2025-02-01-beta", "Beta", "2025-02-01"],
+            ["/2025-01-01-alpha", "Alpha", "2025-01-01"],
+        ]
+        assert shard["terms"]["sqlite"] == [0, 1, 1, 2]
+        assert shard["terms"]["alpha"] == [1, 10]
+        assert shard["terms"]["db"] == [1, 5]
+
+    def test_build_writes_shard_only_when_content_changes(
+        self, temp_db, tmp_path, post
+    ):
+        settings = Settings("Test Blog", "A blog", "user/repo")
+        sources = {"posts/a.md": post("Alpha", "2025-01-01", body="hello world")}
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        shard = json.loads((tmp_path / "search.json").read_text())
+        assert shard["terms"]["hello"] == [0, 1]
+        assert "search.json" not in builder.build(sources).rebuilt
+
+        sources["posts/a.md"] = post("Alpha", "2025-01-01", body="goodbye")
+        assert "search.json" in builder.build(sources).rebuilt
+        assert (
+            "hello" not in json.loads((tmp_path / "search.json").read_text())["terms"]
+        )
@@ -0,0 +1,109 @@
+# ABOUTME: Cold-start tests: import time budget and deferred initialization of app.main
+# ABOUTME: Measures `python -X importtime -c "import app.main"` in a fresh interpreter
+import os
+import sqlite3
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from app.database import SCHEMA_VERSION
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# Cumulative import time allowed for app.main; it measures about 0.3s on a
+# laptop, and the slack absorbs slow CI machines
+IMPORT_BUDGET_SECONDS = 1.0
+
+# Imported on first use (rendering, GitHub calls, publishing), never at startup
+DEFERRED_MODULES = [
+    "httpx",
+    "markdown_it",
+    "frontmatter",
+    "yaml",
+    "PIL",
+    "app.services.pipeline",
+    "app.services.mirror",
+]
+
+
+def run_python(code: str, db_path: Path, *flags: str) -> subprocess.CompletedProcess:
+    env = {**os.environ, "BLOGBOT_DB": str(db_path)}
+    return subprocess.run(
+        [sys.executable, *flags, "-c", code],
+        cwd=ROOT,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+
+
+def import_times(db_path: Path) -> dict[str, int]:
+    """Cumulative import time in microseconds of every module app.main pulls in."""
+    result = run_python("import app.main", db_path, "-X", "importtime")
+    times = {}
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line.split("|")
+        times[name.strip()] = int(cumulative)
+    return times
+
+
+@pytest.fixture
+def db_path(tmp_path):
+    return tmp_path / "blog.db"
+
+
+class TestColdStart:
+    """Test that importing the app is cheap and has no side effects."""
+
+    def test_import_within_budget(self, db_path):
+        """app.main imports within IMPORT_BUDGET_SECONDS."""
+        seconds = import_times(db_path)["app.main"] / 1e6
+
+        assert seconds < IMPORT_BUDGET_SECONDS
+
+    def test_heavy_modules_deferred(self, db_path):
+        """Markdown, YAML, HTTP client and build pipeline modules load on first use."""
+        imported = import_times(db_path)
+
+        assert [name for name in DEFERRED_MODULES if name in imported] == []
+
+    def test_import_does_not_touch_database(self, db_path):
+        """The database file is only opened once the app starts."""
+        run_python("import app.main", db_path)
+
+        assert not db_path.exists()
+
+    def test_lifespan_initializes_schema(self, db_path):
+        """App startup creates the schema and records SCHEMA_VERSION."""
+        run_python(
+            "from starlette.testclient import TestClient\n"
+            "import app.main\n"
+            "with TestClient(app.main.app) as client:\n"
+            "    client.get('/health').raise_for_status()\n",
+            db_path,
+        )
+        with sqlite3.connect(db_path) as conn:
+            version = conn.execute("PRAGMA user_version").fetchone()[0]
+        conn.close()
+
+        assert version == SCHEMA_VERSION
+
+    def test_lifespan_warns_about_missing_extras(self, db_path):
+        """Features whose optional dependency is missing are logged once at startup."""
+        result = run_python(
+            "from starlette.testclient import TestClient\n"
+            "import app.main\n"
+            "app.main.OPTIONAL_FEATURES = "
+            "(('Feature X', False, 'x'), ('Feature Y', True, 'y'))\n"
+            "with TestClient(app.main.app) as client:\n"
+            "    client.get('/health').raise_for_status()\n",
+            db_path,
+        )
+
+        assert result.stdout.count("Feature X disabled; install blogbot[x]") == 1
+        assert "Feature Y" not in result.stdout
@@ -0,0 +1,393 @@
+# ABOUTME: Tests for static site generation and incremental rebuilds
+# ABOUTME: Verifies manifest tracking, dependency-driven aggregate rebuilds, deletions
+from dataclasses import replace
+
+import pytest
+
+from app.services.render_cache import RenderCache
+from app.services.static_site import (
+    BuildReport,
+    SiteBuilder,
+    build_site,
+    render_sources,
+)
+
+
+@pytest.fixture
+def sources(post):
+    return {
+        "posts/a.md": post("Alpha", "2025-01-01", ["python"]),
+        "posts/b.md": post("Beta", "2025-02-01", ["python", "web"]),
+        "pages/about.md": "---\ntitle: About\ntype: page\n---\nAbout me\n",
+        "README.txt": "ignored",
+    }
+
+
+class TestFullBuild:
+    """Test building a site from scratch."""
+
+    def test_writes_all_pages(self, temp_db, settings, sources, tmp_path):
+        """Posts, pages, index, tag pages and the feed are generated."""
+        report = SiteBuilder(temp_db, tmp_path, settings).build(sources)
+
+        assert sorted(report.rebuilt) == [
+            "2025-01-01-alpha.html",
+            "2025-02-01-beta.html",
+            "about/index.html",
+            "archive/atom.xml",
+            "archive/feed.xml",
+            "atom.xml",
+            "feed.xml",
+            "index.html",
+            "search.json",
+            "tags/python/index.html",
+            "tags/web/index.html",
+        ]
+        index = (tmp_path / "index.html").read_text()
+        assert index.index("Beta") < index.index("Alpha")
+        assert "About" not in index
+        assert "https://x.io/2025-02-01-beta" in (tmp_path / "feed.xml").read_text()
+
+    def test_build_site_requires_settings(self, temp_db, sources, tmp_path):
+        """Building without configured settings is an error."""
+        with pytest.raises(ValueError):
+            build_site(temp_db, tmp_path, sources)
+
+
+class TestIncrementalBuild:
+    """Test that rebuilds only touch what changed."""
+
+    def test_no_changes_rebuilds_nothing(self, temp_db, settings, sources, tmp_path):
+        """A second build of identical sources writes no files."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        report = builder.build(sources)
+
+        assert report.rebuilt == []
+        assert report.rendered == 0
+
+    def test_body_edit_rebuilds_only_that_post(
+        self, temp_db, settings, sources, tmp_path, post
+    ):
+        """Editing a body leaves aggregate pages alone."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        sources["posts/a.md"] = post(
+            "Alpha", "2025-01-01", ["python"], body="Fixed typo"
+        )
+        report = builder.build(sources)
+
+        assert report.rebuilt == [
+            "2025-01-01-alpha.html",
+            "search.json",
+            "feed.xml",
+            "atom.xml",
+            "archive/feed.xml",
+            "archive/atom.xml",
+        ]
+        assert "Fixed typo" in (tmp_path / "2025-01-01-alpha.html").read_text()
+
+    def test_title_edit_rebuilds_dependents(
+        self, temp_db, settings, sources, tmp_path, post
+    ):
+        """Changing listed metadata rebuilds the aggregates that list the post."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        sources["posts/b.md"] = post("Beta Two", "2025-02-01", ["web"])
+        report = builder.build(sources)
+
+        assert sorted(report.rebuilt) == [
+            "2025-02-01-beta-two.html",
+            "archive/atom.xml",
+            "archive/feed.xml",
+            "atom.xml",
+            "feed.xml",
+            "index.html",
+            "search.json",
+            "tags/python/index.html",
+            "tags/web/index.html",
+        ]
+        assert "2025-02-01-beta.html" in report.deleted
+        assert not (tmp_path / "2025-02-01-beta.html").exists()
+
+    def test_deleting_source_removes_outputs(
+        self, temp_db, settings, sources, tmp_path
+    ):
+        """Deleted sources remove their page and now-empty tag pages."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        del sources["posts/b.md"]
+        report = builder.build(sources)
+
+        assert sorted(report.deleted) == ["2025-02-01-beta.html", "tags/web/index.html"]
+        assert "Beta" not in (tmp_path / "index.html").read_text()
+        assert not (tmp_path / "tags/web/index.html").exists()
+
+    def test_settings_change_rebuilds_everything(
+        self, temp_db, settings, sources, tmp_path
+    ):
+        """Changing blog settings invalidates every page."""
+        SiteBuilder(temp_db, tmp_path, settings).build(sources)
+
+        renamed = replace(settings, blog_title="Renamed")
+        report = SiteBuilder(temp_db, tmp_path, renamed).build(sources)
+
+        assert len(report.rebuilt) == 10
+        assert "Renamed" in (tmp_path / "atom.xml").read_text()
+
+    def test_missing_output_is_rebuilt(self, temp_db, settings, sources, tmp_path):
+        """Outputs deleted from disk are regenerated even if sources are unchanged."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        (tmp_path / "about/index.html").unlink()
+        report = builder.build(sources)
+
+        assert report.rebuilt == ["about/index.html"]
+
+    def test_full_build_ignores_manifest(self, temp_db, settings, sources, tmp_path):
+        """A full build re-renders every source."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        report = builder.build(sources, full=True)
+
+        assert report.rendered == 3
+        assert len(report.rebuilt) == 11
+
+    def test_custom_css_stylesheet(self, temp_db, settings, sources, tmp_path):
+        """Custom CSS is one linked stylesheet, removed again when cleared."""
+        styled = replace(settings, custom_css="body { color: red; }")
+        SiteBuilder(temp_db, tmp_path, styled).build(sources)
+
+        assert (tmp_path / "assets/custom.css").read_text() == "body { color: red; }"
+        assert (
+            '<link rel="stylesheet" href="/assets/custom.css">'
+            in (tmp_path / "index.html").read_text()
+        )
+
+        report = SiteBuilder(temp_db, tmp_path, settings).build(sources)
+
+        assert "assets/custom.css" in report.deleted
+        assert not (tmp_path / "assets/custom.css").exists()
+
+
+class TestInvalidSources:
+    """Test that one unparseable source does not fail the build."""
+
+    def test_new_source_is_reported_and_skipped(
+        self, temp_db, settings, sources, tmp_path
+    ):
+        sources["posts/bad.md"] = "---\ntitle: [oops\n---\nBody\n"
+
+        report = SiteBuilder(temp_db, tmp_path, settings).build(sources)
+
+        assert list(report.errors) == ["posts/bad.md"]
+        assert "invalid frontmatter" in report.errors["posts/bad.md"]
+        assert report.rendered == 3
+        assert (tmp_path / "2025-01-01-alpha.html").exists()
+
+    def test_broken_edit_keeps_previous_output(
+        self, temp_db, settings, sources, tmp_path
+    ):
+        """The last good page stays published and is retried on the next build."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        broken = dict(sources, **{"posts/a.md": "---\ntitle: [oops\n---\nBody\n"})
+        report = builder.build(broken)
+
+        assert list(report.errors) == ["posts/a.md"]
+        assert "2025-01-01-alpha.html" not in report.deleted
+        assert "Alpha" in (tmp_path / "index.html").read_text()
+        assert "Alpha" in (tmp_path / "2025-01-01-alpha.html").read_text()
+        assert list(builder.build(broken).errors) == ["posts/a.md"]
+
+    def test_parallel_build_reports_errors(self, temp_db, settings, sources, tmp_path):
+        sources["posts/bad.md"] = "---\ntitle: [oops\n---\nBody\n"
+
+        report = SiteBuilder(temp_db, tmp_path, settings, workers=2).build(sources)
+
+        assert list(report.errors) == ["posts/bad.md"]
+
+
+class TestOutputDirectory:
+    """Test that nothing is written or deleted outside the output directory."""
+
+    def test_escaping_write_is_refused(self, temp_db, settings, tmp_path):
+        builder = SiteBuilder(temp_db, tmp_path / "site", settings)
+        report = BuildReport()
+
+        builder._write("../escaped.html", "x", report)
+
+        assert not (tmp_path / "escaped.html").exists()
+        assert "../escaped.html" in report.errors
+
+    def test_stale_escaping_output_is_not_deleted(
+        self, temp_db, settings, sources, tmp_path
+    ):
+        """A manifest entry pointing outside the site is reported, not unlinked."""
+        builder = SiteBuilder(temp_db, tmp_path / "site", settings)
+        builder.build(sources)
+        alpha = temp_db.get_build_sources()["posts/a.md"]
+        temp_db.save_build([replace(alpha, output_path="../keep.html")], [], [], [])
+        (tmp_path / "keep.html").write_text("outside")
+        del sources["posts/a.md"]
+
+        report = builder.build(sources)
+
+        assert (tmp_path / "keep.html").read_text() == "outside"
+        assert "../keep.html" in report.errors
+
+
+class TestOutputClashes:
+    """Test sources that render to the same output path."""
+
+    def test_second_source_is_reported(
+        self, temp_db, settings, sources, tmp_path, post
+    ):
+        """The page keeps the source that had it first."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+        clash = dict(
+            sources, **{"posts/z.md": post("Alpha", "2025-01-01", body="Other")}
+        )
+
+        report = builder.build(clash)
+
+        assert list(report.errors) == ["posts/z.md"]
+        assert "2025-01-01-alpha.html" in report.errors["posts/z.md"]
+        assert "Other" not in (tmp_path / "2025-01-01-alpha.html").read_text()
+        assert (tmp_path / "index.html").read_text().count("2025-01-01-alpha") == 1
+
+    def test_remaining_source_takes_over(
+        self, temp_db, settings, sources, tmp_path, post
+    ):
+        """Deleting the first owner publishes the other source in its place."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        sources["posts/z.md"] = post("Alpha", "2025-01-01", body="Other")
+        builder.build(sources)
+        del sources["posts/a.md"]
+
+        report = builder.build(sources)
+
+        assert report.errors == {}
+        assert "Other" in (tmp_path / "2025-01-01-alpha.html").read_text()
+
+    def test_deleted_source_hands_output_back(
+        self, temp_db, settings, sources, tmp_path
+    ):
+        """A shared output overwritten by a deleted source is rendered for its owner."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+        # A manifest from before clashes were detected: z.md overwrote a's page
+        alpha = temp_db.get_build_sources()["posts/a.md"]
+        temp_db.save_build([replace(alpha, path="posts/z.md")], [], [], [])
+        (tmp_path / "2025-01-01-alpha.html").write_text("z.md's body")
+
+        report = builder.build(sources)
+
+        assert "2025-01-01-alpha.html" in report.rebuilt
+        assert "Body" in (tmp_path / "2025-01-01-alpha.html").read_text()
+
+
+class TestParallelRendering:
+    """Test the process pool rendering pipeline."""
+
+    def test_parallel_matches_serial_order(self, settings, post):
+        """Parallel results come back in input order and match serial output."""
+        items = [(f"posts/{i}.md", post(f"Post {i}", "2025-01-01")) for i in range(10)]
+
+        serial = list(render_sources(items, settings, workers=1))
+        parallel = list(render_sources(items, settings, workers=2, chunk_size=3))
+
+        assert parallel == serial
+        assert [rendered.path for rendered in parallel] == [path for path, _ in items]
+
+    def test_parallel_build(self, temp_db, settings, sources, tmp_path):
+        """A multi-worker build produces the same files as a serial one."""
+        report = SiteBuilder(temp_db, tmp_path, settings, workers=2).build(sources)
+
+        assert len(report.rebuilt) == 11
+        assert "Alpha" in (tmp_path / "2025-01-01-alpha.html").read_text()
+
+
+class TestRenderCacheIntegration:
+    """Test that builds share rendered fragments through the render cache."""
+
+    def test_full_rebuild_hits_cache(self, temp_db, settings, sources, tmp_path):
+        """Re-rendering unchanged bodies is served from the cache."""
+        cache = RenderCache(temp_db)
+        builder = SiteBuilder(temp_db, tmp_path, settings, render_cache=cache)
+        builder.build(sources)
+        # Alpha and Beta share the same body, so only two fragments are rendered;
+        # the feeds then reuse both posts' fragments
+        assert cache.stats() == {"hits": 3, "misses": 2}
+
+        builder.build(sources, full=True)
+
+        assert cache.stats() == {"hits": 8, "misses": 2}
+
+    def test_workers_report_cache_stats(self, temp_db, settings, sources, tmp_path):
+        """Hits and misses from worker processes are added to the parent cache."""
+        cache = RenderCache(temp_db)
+        builder = SiteBuilder(
+            temp_db, tmp_path, settings, workers=2, render_cache=cache
+        )
+        builder.build(sources)
+        builder.build(sources, full=True)
+
+        assert cache.stats()["hits"] >= 3
+        assert sum(cache.stats().values()) == 10
+
+
+class TestStepStats:
+    """Test the per-step breakdown of a build."""
+
+    def test_first_build(self, temp_db, settings, sources, tmp_path):
+        """Every source is parsed and rendered and every output written."""
+        report = SiteBuilder(temp_db, tmp_path, settings).build(sources)
+        steps = {
+            name: (step.items, step.cache_hits) for name, step in report.steps.items()
+        }
+
+        assert list(steps) == ["parse", "render", "aggregate", "write"]
+        assert steps["parse"] == (3, 0)
+        assert steps["render"] == (3, 0)
+        assert steps["aggregate"] == (8, 0)
+        assert steps["write"] == (11, 0)
+
+    def test_unchanged_build_counts_cache_hits(
+        self, temp_db, settings, sources, tmp_path
+    ):
+        """Skipped sources and aggregates count as cache hits."""
+        builder = SiteBuilder(temp_db, tmp_path, settings)
+        builder.build(sources)
+
+        report = builder.build(sources)
+
+        assert (report.steps["parse"].items, report.steps["parse"].cache_hits) == (0, 3)
+        assert report.steps["aggregate"].cache_hits == 8
+        assert report.steps["write"].items == 0
+
+    def test_render_cache_hits(self, temp_db, settings, sources, tmp_path):
+        builder = SiteBuilder(
+            temp_db, tmp_path, settings, render_cache=RenderCache(temp_db)
+        )
+        builder.build(sources)
+
+        report = builder.build(sources, full=True)
+
+        assert report.steps["render"].cache_hits == 3
+
+    def test_workers_report_steps(self, temp_db, settings, sources, tmp_path):
+        """Parse and render stats from worker processes are merged."""
+        report = SiteBuilder(temp_db, tmp_path, settings, workers=2).build(sources)
+
+        assert report.steps["parse"].items == 3
+        assert report.steps["render"].items == 3
+        assert report.steps["render"].seconds > 0
@@ -0,0 +1,76 @@
+# ABOUTME: Tests for batched API key usage tracking
+# ABOUTME: Verifies aggregation in memory and flushing to the api_keys table
+import pytest
+
+from app.models import APIKey
+from app.usage import APIKeyUsageTracker
+
+
+class TestAPIKeyUsageTracker:
+    """Test in-memory accumulation and batched flushes."""
+
+    def test_record_does_not_write(self, temp_db):
+        """Recording usage leaves the database untouched until a flush."""
+        key_id = temp_db.create_api_key(APIKey("Key", "hash", ["read"]))
+        tracker = APIKeyUsageTracker(temp_db)
+
+        tracker.record(key_id)
+
+        assert temp_db.get_api_key(key_id).last_used is None
+
+    def test_flush_aggregates_counts(self, temp_db):
+        """Multiple uses of a key are written as one aggregated update."""
+        key1 = temp_db.create_api_key(APIKey("Key 1", "hash1", ["read"]))
+        key2 = temp_db.create_api_key(APIKey("Key 2", "hash2", ["read"]))
+        tracker = APIKeyUsageTracker(temp_db)
+
+        for _ in range(3):
+            tracker.record(key1)
+        tracker.record(key2)
+
+        assert tracker.flush() == 2
+        assert temp_db.get_api_key(key1).request_count == 3
+        assert temp_db.get_api_key(key1).last_used is not None
+        assert temp_db.get_api_key(key2).request_count == 1
+
+    def test_flushes_accumulate(self, temp_db):
+        """Counts from successive flushes add up."""
+        key_id = temp_db.create_api_key(APIKey("Key", "hash", ["read"]))
+        tracker = APIKeyUsageTracker(temp_db)
+
+        tracker.record(key_id)
+        tracker.flush()
+        tracker.record(key_id)
+        tracker.flush()
+
+        assert temp_db.get_api_key(key_id).request_count == 2
+
+    def test_empty_flush(self, temp_db):
+        """Flushing with nothing pending is a no-op."""
+        assert APIKeyUsageTracker(temp_db).flush() == 0
+
+    def test_stop_flushes_pending(self, temp_db):
+        """Stopping the tracker writes whatever is still pending."""
+        key_id = temp_db.create_api_key(APIKey("Key", "hash", ["read"]))
+        tracker = APIKeyUsageTracker(temp_db, interval=3600)
+        tracker.start()
+
+        tracker.record(key_id)
+        tracker.stop()
+
+        assert temp_db.get_api_key(key_id).request_count == 1
+
+    def test_failed_flush_keeps_usage(self, temp_db):
+        """Usage survives a failed flush and is written by the next one."""
+        key_id = temp_db.create_api_key(APIKey("Key", "hash", ["read"]))
+        tracker = APIKeyUsageTracker(temp_db)
+        tracker.record(key_id)
+
+        original = temp_db.record_api_key_usage
+        temp_db.record_api_key_usage = lambda usage: 1 / 0
+        with pytest.raises(ZeroDivisionError):
+            tracker.flush()
+        temp_db.record_api_key_usage = original
+
+        assert tracker.flush() == 1
+        assert temp_db.get_api_key(key_id).request_count == 1